@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List
+
+from django.db.models import Exists, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from core.models import User
+from expenses.models import Expense
+from .models import BudgetItem
+
+
+@dataclass
+class BudgetEvaluation:
+    budget: BudgetItem
+    spent: int
+
+    @property
+    def remaining(self) -> int:
+        return max(self.budget.amount - self.spent, 0)
+
+    @property
+    def overspent(self) -> int:
+        return max(self.spent - self.budget.amount, 0)
+
+
+def spent_per_budget(budget_ids: Iterable[int]) -> Dict[int, int]:
+    """
+        Total of the expenses that fall in each budget, in one query with a subquery per budget
+
+        An expense counts towards a budget when it belongs to the budget's user, occurred within
+        the budget's dates and shares at least one tag with it. It is counted once however many
+        tags it shares
+    """
+    budget_ids = list(budget_ids)
+    if not budget_ids:
+        return {}
+
+    shares_a_tag = Exists(Expense.tags.through.objects.filter(
+        expense=OuterRef('pk'), usagetag__budgetitem=OuterRef(OuterRef('pk'))
+    ))
+    spent = Expense.objects.filter(
+        shares_a_tag,
+        user=OuterRef('user'),
+        date_occurred__gte=OuterRef('start_date'),
+        date_occurred__lte=OuterRef('end_date')
+    ).order_by().values('user').annotate(total=Sum('amount')).values('total')
+
+    return dict(
+        BudgetItem.objects.filter(pk__in=budget_ids).annotate(
+            spent=Subquery(spent)
+        ).filter(spent__isnull=False).values_list('pk', 'spent')
+    )
+
+
+def evaluate_budgets(user: User, on: date = None) -> List[BudgetEvaluation]:
+    """Spending against every budget of `user` active `on` (today by default)"""
+    on = on or timezone.localdate()
+    budgets = list(
+        BudgetItem.objects.filter(user=user, start_date__lte=on, end_date__gte=on).order_by('end_date', 'pk')
+    )
+    spent = spent_per_budget(budget.pk for budget in budgets)
+    return [BudgetEvaluation(budget, spent.get(budget.pk, 0)) for budget in budgets]
@@ -0,0 +1,62 @@
+from datetime import date
+
+from django.test import TestCase
+
+from core.models import Currency, User
+from expenses.models import UsageTag, Expense
+from budgets.models import BudgetItem
+from budgets.evaluation import evaluate_budgets, spent_per_budget
+
+
+class BudgetEvaluationTestCase(TestCase):
+
+    def setUp(self) -> None:
+        currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.user = User.objects.create(username='tyne', email='tyne@tfinance.io', currency=currency)
+        self.user_2 = User.objects.create(username='van', email='van@tfinance.io', currency=currency)
+        self.food = UsageTag.objects.create(title='FOOD', code='FD')
+        self.fare = UsageTag.objects.create(title='Transport', code='TP')
+        self.rent = UsageTag.objects.create(title='Rent', code='RNT')
+
+        self.meals = self.budget('Meals', 1000, self.food, self.fare)
+        self.housing = self.budget('Housing', 5000, self.rent)
+        self.empty = self.budget('Empty', 100, self.fare)
+        self.old = self.budget('Old', 100, self.food, start_date='2022-01-01', end_date='2022-12-31')
+
+        # two matching tags, counted once
+        self.expense(400, '2023-01-05', self.food, self.fare)
+        self.expense(700, '2023-02-05', self.food)
+        self.expense(4000, '2023-03-01', self.rent)
+        # outside the dates, not matching a tag or another user's
+        self.expense(300, '2024-01-05', self.food)
+        self.expense(50, '2023-01-05', self.rent)
+        self.expense(800, '2023-01-05', self.food, user=self.user_2)
+
+    def budget(self, name, amount, *tags, start_date='2023-01-01', end_date='2023-12-31') -> BudgetItem:
+        budget = BudgetItem.objects.create(
+            user=self.user, name=name, amount=amount, start_date=start_date, end_date=end_date
+        )
+        budget.tags.add(*tags)
+        return budget
+
+    def expense(self, amount, date_occurred, *tags, user=None):
+        Expense.objects.create(user=user or self.user, amount=amount, date_occurred=date_occurred).tags.add(*tags)
+
+    def test_spent_per_budget(self):
+        self.assertDictEqual(spent_per_budget([]), {})
+        self.assertDictEqual(
+            spent_per_budget([self.meals.pk, self.housing.pk, self.empty.pk, self.old.pk]),
+            {self.meals.pk: 1100, self.housing.pk: 4050, self.empty.pk: 400}
+        )
+
+    def test_evaluate_budgets(self):
+        # the budgets and one aggregate whatever the number of budgets
+        with self.assertNumQueries(2):
+            evaluations = evaluate_budgets(self.user, date(2023, 6, 1))
+
+        self.assertListEqual(
+            [(e.budget, e.spent, e.remaining, e.overspent) for e in evaluations],
+            [(self.meals, 1100, 0, 100), (self.housing, 4050, 950, 0), (self.empty, 400, 0, 300)]
+        )
+        self.assertListEqual([e.budget for e in evaluate_budgets(self.user, date(2022, 6, 1))], [self.old])
+        self.assertListEqual(evaluate_budgets(self.user_2, date(2023, 6, 1)), [])
@@ -1,6 +1,7 @@
 from django.test import TestCase
 
 from core.models import User, Currency
+from core.optimizer import optimize_queryset
 from core.utils import DateTimeFormatter
 from core.serializers import UserSerializer
 from expenses.models import UsageTag
@@ -124,3 +125,18 @@ class BudgetTestCases(DateTimeFormatter, TestCase):
             item = ser.save()
             self.assertIsNotNone(item)
             self.assertTrue(q_set(item.pk))
+
+    def test_optimized_querysets(self):
+        for count in (1, 5):
+            for _ in range(count):
+                BudgetItem.objects.create(
+                    user=self.user_2, start_date='2020-01-01', end_date='2020-12-01', name='Food'
+                ).tags.add(self.tag)
+                WishListItem.objects.create(user=self.user_2, name='Bike', due_date='2021-03-10')
+
+            with self.assertNumQueries(2):
+                BudgetItemSerializer(optimize_queryset(BudgetItem.objects.all(), BudgetItemSerializer), many=True).data
+            with self.assertNumQueries(1):
+                WishListItemSerializer(
+                    optimize_queryset(WishListItem.objects.all(), WishListItemSerializer), many=True
+                ).data
@@ -0,0 +1,41 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.models import Currency, User
+from expenses.models import UsageTag, Expense
+from budgets.models import BudgetItem
+
+
+class BudgetsViewsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            username='tyne',
+            email='tyne@tfinance.io',
+            currency=Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.get_user_auth_token().key}')
+
+    def test_budget_evaluation(self):
+        tag = UsageTag.objects.create(title='FOOD', code='FD')
+        budget = BudgetItem.objects.create(
+            user=self.user, name='Meals', amount=1000, start_date='2023-01-01', end_date='2023-12-31'
+        )
+        budget.tags.add(tag)
+        Expense.objects.create(user=self.user, amount=400, date_occurred='2023-01-05').tags.add(tag)
+
+        self.assertEquals(400, self.client.get('/budgets/evaluation/?date=2023').status_code)
+        self.assertListEqual(self.client.get('/budgets/evaluation/?date=2022-06-01').json().get('budgets'), [])
+        req = self.client.get('/budgets/evaluation/?date=2023-06-01')
+        self.assertEquals(200, req.status_code)
+        self.assertListEqual(req.json().get('budgets'), [{
+            'id': budget.pk,
+            'name': 'Meals',
+            'start_date': '2023-01-01',
+            'end_date': '2023-12-31',
+            'amount': 1000,
+            'spent': 400,
+            'remaining': 600,
+            'overspent': 0
+        }])
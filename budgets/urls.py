@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = "budgets"
+
+
+urlpatterns = [
+
+    # evaluation/
+    path('evaluation/', views.budget_evaluation, name='evaluation'),
+]
@@ -1,3 +1,41 @@
-from django.shortcuts import render
+from datetime import datetime
 
-# Create your views here.
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.decorators import api_view
+
+from .evaluation import evaluate_budgets
+
+
+@api_view(['GET'])
+def budget_evaluation(request):
+    """
+        Spending against the user's active budgets
+        optional query param: date (YYYY-MM-DD), budgets active on it, today by default
+    """
+    on = None
+
+    if value := request.GET.get('date'):
+        try:
+            on = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'message': 'Use the format YYYY-MM-DD for the date'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse({
+        'success': True,
+        'budgets': [
+            {
+                'id': evaluation.budget.pk,
+                'name': evaluation.budget.name,
+                'start_date': evaluation.budget.start_date,
+                'end_date': evaluation.budget.end_date,
+                'amount': evaluation.budget.amount,
+                'spent': evaluation.spent,
+                'remaining': evaluation.remaining,
+                'overspent': evaluation.overspent
+            } for evaluation in evaluate_budgets(request.user, on)
+        ]
+    }, status=status.HTTP_200_OK)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .models import AccountType, Currency
+        from .reference_data import reference_data
+
+        reference_data.register(Currency)
+        reference_data.register(AccountType)
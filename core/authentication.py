@@ -0,0 +1,150 @@
+import hashlib
+from typing import Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from .hashing import password_hashing
+from .routers import primary
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+        TokenAuthentication that remembers the token (and its user) of a key
+
+        - Tokens are kept in the AUTH_TOKEN_CACHE cache, its TIMEOUT and MAX_ENTRIES
+          bound how long and how many tokens are remembered
+        - Deleting a token or deactivating its user forgets it (core/signals.py), the key stops
+          working at once in this process and within TIMEOUT in the others with a per-process cache,
+          which is why the default TIMEOUT is seconds, not minutes
+        - `aauthenticate` does the same for async views, with the async ORM and cache interfaces
+    """
+
+    @staticmethod
+    def cache():
+        return caches[settings.AUTH_TOKEN_CACHE]
+
+    @staticmethod
+    def cache_key(key: str) -> str:
+        # the key itself is a credential, keep it out of the cache backend
+        return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    @classmethod
+    def forget(cls, key: str):
+        cls.cache().delete(cls.cache_key(key))
+
+    def authenticate_credentials(self, key):
+        cache, cache_key = self.cache(), self.cache_key(key)
+
+        if (token := cache.get(cache_key)) is None:
+            # a token made by the previous request may not have reached the replica yet
+            with primary():
+                user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token)
+            return user, token
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return token.user, token
+
+    async def aauthenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache, cache_key = self.cache(), self.cache_key(key)
+
+        if (token := await cache.aget(cache_key)) is None:
+            try:
+                with primary():
+                    token = await self.get_model().objects.select_related('user').aget(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            await cache.aset(cache_key, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return token.user, token
+
+
+class PooledHashingModelBackend(ModelBackend):
+    """
+        ModelBackend hashing on the password hashing pool, the user is read and saved
+        on the request thread
+
+        Raises PasswordHashingBusy when the pool is full. `aauthenticate` does the same
+        for async views (Django 4.2 has no async authenticate())
+    """
+
+    @staticmethod
+    def check(user, password: str) -> Tuple[bool, bool]:
+        """Whether `password` is the user's and whether its hash was upgraded and has to be saved"""
+        upgraded = []
+
+        def setter(raw_password):
+            user.set_password(raw_password)
+            upgraded.append(True)
+
+        return check_password(password, user.password, setter), bool(upgraded)
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # an unknown username takes as long as a wrong password
+            password_hashing.run(make_password, password)
+            return None
+
+        valid, upgraded = password_hashing.run(self.check, user, password)
+        if upgraded:
+            user.save(update_fields=['password'])
+
+        return user if valid and self.user_can_authenticate(user) else None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = await sync_to_async(user_model._default_manager.get_by_natural_key)(username)
+        except user_model.DoesNotExist:
+            await password_hashing.arun(make_password, password)
+            return None
+
+        valid, upgraded = await password_hashing.arun(self.check, user, password)
+        if upgraded:
+            await user.asave(update_fields=['password'])
+
+        return user if valid and self.user_can_authenticate(user) else None
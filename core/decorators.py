@@ -0,0 +1,51 @@
+from functools import wraps
+from typing import Sequence
+
+from django.http import JsonResponse
+from rest_framework import exceptions, status
+
+from .authentication import CachedTokenAuthentication
+
+
+def async_api_view(http_method_names: Sequence[str], authenticated: bool = True):
+    """
+        api_view for async views, DRF views are sync only
+
+        Requests with another method or without a valid token are answered the way
+        api_view answers them, then the view gets request.user and request.auth.
+        Only token authentication is supported, `authenticated=False` lets anyone in
+        like permission_classes([]) does
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in http_method_names:
+                response = JsonResponse(
+                    {'detail': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED
+                )
+                response['Allow'] = ', '.join(http_method_names)
+                return response
+
+            if not authenticated:
+                return await view(request, *args, **kwargs)
+
+            authentication = CachedTokenAuthentication()
+            try:
+                credentials = await authentication.aauthenticate(request)
+                detail = 'Authentication credentials were not provided.'
+            except exceptions.AuthenticationFailed as error:
+                credentials, detail = None, error.detail
+
+            if credentials is None:
+                response = JsonResponse({'detail': str(detail)}, status=status.HTTP_401_UNAUTHORIZED)
+                response['WWW-Authenticate'] = authentication.authenticate_header(request)
+                return response
+
+            request.user, request.auth = credentials
+            return await view(request, *args, **kwargs)
+
+        # csrf_exempt returns a sync function on Django 4.2, which would make the view sync
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
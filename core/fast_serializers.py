@@ -0,0 +1,227 @@
+from collections import defaultdict
+from datetime import datetime, tzinfo
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Tuple, Type
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import F, Model, QuerySet
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+# fields whose database value is already what the serializer shows
+PLAIN_FIELDS = (fields.IntegerField, fields.CharField, fields.BooleanField, fields.ChoiceField)
+
+# kinds of recipe entries
+VALUE, NESTED, MANY = 'value', 'nested', 'many'
+
+
+@lru_cache(maxsize=None)
+def datetime_formatter(tz: tzinfo) -> Callable[[datetime], str]:
+    """What DRF's DateTimeField shows for a datetime, in `tz`"""
+    def format_datetime(value: datetime) -> str:
+        value = value.astimezone(tz).isoformat()
+        return f'{value[:-6]}Z' if value.endswith('+00:00') else value
+
+    return format_datetime
+
+
+def format_date(value) -> str:
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def converter(field: fields.Field) -> Callable | None:
+    """How a database value becomes the field's output, None when it is shown as is"""
+    if isinstance(field, fields.DateTimeField):
+        if getattr(field, 'format', ISO_8601) == ISO_8601 and getattr(field, 'timezone', None) is None:
+            # replaced by the formatter of the current timezone when serializing
+            return datetime_formatter
+        return field.to_representation
+
+    if isinstance(field, fields.DateField) and getattr(field, 'format', ISO_8601) == ISO_8601:
+        return format_date
+
+    if isinstance(field, PLAIN_FIELDS):
+        return None
+
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        # values() reads the id of the relation
+        return None
+
+    if isinstance(field, relations.ManyRelatedField):
+        raise ImproperlyConfigured(f'{field.field_name} is a list of ids and cannot be read from values()')
+
+    return field.to_representation
+
+
+class FastSerializer:
+    """
+        Read-only representation of a queryset built from values() rows,
+        the same output as `serializer_class(queryset, many=True).data`
+
+        - The recipe (what to read and how to show it) is worked out once per serializer class
+          from the serializer fields, so fields and their order follow the serializer
+        - Nested serializers read their columns in the same query, many relations
+          are read with one query each
+        - Supports model fields, nested serializers of relations and fields DRF can show
+          from a plain value; anything else (method fields, dotted sources) is refused
+    """
+
+    def __init__(self, serializer: BaseSerializer):
+        self.model: Type[Model] = serializer.Meta.model
+        # (kind, key, lookup, how): VALUE entries convert with `how`, NESTED entries build the
+        # entries in `how` when the relation in `lookup` is set, MANY entries read `how`, a FastMany
+        self.entries, lookups = self.compile(serializer, self.model, '')
+        self.lookups = list(dict.fromkeys(['pk', *lookups]))
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def for_class(cls, serializer_class: Type[BaseSerializer]) -> 'FastSerializer':
+        return cls(serializer_class())
+
+    @classmethod
+    def compile(cls, serializer: BaseSerializer, model: Type[Model], prefix: str) -> Tuple[List[Tuple], List[str]]:
+        entries, lookups = [], []
+
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{key} is not a model field and cannot be read from values()'
+                )
+
+            lookup = f'{prefix}{field.source}'
+
+            if isinstance(field, ListSerializer):
+                entries.append((MANY, key, f'{prefix}pk', FastMany(field.child, model_field)))
+                lookups.append(f'{prefix}pk')
+
+            elif isinstance(field, BaseSerializer):
+                nested, nested_lookups = cls.compile(field, model_field.related_model, f'{lookup}__')
+                entries.append((NESTED, key, lookup, nested))
+                lookups.extend([lookup, *nested_lookups])
+
+            else:
+                entries.append((VALUE, key, lookup, converter(field)))
+                lookups.append(lookup)
+
+        return entries, lookups
+
+    def rows(self, queryset: QuerySet) -> List[Dict]:
+        """The values() rows the representation is built from, `pk` included"""
+        return list(queryset.values(*self.lookups))
+
+    async def arows(self, queryset: QuerySet) -> List[Dict]:
+        return [row async for row in queryset.values(*self.lookups)]
+
+    def related(self, rows: List[Dict]) -> Dict:
+        """What the rows need from other queries, the rows of the many relations"""
+        related = {}
+        self.fetch_many(self.entries, rows, related)
+        return related
+
+    async def arelated(self, rows: List[Dict]) -> Dict:
+        related = {}
+        await self.afetch_many(self.entries, rows, related)
+        return related
+
+    def represent(self, rows: List[Dict], related: Dict = None) -> List[Dict]:
+        related = self.related(rows) if related is None else related
+        format_datetime = datetime_formatter(timezone.get_current_timezone())
+
+        return [self.build(self.entries, row, related, format_datetime) for row in rows]
+
+    async def arepresent(self, rows: List[Dict]) -> List[Dict]:
+        return self.represent(rows, await self.arelated(rows))
+
+    def serialize(self, queryset: QuerySet) -> List[Dict]:
+        return self.represent(self.rows(queryset))
+
+    async def aserialize(self, queryset: QuerySet) -> List[Dict]:
+        """serialize with the async ORM, for async views"""
+        return await self.arepresent(await self.arows(queryset))
+
+    @classmethod
+    def fetch_many(cls, entries: List[Tuple], rows: List[Dict], related: Dict):
+        for kind, _, lookup, how in entries:
+            if kind == MANY:
+                related[how] = how.fetch({row[lookup] for row in rows})
+            elif kind == NESTED:
+                cls.fetch_many(how, rows, related)
+
+    @classmethod
+    async def afetch_many(cls, entries: List[Tuple], rows: List[Dict], related: Dict):
+        for kind, _, lookup, how in entries:
+            if kind == MANY:
+                related[how] = await how.afetch({row[lookup] for row in rows})
+            elif kind == NESTED:
+                await cls.afetch_many(how, rows, related)
+
+    @classmethod
+    def build(cls, entries: List[Tuple], row: Dict, related: Dict, format_datetime: Callable) -> Dict:
+        representation = {}
+
+        for kind, key, lookup, how in entries:
+            value = row[lookup]
+
+            if kind == MANY:
+                representation[key] = related[how].get(value, []) if value is not None else []
+            elif value is None:
+                representation[key] = None
+            elif kind == NESTED:
+                representation[key] = cls.build(how, row, related, format_datetime)
+            elif how is None:
+                representation[key] = value
+            elif how is datetime_formatter:
+                representation[key] = format_datetime(value)
+            else:
+                representation[key] = how(value)
+
+        return representation
+
+
+class FastMany:
+    """A nested serializer with many=True, read for all the parents at once"""
+
+    def __init__(self, child: BaseSerializer, model_field):
+        self.child = FastSerializer(child)
+        # how the related rows reach back to their parent
+        if model_field.many_to_many and not model_field.auto_created:
+            self.query_name = model_field.related_query_name()
+        else:
+            self.query_name = model_field.field.name
+
+    def queryset(self, parent_ids: Iterable[int]) -> QuerySet | None:
+        parent_ids = [pk for pk in parent_ids if pk is not None]
+        if not parent_ids:
+            return None
+
+        return self.child.model._default_manager.filter(**{f'{self.query_name}__in': parent_ids}).values(
+            *self.child.lookups, parent_id=F(self.query_name)
+        )
+
+    @staticmethod
+    def by_parent(rows: List[Dict], representations: List[Dict]) -> Dict[int, List[Dict]]:
+        by_parent = defaultdict(list)
+        for row, representation in zip(rows, representations):
+            by_parent[row['parent_id']].append(representation)
+
+        return by_parent
+
+    def fetch(self, parent_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+        if (queryset := self.queryset(parent_ids)) is None:
+            return {}
+
+        rows = list(queryset)
+        return self.by_parent(rows, self.child.represent(rows))
+
+    async def afetch(self, parent_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+        if (queryset := self.queryset(parent_ids)) is None:
+            return {}
+
+        rows = [row async for row in queryset]
+        return self.by_parent(rows, await self.child.arepresent(rows))
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from django.conf import settings
+
+
+class PasswordHashingBusy(Exception):
+    """More hashes are waiting than PASSWORD_HASHING_QUEUE allows"""
+
+
+class PasswordHashingPool:
+    """
+        Runs password hashing on a bounded thread pool
+
+        - PBKDF2 (hashlib) releases the GIL, so hashes run in parallel with the requests
+          of the other threads and a burst of logins never takes more than
+          PASSWORD_HASHING_WORKERS cores of a process
+        - Hashes over PASSWORD_HASHING_WORKERS + PASSWORD_HASHING_QUEUE are refused with
+          PasswordHashingBusy instead of piling up
+        - Threads rather than processes: the hashers and the user instances stay in memory
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = threading.BoundedSemaphore(
+                        settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_QUEUE
+                    )
+                    self._executor = ThreadPoolExecutor(
+                        settings.PASSWORD_HASHING_WORKERS, thread_name_prefix='password-hashing'
+                    )
+        return self._executor
+
+    def submit(self, fn: Callable, *args) -> Future:
+        executor = self.executor()
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+
+        def task():
+            try:
+                return fn(*args)
+            finally:
+                # before the result is set, a caller that got its result can submit again at once
+                self._slots.release()
+
+        return executor.submit(task)
+
+    def run(self, fn: Callable, *args):
+        """fn(*args) on the pool, waiting for the result"""
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn: Callable, *args):
+        """run for async views, the event loop keeps serving other requests meanwhile"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+password_hashing = PasswordHashingPool()
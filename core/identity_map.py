@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Tuple, Type
+
+from django.db.models import Model
+
+
+class IdentityMap:
+    """
+        Objects looked up while handling one request or one serializer tree
+
+        The same lookup on the same model only goes to the database once
+    """
+
+    def __init__(self):
+        self._objects: Dict[Tuple, Model] = {}
+
+    def get(self, model: Type[Model], **lookup) -> Model:
+        key = (model, tuple(sorted(lookup.items())))
+
+        if key not in self._objects:
+            self._objects[key] = model._default_manager.get(**lookup)
+
+        return self._objects[key]
+
+    def __len__(self):
+        return len(self._objects)
+
+
+_current_identity_map: ContextVar[IdentityMap | None] = ContextVar('identity_map', default=None)
+
+
+def get_identity_map() -> IdentityMap | None:
+    """The identity map of the current request, if any"""
+    return _current_identity_map.get()
+
+
+@contextmanager
+def identity_map_scope():
+    """
+        Everything inside shares one identity map, it is dropped on exit
+
+        A context variable holds it so threads and async tasks each see their own
+    """
+    token = _current_identity_map.set(IdentityMap())
+    try:
+        yield get_identity_map()
+    finally:
+        _current_identity_map.reset(token)
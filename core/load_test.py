@@ -0,0 +1,131 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+
+@dataclass
+class LoadResult:
+    url: str
+    requests: int = 0
+    # failed requests (timeouts, other statuses than 200) of the regular and the slow clients
+    errors: int = 0
+    elapsed: float = 0
+    # seconds per request of the regular clients
+    latencies: List[float] = field(default_factory=list)
+    # requests of the slow clients answered with a 200
+    slow_requests: int = 0
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+
+class Target:
+    """An http:// URL and the raw GET request sent to it"""
+
+    def __init__(self, url: str, headers: Dict[str, str] = None):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise ValueError('Only http:// URLs are supported')
+
+        self.url = url
+        self.host, self.port = parts.hostname, parts.port or 80
+        path = f'{parts.path or "/"}?{parts.query}' if parts.query else parts.path or '/'
+        lines = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: close']
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        self.request = ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+    async def fetch(self, delay: float = 0, chunk_size: int = 64) -> int:
+        """
+            Send the request and read the whole response, the status code is returned
+
+            With a `delay` the request is written and the response read `chunk_size` bytes
+            at a time, waiting `delay` seconds between chunks like a client on a slow network
+        """
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if delay:
+                for start in range(0, len(self.request), chunk_size):
+                    writer.write(self.request[start:start + chunk_size])
+                    await writer.drain()
+                    await asyncio.sleep(delay)
+            else:
+                writer.write(self.request)
+                await writer.drain()
+
+            status_line = await reader.readline()
+            while await reader.read(chunk_size if delay else 65536):
+                if delay:
+                    await asyncio.sleep(delay)
+
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+    async def hold(self, stop: asyncio.Event):
+        """Keep a connection open without finishing the request, like an idle mobile client"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(self.request.split(b'\r\n', 1)[0] + b'\r\n')
+            await writer.drain()
+            await stop.wait()
+        finally:
+            writer.close()
+
+
+async def run_load(
+        target: Target, concurrency: int, duration: float, slow_clients: int = 0, slow_delay: float = 0.5,
+        idle_clients: int = 0, timeout: float = 30
+) -> LoadResult:
+    """
+        `concurrency` clients send requests back to back for `duration` seconds while `slow_clients`
+        trickle theirs and `idle_clients` hold connections open, only the regular clients are timed
+
+        Requests taking longer than `timeout` seconds are errors
+    """
+    result = LoadResult(target.url)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def client(delay: float):
+        while loop.time() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(target.fetch(delay), timeout)
+            except (asyncio.TimeoutError, OSError, ValueError, IndexError):
+                status = None
+
+            if status != 200:
+                result.errors += 1
+            elif delay:
+                result.slow_requests += 1
+            else:
+                result.requests += 1
+                result.latencies.append(time.perf_counter() - started)
+
+    async def idle():
+        try:
+            await target.hold(stop)
+        except OSError:
+            pass
+
+    holders = [asyncio.create_task(idle()) for _ in range(idle_clients)]
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(client(0) for _ in range(concurrency)),
+        *(client(slow_delay) for _ in range(slow_clients))
+    )
+    result.elapsed = time.perf_counter() - started
+
+    stop.set()
+    await asyncio.gather(*holders)
+    return result
@@ -0,0 +1,35 @@
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.net_worth import exchange_rates
+
+
+class Command(BaseCommand):
+    help = 'Load exchange rates from a CSV file with the columns date (YYYY-MM-DD), code and rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+
+    def handle(self, *args, **options):
+        rates = []
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as file:
+            # line 1 is the header
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                try:
+                    rate = (
+                        datetime.strptime(row['date'].strip(), '%Y-%m-%d').date(),
+                        row['code'].strip().upper(),
+                        Decimal(row['rate'].strip())
+                    )
+                except (KeyError, AttributeError, ValueError, InvalidOperation):
+                    raise CommandError(f'line {line}: date (YYYY-MM-DD), code and rate are required')
+
+                if not rate[2] > 0:
+                    raise CommandError(f'line {line}: the rate must be greater than 0')
+                rates.append(rate)
+
+        self.stdout.write(f'{exchange_rates.load(rates)} exchange rates loaded')
@@ -0,0 +1,48 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.load_test import Target, run_load
+
+
+class Command(BaseCommand):
+    help = '''
+        Load test running servers with many concurrent, slow and idle clients, to compare
+        the sync (WSGI) and async (ASGI) endpoints, e.g. with the app served by
+            gunicorn tyne_finance.wsgi -w 4 -b 127.0.0.1:8000
+            uvicorn tyne_finance.asgi:application --workers 4 --port 8001
+        and
+            load_test http://127.0.0.1:8000/expenses/accounts/1/transactions/ \\
+                http://127.0.0.1:8001/expenses/async/accounts/1/transactions/ --token KEY
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='http:// URLs, tested one after the other')
+        parser.add_argument('--token', help='Auth token sent with every request')
+        parser.add_argument('--concurrency', type=int, default=100, help='Clients sending requests back to back')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per URL')
+        parser.add_argument('--slow-clients', type=int, default=0, help='Clients on a slow network')
+        parser.add_argument('--slow-delay', type=float, default=0.5, help='Seconds between the chunks of slow clients')
+        parser.add_argument('--idle-clients', type=int, default=0, help='Connections held open without a request')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+
+    def handle(self, *args, **options):
+        headers = {'Authorization': f'Token {options["token"]}'} if options['token'] else {}
+
+        try:
+            targets = [Target(url, headers) for url in options['urls']]
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        for target in targets:
+            result = asyncio.run(run_load(
+                target, options['concurrency'], options['duration'], options['slow_clients'],
+                options['slow_delay'], options['idle_clients'], options['timeout']
+            ))
+            self.stdout.write(
+                f'{result.url}\n'
+                f'  {result.requests} requests ({result.throughput:.1f}/s), {result.errors} errors, '
+                f'{result.slow_requests} slow requests\n'
+                f'  latency p50 {result.percentile(50) * 1000:.1f} ms, p95 {result.percentile(95) * 1000:.1f} ms, '
+                f'p99 {result.percentile(99) * 1000:.1f} ms'
+            )
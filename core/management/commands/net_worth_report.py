@@ -0,0 +1,45 @@
+import csv
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.net_worth import exchange_rates, net_worths
+from core.routers import read_only_scope
+
+
+class Command(BaseCommand):
+    help = 'Write the net worth of every user with accounts as CSV, computed in one pass over the accounts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day of the exchange rates as YYYY-MM-DD, today by default')
+        parser.add_argument('--file', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        on = timezone.localdate()
+
+        if options['date']:
+            try:
+                on = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Use the format YYYY-MM-DD for the date')
+
+        file = open(options['file'], 'w', newline='') if options['file'] else self.stdout
+        try:
+            writer = csv.writer(file)
+            writer.writerow(['user_id', 'username', 'currency', 'total', 'missing_rates'])
+            users = 0
+
+            with read_only_scope():
+                for worth in net_worths(on=on):
+                    writer.writerow([
+                        worth.user_id, worth.username, worth.currency, worth.total,
+                        ' '.join(code or '' for code in worth.missing_rates)
+                    ])
+                    users += 1
+        finally:
+            if options['file']:
+                file.close()
+
+        rate_date = exchange_rates.rates_on(on)[0]
+        self.stderr.write(f'{users} users, exchange rates of {rate_date or "no date (none loaded)"}')
@@ -0,0 +1,45 @@
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+from .identity_map import identity_map_scope
+from .routers import read_only_scope
+
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+@sync_and_async_middleware
+def identity_map_middleware(get_response):
+    """Gives every request its own identity map for serializer lookups"""
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with identity_map_scope():
+                return await get_response(request)
+
+    else:
+        def middleware(request):
+            with identity_map_scope():
+                return get_response(request)
+
+    return middleware
+
+
+@sync_and_async_middleware
+def read_only_middleware(get_response):
+    """GET, HEAD and OPTIONS requests read from the replica (see ReplicaRouter)"""
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if request.method not in READ_ONLY_METHODS:
+                return await get_response(request)
+            with read_only_scope():
+                return await get_response(request)
+
+    else:
+        def middleware(request):
+            if request.method not in READ_ONLY_METHODS:
+                return get_response(request)
+            with read_only_scope():
+                return get_response(request)
+
+    return middleware
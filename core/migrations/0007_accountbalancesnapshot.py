@@ -0,0 +1,27 @@
+# Generated by Django 4.2.1 on 2026-10-17 12:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_account'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('balance', models.IntegerField(default=0)),
+                ('date_modified', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.account')),
+            ],
+            options={
+                'unique_together': {('account', 'snapshot_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.1 on 2026-10-17 12:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_user_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='currency',
+            field=models.ForeignKey(blank=True, help_text='Currency of the balance, the currency of the user when empty', null=True, on_delete=django.db.models.deletion.RESTRICT, to='core.currency'),
+        ),
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rate_date', models.DateField(db_index=True)),
+                ('code', models.CharField(max_length=10)),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=24)),
+            ],
+            options={
+                'unique_together': {('code', 'rate_date')},
+            },
+        ),
+    ]
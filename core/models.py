@@ -1,7 +1,13 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+import uuid
+from datetime import datetime, date, timedelta
+
+from django.db import DEFAULT_DB_ALIAS, models
+from django.contrib.auth.models import AbstractUser, UserManager as AuthUserManager
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
+from .utils import DateTimeFormatter
+
 
 class Currency(models.Model):
     country = models.CharField(max_length=100)
@@ -19,14 +25,22 @@ class Currency(models.Model):
         return f'{self.country} ({self.code})'
 
 
+class UserManager(AuthUserManager):
+
+    def get_by_natural_key(self, username):
+        # authentication reads the user with the currency every response shows
+        return self.select_related('currency').get(**{self.model.USERNAME_FIELD: username})
+
+
 class User(AbstractUser):
     currency = models.ForeignKey(Currency, on_delete=models.RESTRICT, null=True)
 
+    objects = UserManager()
+
     def get_user_auth_token(self):
         token = None
         if self.pk:
-            tokens = Token.objects.filter(user=self.pk)
-            token = tokens[0] if tokens.exists() else Token.objects.create(user=self)
+            token, _ = Token.objects.get_or_create(user=self)
         return token
 
     def __repr__(self):
@@ -57,12 +71,162 @@ class Account(models.Model):
     balance = models.IntegerField(default=0)
     last_balance_update = models.DateTimeField(blank=True, null=True)
     active = models.BooleanField(default=False)
+    currency = models.ForeignKey(
+        Currency, on_delete=models.RESTRICT, null=True, blank=True,
+        help_text='Currency of the balance, the currency of the user when empty'
+    )
 
     class Meta:
         unique_together = (('account_provider', 'account_number', 'account_type'),)
 
+    @classmethod
+    def adjust_balance(cls, pk: int, amount: int, when: datetime = None, using: str = None) -> int:
+        """
+            Move the balance of account `pk` by `amount` (negative to reduce it)
+            and stamp last_balance_update, in one UPDATE statement on the database `using`
+        """
+        return cls.objects.db_manager(using).filter(pk=pk).update(
+            balance=models.F('balance') + amount,
+            last_balance_update=when or timezone.now()
+        )
+
+    def balance_at(self, ts: datetime) -> int:
+        """
+            Balance of the account at `ts`
+
+            Starts from the nearest daily snapshot and replays only the transactions
+            between that snapshot and `ts`
+        """
+        from expenses.models import Transaction
+
+        day = timezone.localdate(ts)
+        snapshots = self.accountbalancesnapshot_set.values_list('snapshot_date', 'balance')
+        transactions = self.transaction_set.all()
+
+        if before := snapshots.filter(snapshot_date__lt=day).order_by('-snapshot_date').first():
+            # snapshot holds the balance at the end of its day, add what happened after it
+            snapshot_date, balance = before
+            transactions = transactions.filter(
+                transaction_date__gte=DateTimeFormatter.day_start(snapshot_date + timedelta(days=1)),
+                transaction_date__lte=ts
+            )
+            sign = 1
+
+        else:
+            # nothing earlier, walk back from the next snapshot or the current balance
+            if after := snapshots.filter(snapshot_date__gte=day).order_by('snapshot_date').first():
+                snapshot_date, balance = after
+                transactions = transactions.filter(
+                    transaction_date__lt=DateTimeFormatter.day_start(snapshot_date + timedelta(days=1))
+                )
+            else:
+                balance = Account.objects.values_list('balance', flat=True).get(pk=self.pk)
+            transactions = transactions.filter(transaction_date__gt=ts)
+            sign = -1
+
+        tail = transactions.aggregate(
+            total=models.Sum(Transaction.balance_effect_expression())
+        ).get('total') or 0
+        return balance + sign * tail
+
     def __repr__(self):
         return f'<Account: {self.user.username}>'
 
     def __str__(self):
         return f'Acc({self.user.username} • {self.account_number } • {self.account_type} • {self.account_provider})'
+
+
+class AccountBalanceSnapshot(models.Model):
+    """
+        Balance of an account at the end of a (local) day
+
+        A snapshot is taken for every day the account had a balance change
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    snapshot_date = models.DateField()
+    balance = models.IntegerField(default=0)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('account', 'snapshot_date'),)
+
+    @classmethod
+    def record_change(cls, account_id: int, amount: int, occurred_on: date, using: str = None):
+        """
+            Apply a balance change that happened on `occurred_on` to the snapshots
+
+            Call it after the account balance has been updated in the same database
+            transaction, the account row lock keeps snapshot writes for an account in order
+        """
+        today = timezone.localdate()
+        snapshots = cls.objects.db_manager(using)
+        snapshots.filter(account_id=account_id, snapshot_date__gte=occurred_on).update(
+            balance=models.F('balance') + amount
+        )
+
+        if not snapshots.filter(account_id=account_id, snapshot_date=today).exists():
+            snapshots.create(
+                account_id=account_id,
+                snapshot_date=today,
+                balance=Account.objects.db_manager(using).values_list('balance', flat=True).get(pk=account_id)
+            )
+
+    def __repr__(self):
+        return f'<AccountBalanceSnapshot: {self.snapshot_date} ({self.balance})>'
+
+    def __str__(self):
+        return f'Snapshot({self.account_id} • {self.snapshot_date} • {self.balance})'
+
+
+class ExchangeRate(models.Model):
+    """
+        Value of one unit of the currency `code` on `rate_date`, in a base currency
+        shared by all the rates of that date (rates of a date convert into each other)
+    """
+    rate_date = models.DateField(db_index=True)
+    code = models.CharField(max_length=10)
+    rate = models.DecimalField(max_digits=24, decimal_places=10)
+
+    class Meta:
+        unique_together = (('code', 'rate_date'),)
+
+    def __repr__(self):
+        return f'<ExchangeRate: {self.code} {self.rate_date} ({self.rate})>'
+
+    def __str__(self):
+        return f'{self.code} on {self.rate_date}: {self.rate}'
+
+
+class CacheVersion(models.Model):
+    """
+        Version stamp of data that processes keep in memory, shared by all the processes through the database
+
+        Changing the data writes a new version, a process holding another version reads the data again
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.CharField(max_length=32)
+
+    @classmethod
+    def current(cls, key: str) -> str | None:
+        # from the primary, a lagging replica would hand out the version from before a change
+        return cls.objects.using(DEFAULT_DB_ALIAS).filter(key=key).values_list('version', flat=True).first()
+
+    @classmethod
+    def bump(cls, key: str) -> str:
+        """
+            Write a new version for `key`, in the current database transaction
+
+            A random version rather than a counter, a rolled back bump can not hand out
+            a version again for other data
+        """
+        version = uuid.uuid4().hex
+        if not cls.objects.filter(key=key).update(version=version):
+            # a conflict means another process just wrote its own new version
+            cls.objects.bulk_create([cls(key=key, version=version)], ignore_conflicts=True)
+        return version
+
+    def __repr__(self):
+        return f'<CacheVersion: {self.key}>'
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
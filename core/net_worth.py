@@ -0,0 +1,147 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connection, transaction as db_transaction
+from django.db.models import F, Max, QuerySet, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Account, ExchangeRate
+from .reference_data import SharedVersion
+
+CENTS = Decimal('0.01')
+
+
+class ExchangeRates:
+    """
+        Exchange rates kept in memory by each process, one table per rate date
+
+        A lookup on a day uses the latest rates on or before it. Loading rates changes
+        the version stamp in the database, every process drops what it has once it sees the new stamp
+    """
+
+    def __init__(self):
+        self.stamp = SharedVersion('exchange-rates')
+        self._version = None
+        # day -> rate date used for it, rate date -> {code: rate}
+        self._rate_dates: Dict[date, date | None] = {}
+        self._rates: Dict[date, Dict[str, Decimal]] = {}
+        self._lock = threading.Lock()
+
+    def bump(self):
+        self.stamp.bump()
+
+    def rates_on(self, day: date) -> Tuple[date | None, Dict[str, Decimal]]:
+        """The date of the rates used on `day` and the rates by code, (None, {}) without rates"""
+        version = self.stamp.get()
+
+        with self._lock:
+            if version != self._version:
+                self._version, self._rate_dates, self._rates = version, {}, {}
+
+            # from the primary like reference data, what is read is kept until the next load
+            rates = ExchangeRate.objects.using(DEFAULT_DB_ALIAS)
+
+            if day not in self._rate_dates:
+                self._rate_dates[day] = rates.filter(rate_date__lte=day).aggregate(
+                    rate_date=Max('rate_date')
+                )['rate_date']
+
+            rate_date = self._rate_dates[day]
+            if rate_date is not None and rate_date not in self._rates:
+                self._rates[rate_date] = dict(
+                    rates.filter(rate_date=rate_date).values_list('code', 'rate')
+                )
+
+            return rate_date, self._rates.get(rate_date, {})
+
+    def load(self, rates: Iterable[Tuple[date, str, Decimal]], batch_size: int = 1000) -> int:
+        """
+            Save (rate date, code, rate) rows, replacing the rates already saved for a code and date
+
+            Raises ValueError for a rate that is not greater than 0, nothing is saved then
+        """
+        rates = list(rates)
+        for index, (rate_date, code, rate) in enumerate(rates, start=1):
+            if not rate > 0:
+                raise ValueError(f'rate {index} ({code} on {rate_date}): the rate must be greater than 0')
+
+        unique_fields = ['code', 'rate_date'] if connection.features.supports_update_conflicts_with_target else None
+        with db_transaction.atomic():
+            count = len(ExchangeRate.objects.bulk_create(
+                [ExchangeRate(rate_date=rate_date, code=code, rate=rate) for rate_date, code, rate in rates],
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['rate']
+            ))
+            self.bump()
+        return count
+
+
+exchange_rates = ExchangeRates()
+
+
+@dataclass
+class NetWorth:
+    user_id: int
+    username: str
+    # code of the user's currency, the total is in it
+    currency: str | None
+    total: Decimal = Decimal(0)
+    # balances by currency code
+    balances: Dict[str | None, int] = field(default_factory=dict)
+    # currencies left out of the total for want of a rate
+    missing_rates: List[str | None] = field(default_factory=list)
+
+
+def convert(amount: int, code: str | None, to_code: str | None, rates: Dict[str, Decimal]) -> Decimal | None:
+    if code == to_code:
+        return Decimal(amount)
+    # rates saved before they were checked could be 0, they count as missing
+    if rates.get(code, 0) > 0 and rates.get(to_code, 0) > 0:
+        return amount * rates[code] / rates[to_code]
+    return None
+
+
+def net_worths(accounts: QuerySet = None, on: date = None) -> Iterator[NetWorth]:
+    """
+        Net worth of the owners of `accounts` (all accounts by default) in their currencies,
+        with the rates of `on` (today by default)
+
+        Balances are added up per user and currency in one grouped query,
+        users come out in id order
+    """
+    accounts = Account.objects.all() if accounts is None else accounts
+    rate_date, rates = exchange_rates.rates_on(on or timezone.localdate())
+
+    rows = accounts.values(
+        'user_id',
+        username=F('user__username'),
+        user_currency=F('user__currency__code'),
+        code=Coalesce('currency__code', 'user__currency__code')
+    ).annotate(balance=Sum('balance')).order_by('user_id', 'code')
+
+    current = None
+    for row in rows:
+        if current is None or current.user_id != row['user_id']:
+            if current is not None:
+                yield finish(current)
+            current = NetWorth(row['user_id'], row['username'], row['user_currency'])
+
+        current.balances[row['code']] = row['balance']
+        if (converted := convert(row['balance'], row['code'], current.currency, rates)) is None:
+            current.missing_rates.append(row['code'])
+        else:
+            current.total += converted
+
+    if current is not None:
+        yield finish(current)
+
+
+def finish(net_worth: NetWorth) -> NetWorth:
+    net_worth.total = net_worth.total.quantize(CENTS)
+    return net_worth
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Tuple, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, Prefetch, QuerySet
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+@dataclass(frozen=True)
+class RelatedLookups:
+    """select_related paths and prefetches (path, model, lookups of the prefetched rows) of a serializer"""
+    select: Tuple[str, ...] = ()
+    prefetch: Tuple[Tuple[str, Type[Model], 'RelatedLookups'], ...] = field(default=())
+
+
+def serializer_lookups(serializer: BaseSerializer, prefix: str = '') -> Tuple[List[str], List[Tuple]]:
+    """
+        Walks the nested serializers that are read, forward foreign keys and one to one
+        fields are selected and everything under a many relation is prefetched
+    """
+    select, prefetch = [], []
+    model = serializer.Meta.model
+
+    for serializer_field in serializer.fields.values():
+        if serializer_field.write_only or not isinstance(serializer_field, BaseSerializer):
+            continue
+
+        many = isinstance(serializer_field, ListSerializer)
+        child = serializer_field.child if many else serializer_field
+        source = serializer_field.source
+
+        if not hasattr(child, 'Meta') or '.' in source or source == '*':
+            continue
+
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            # not a model relation (a property or a method), nothing to load ahead
+            continue
+
+        path = f'{prefix}{source}'
+
+        if many or model_field.many_to_many or model_field.one_to_many:
+            prefetch.append((path, child.Meta.model, lookups_of(child)))
+        elif model_field.is_relation:
+            select.append(path)
+            nested_select, nested_prefetch = serializer_lookups(child, f'{path}__')
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+
+    return select, prefetch
+
+
+def lookups_of(serializer: BaseSerializer) -> RelatedLookups:
+    select, prefetch = serializer_lookups(serializer)
+    # the deepest paths imply the ones above them
+    select = [path for path in select if not any(other.startswith(f'{path}__') for other in select)]
+    return RelatedLookups(tuple(select), tuple(prefetch))
+
+
+@lru_cache(maxsize=None)
+def serializer_class_lookups(serializer_class: Type[BaseSerializer]) -> RelatedLookups:
+    return lookups_of(serializer_class())
+
+
+def apply_lookups(queryset: QuerySet, lookups: RelatedLookups) -> QuerySet:
+    if lookups.select:
+        queryset = queryset.select_related(*lookups.select)
+
+    if lookups.prefetch:
+        queryset = queryset.prefetch_related(*(
+            Prefetch(path, queryset=apply_lookups(model._default_manager.all(), nested))
+            for path, model, nested in lookups.prefetch
+        ))
+
+    return queryset
+
+
+def optimize_queryset(queryset: QuerySet, serializer: Type[BaseSerializer] | BaseSerializer) -> QuerySet:
+    """
+        `queryset` with the select_related and prefetch_related `serializer` needs
+        to represent its rows, so that the number of queries does not grow with the rows
+
+        The lookups of a serializer class are worked out once, pass an instance
+        for serializers whose fields depend on how they are created
+    """
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+
+    lookups = serializer_class_lookups(serializer) if isinstance(serializer, type) else lookups_of(serializer)
+    return apply_lookups(queryset, lookups)
@@ -0,0 +1,76 @@
+import base64
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from django.db.models import Model, Q, QuerySet
+
+
+class KeysetPaginator:
+    """
+        Pages through a queryset newest first, ordered on (`order_field`, id)
+
+        The cursor holds the position of the last item of the page, the next page
+        is read from there so deep pages cost the same as the first one.
+        Back it with an index ending in (`order_field`, id)
+    """
+
+    def __init__(self, order_field: str, page_size: int = 50, max_page_size: int = 200):
+        self.order_field = order_field
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    def get_page_size(self, value) -> int:
+        if value in (None, ''):
+            return self.page_size
+        return min(max(int(value), 1), self.max_page_size)
+
+    def encode_cursor(self, item: Model | Dict) -> str:
+        value, pk = (item[self.order_field], item['pk']) if isinstance(item, dict) else \
+            (getattr(item, self.order_field), item.pk)
+        return base64.urlsafe_b64encode(f'{value.isoformat()}|{pk}'.encode()).decode()
+
+    def decode_cursor(self, queryset: QuerySet, cursor: str):
+        """The (value, pk) position in the cursor, raises ValueError when it is not valid"""
+        try:
+            value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            value = queryset.model._meta.get_field(self.order_field).to_python(value)
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+        return value, int(pk)
+
+    def page_queryset(self, queryset: QuerySet, cursor: str = None, page_size: int = None) -> QuerySet:
+        """The rows of the page after `cursor` and the first row of the next page"""
+        queryset = queryset.order_by(f'-{self.order_field}', '-pk')
+
+        if cursor:
+            value, pk = self.decode_cursor(queryset, cursor)
+            queryset = queryset.filter(**{f'{self.order_field}__lte': value}).filter(
+                Q(**{f'{self.order_field}__lt': value}) | Q(pk__lt=pk)
+            )
+
+        return queryset[:page_size + 1]
+
+    def page(self, items: List, page_size: int) -> Tuple[List, str | None]:
+        next_cursor = self.encode_cursor(items[page_size - 1]) if len(items) > page_size else None
+        return items[:page_size], next_cursor
+
+    def paginate(
+            self, queryset: QuerySet, cursor: str = None, page_size=None, fetch: Callable[[QuerySet], List] = list
+    ) -> Tuple[List[Model | Dict], str | None]:
+        """
+            Items of the page after `cursor` and the cursor of the next page, None on the last page
+
+            `fetch` reads the items of the sliced queryset, it can return values() rows holding `pk` and the order field
+        """
+        page_size = self.get_page_size(page_size)
+        return self.page(fetch(self.page_queryset(queryset, cursor, page_size)), page_size)
+
+    async def apaginate(
+            self, queryset: QuerySet, cursor: str = None, page_size=None,
+            fetch: Callable[[QuerySet], Awaitable[List]] = None
+    ) -> Tuple[List[Model | Dict], str | None]:
+        """paginate for async views, `fetch` is a coroutine function (async iteration of the queryset by default)"""
+        page_size = self.get_page_size(page_size)
+        queryset = self.page_queryset(queryset, cursor, page_size)
+        items = await fetch(queryset) if fetch else [item async for item in queryset]
+        return self.page(items, page_size)
@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Dict, List, Tuple, Type
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction as db_transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+
+
+class SharedVersion:
+    """
+        Version stamp of `key` in the database (see CacheVersion), read again by the process
+        at most every CACHE_VERSION_CHECK_INTERVAL seconds
+
+        A change made by another process (a worker, loaddata, a management command) is picked up
+        within the interval, one made by this process on its next lookup
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._version = None
+        self._checked_at = None
+
+    def get(self) -> str | None:
+        from .models import CacheVersion
+
+        now = time.monotonic()
+        interval = getattr(settings, 'CACHE_VERSION_CHECK_INTERVAL', 5)
+
+        if self._checked_at is None or now - self._checked_at >= interval:
+            self._version, self._checked_at = CacheVersion.current(self.key), now
+
+        return self._version
+
+    def expire(self):
+        self._checked_at = None
+
+    def bump(self):
+        from .models import CacheVersion
+
+        CacheVersion.bump(self.key)
+        self.expire()
+        # again once committed, the other threads may have read the version before the change was visible
+        db_transaction.on_commit(self.expire)
+
+
+class ReferenceData:
+    """
+        Rows of the small tables that hardly ever change (currencies, account types, usage tags),
+        kept in memory by each process and looked up by pk or by code
+
+        - A table is read the first time one of its rows is looked up
+        - Each table has a version stamp in the database, saving or deleting a row (loading fixtures
+          included) changes the stamp and every process reads the table again once it sees the new stamp
+        - The objects are shared by all the lookups of the process, do not change them
+    """
+
+    def __init__(self):
+        self._code_fields: Dict[Type[Model], str] = {}
+        self._versions: Dict[Type[Model], SharedVersion] = {}
+        # model -> (version, rows by pk, rows by code)
+        self._tables: Dict[Type[Model], Tuple[str | None, Dict, Dict[str, List[Model]]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, model: Type[Model], code_field: str = 'code'):
+        self._code_fields[model] = code_field
+        self._versions[model] = SharedVersion(f'reference-data:{model._meta.label}')
+        uid = f'reference-data-{model._meta.label}'
+        post_save.connect(self.changed, sender=model, dispatch_uid=uid)
+        post_delete.connect(self.changed, sender=model, dispatch_uid=uid)
+
+    def version(self, model: Type[Model]) -> str | None:
+        return self._versions[model].get()
+
+    def bump(self, model: Type[Model]):
+        self._versions[model].bump()
+
+    def changed(self, sender: Type[Model], **kwargs):
+        self.bump(sender)
+
+    def table(self, model: Type[Model]) -> Tuple[Dict, Dict[str, List[Model]]]:
+        version = self.version(model)
+
+        if (table := self._tables.get(model)) is None or table[0] != version:
+            with self._lock:
+                # another thread may have read the table while this one waited for the lock
+                version = self.version(model)
+
+                if (table := self._tables.get(model)) is None or table[0] != version:
+                    code_field = self._code_fields[model]
+                    by_pk, by_code = {}, {}
+
+                    # from the primary, rows read from a lagging replica would be kept until the next change
+                    for row in model._default_manager.using(DEFAULT_DB_ALIAS):
+                        by_pk[row.pk] = row
+                        by_code.setdefault(getattr(row, code_field), []).append(row)
+
+                    table = self._tables[model] = (version, by_pk, by_code)
+
+        return table[1], table[2]
+
+    def get(self, model: Type[Model], pk=None, code: str = None) -> Model:
+        """The row of `model` with `pk` or `code`, raises like QuerySet.get when there is not exactly one"""
+        by_pk, by_code = self.table(model)
+
+        if pk is not None:
+            rows = [by_pk[pk]] if pk in by_pk else []
+        else:
+            rows = by_code.get(code, [])
+
+        if not rows:
+            raise model.DoesNotExist(f'{model._meta.object_name} matching query does not exist.')
+        if len(rows) > 1:
+            raise model.MultipleObjectsReturned(f'get() returned more than one {model._meta.object_name}')
+
+        return rows[0]
+
+    def all(self, model: Type[Model]) -> List[Model]:
+        return list(self.table(model)[0].values())
+
+
+reference_data = ReferenceData()
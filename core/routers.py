@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+class ReadOnlyScope:
+    """Reads of the scope go to the replica until its first write"""
+
+    def __init__(self):
+        self.pinned = False
+
+
+_current_scope: ContextVar[ReadOnlyScope | None] = ContextVar('read_only_scope', default=None)
+
+
+@contextmanager
+def read_only_scope():
+    """
+        Reads inside go to the READ_REPLICA_DATABASE replica, once something is written
+        they stay on the primary so the writes are read back
+
+        A context variable holds it so threads and async tasks each see their own,
+        scopes are shared with sync_to_async threads
+    """
+    token = _current_scope.set(ReadOnlyScope())
+    try:
+        yield _current_scope.get()
+    finally:
+        _current_scope.reset(token)
+
+
+@contextmanager
+def primary():
+    """Reads inside go to the primary, for what has just been written elsewhere (a new token)"""
+    token = _current_scope.set(None)
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+
+
+class ReplicaRouter:
+    """
+        Reads of read-only scopes go to READ_REPLICA_DATABASE (None: no replica),
+        everything else to the primary (default)
+
+        Every alias is returned explicitly, Django would otherwise route by the database
+        an instance was read from and write objects read from the replica to it
+    """
+
+    @staticmethod
+    def replica() -> str | None:
+        return getattr(settings, 'READ_REPLICA_DATABASE', None)
+
+    def db_for_read(self, model, **hints):
+        scope = _current_scope.get()
+        if scope is not None and not scope.pinned and (replica := self.replica()):
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if (scope := _current_scope.get()) is not None:
+            scope.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, self.replica()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -1,16 +1,61 @@
-from typing import Dict, OrderedDict
+import copy
+from typing import Any, Dict, OrderedDict, Tuple
 
 from django.contrib.auth.hashers import make_password
 from django.core.exceptions import PermissionDenied, ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
-from rest_framework.serializers import ModelSerializer, IntegerField, CharField, ValidationError
-from rest_framework.fields import empty
+from rest_framework.serializers import BaseSerializer, ModelSerializer, IntegerField, CharField, ValidationError
+from rest_framework.fields import Field
 
+from .hashing import password_hashing
+from .identity_map import IdentityMap, get_identity_map
 from .models import User, Currency, Account, AccountType
+from .reference_data import reference_data
 
 
 class Cache:
-    _cache = {}
+    """
+        Gives serializers an identity map for the objects they look up
+
+        The map of the current request is used when there is one, otherwise the
+        serializer tree (nested and list serializers) shares a map in its context
+    """
+
+    @property
+    def identity_map(self) -> IdentityMap:
+        if (identity_map := get_identity_map()) is not None:
+            return identity_map
+        return self.context.setdefault('identity_map', IdentityMap())
+
+
+class CachedFieldsModelSerializer(ModelSerializer):
+    """
+        ModelSerializer that works out its fields once per class (and field set)
+
+        The fields built by ModelSerializer.get_fields are kept as prototypes, every instance
+        gets its own copies: plain fields are created again from their arguments, nested
+        serializers are deep copied like DRF does
+    """
+    _field_prototypes: Dict[Tuple[type, Any], Dict[str, Field]] = {}
+
+    def get_field_set(self) -> Any:
+        """Key of the fields of this instance, the fields are the same for all instances by default"""
+        return None
+
+    def build_field_prototypes(self) -> Dict[str, Field]:
+        return super().get_fields()
+
+    def get_fields(self):
+        key = (type(self), self.get_field_set())
+
+        if (prototypes := self._field_prototypes.get(key)) is None:
+            prototypes = self._field_prototypes[key] = self.build_field_prototypes()
+
+        return {
+            name: copy.deepcopy(field) if isinstance(field, BaseSerializer) else
+            field.__class__(*field._args, **field._kwargs)
+            for name, field in prototypes.items()
+        }
 
 
 class NoCreateModelSerializer:
@@ -25,25 +70,31 @@ class NoEditModelSerializer:
         raise PermissionDenied(_('Cannot update'))
 
 
-class NoEditOrCreateModelSerializer(NoCreateModelSerializer, NoEditModelSerializer, ModelSerializer):
+class NoEditOrCreateModelSerializer(NoCreateModelSerializer, NoEditModelSerializer, CachedFieldsModelSerializer):
     pass
 
 
-class ModelSerializerRequiredFalsifiable(ModelSerializer):
+class ModelSerializerRequiredFalsifiable(CachedFieldsModelSerializer):
     """
         If there is an instance, the fields are all marked as not required
-        
-        Has cache to store items
+
+        The fields for creating and for updating are built once per class
     """
 
-    def __init__(self, instance=None, data=empty, **kwargs):
-        super().__init__(instance, data, **kwargs)
+    def get_field_set(self) -> Any:
+        return 'update' if self.instance else 'create'
+
+    def build_field_prototypes(self) -> Dict[str, Field]:
+        fields = super().build_field_prototypes()
+
+        if self.instance:
+            for field in fields.values():
+                # the prototypes are new fields, the copies of each instance are made from their arguments
+                field.required = False
+                field._kwargs['required'] = False
+
+        return fields
 
-        if instance:
-            for field in self.fields.values():
-                if hasattr(field, 'required'):
-                    field.required = False
-    
 
 class CurrencySerializer(NoEditOrCreateModelSerializer):
 
@@ -59,6 +110,19 @@ class AccountTypeSerializer(NoEditOrCreateModelSerializer):
         fields = ('name', 'code')
 
 
+class AccountBalanceSerializer(NoEditOrCreateModelSerializer):
+    """Balance of an account, currency is null when the balance is in the user's currency"""
+    account_type = AccountTypeSerializer(read_only=True)
+    currency = CurrencySerializer(read_only=True)
+
+    class Meta:
+        model = Account
+        fields = (
+            'id', 'account_number', 'account_provider', 'account_type', 'currency', 'balance',
+            'last_balance_update', 'active'
+        )
+
+
 class UserSerializer(Cache, ModelSerializerRequiredFalsifiable):
     user_currency = CurrencySerializer(source='currency', required=False)
     currency = IntegerField(required=True, write_only=True)
@@ -73,26 +137,22 @@ class UserSerializer(Cache, ModelSerializerRequiredFalsifiable):
 
     def validate_currency(self, value):
         try:
-            self._cache.update({
-                'currency': Currency.objects.get(pk=value)
-            })
+            reference_data.get(Currency, pk=value)
         except ObjectDoesNotExist:
             raise ValidationError(_(f'No currency with id "{value}"'))
         return value
 
     def update_validated_data_with_currency(self, validated_data: Dict):
-        if currency := self._cache.get('currency'):
-            validated_data.update({'currency': currency})
-        else:
-            raise ObjectDoesNotExist(_('No currency found'))
-
+        validated_data.update({
+            'currency': reference_data.get(Currency, pk=validated_data.get('currency'))
+        })
         return validated_data
 
     @staticmethod
     def update_validated_data_with_password(data: Dict):
         if password := data.get('password'):
             data.update({
-                'password': make_password(password)
+                'password': password_hashing.run(make_password, password)
             })
         return data
 
@@ -117,7 +177,7 @@ class UserSerializer(Cache, ModelSerializerRequiredFalsifiable):
         return super().update(instance, validated_data)
 
 
-class AccountSerializer(Cache, NoEditModelSerializer, ModelSerializer):
+class AccountSerializer(Cache, NoEditModelSerializer, CachedFieldsModelSerializer):
     account_type = AccountTypeSerializer(read_only=True)
     account_type_code = CharField(max_length=10, write_only=True)
     user = UserSerializer(read_only=True)
@@ -133,21 +193,19 @@ class AccountSerializer(Cache, NoEditModelSerializer, ModelSerializer):
         validation_items = {
             'user': {
                 'field': 'user_id',
-                'query': lambda: User.objects.get(pk=validated_data.get("user_id")),
+                'query': lambda: self.get_user(validated_data),
                 'message': f'No user with ID {validated_data.get("user_id")}'
             },
             'account_type': {
                 'field': 'account_type_code',
-                'query': lambda: AccountType.objects.get(code=validated_data.get("account_type_code")),
+                'query': lambda: self.get_account_type(validated_data),
                 'message': f'No account type code {validated_data.get("account_type_code")}'
             }
         }
 
         for key, details in validation_items.items():
             try:
-                self._cache.update({
-                    key: details['query']()
-                })
+                details['query']()
             except ObjectDoesNotExist:
                 raise ValidationError({
                     details['field']: _(details['message'])
@@ -165,16 +223,22 @@ class AccountSerializer(Cache, NoEditModelSerializer, ModelSerializer):
 
         return validated_data
 
+    def get_user(self, validated_data: Dict) -> User:
+        return self.identity_map.get(User, pk=validated_data.get('user_id'))
+
+    def get_account_type(self, validated_data: Dict) -> AccountType:
+        return reference_data.get(AccountType, code=validated_data.get('account_type_code'))
+
     def create(self, validated_data: Dict):
         fields_replacements = {
-            'account_type_code': 'account_type',
-            'user_id': 'user'
+            'account_type_code': ('account_type', self.get_account_type),
+            'user_id': ('user', self.get_user)
         }
 
-        for write_key, field_key in fields_replacements.items():
-            if write_key in validated_data and field_key in self._cache:
+        for write_key, (field_key, query) in fields_replacements.items():
+            if write_key in validated_data:
                 validated_data.update({
-                    field_key: self._cache.get(field_key)
+                    field_key: query(validated_data)
                 })
                 validated_data.pop(write_key)
 
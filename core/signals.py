@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import CachedTokenAuthentication
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop a deleted token from authenticating, however it is deleted (logout, admin, user deletion)"""
+    CachedTokenAuthentication.forget(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_inactive_user_tokens(sender, instance, **kwargs):
+    """The cached token holds the user as it was read, a deactivated user is refused once it is read again"""
+    if not instance.is_active:
+        for key in Token.objects.filter(user=instance.pk).values_list('key', flat=True):
+            CachedTokenAuthentication.forget(key)
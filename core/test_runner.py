@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+        DiscoverRunner reading from the primary when the replica is a test mirror of it
+
+        Data of a TestCase is only seen through the primary's connection and a TestCase does not
+        allow queries to a mirror, the routing is tested against a replica of its own
+        (tyne_finance/test_settings.py)
+    """
+
+    @staticmethod
+    def mirrored_replica() -> bool:
+        replica = getattr(settings, 'READ_REPLICA_DATABASE', None)
+        return bool(replica and settings.DATABASES.get(replica, {}).get('TEST', {}).get('MIRROR'))
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._primary_reads = None
+
+        if self.mirrored_replica():
+            self._primary_reads = override_settings(READ_REPLICA_DATABASE=None)
+            self._primary_reads.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        if self._primary_reads is not None:
+            self._primary_reads.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import SimpleTestCase, override_settings
+
+from core.hashing import PasswordHashingBusy, PasswordHashingPool
+
+
+class PasswordHashingPoolTestCase(SimpleTestCase):
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE=1)
+    def test_bounded(self):
+        pool = PasswordHashingPool()
+        release = threading.Event()
+
+        running = pool.submit(release.wait)
+        waiting = pool.submit(make_password, 'test@123')
+        self.assertRaises(PasswordHashingBusy, pool.submit, make_password, 'test@123')
+
+        release.set()
+        running.result()
+        self.assertTrue(check_password('test@123', waiting.result()))
+
+        # slots are given back once hashes are done
+        self.assertTrue(check_password('test@123', pool.run(make_password, 'test@123')))
+        self.assertTrue(asyncio.run(pool.arun(check_password, 'test@123', waiting.result())))
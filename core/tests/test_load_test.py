@@ -0,0 +1,60 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from core.load_test import LoadResult, Target, run_load
+
+
+class LoadTestTestCase(SimpleTestCase):
+
+    def test_target(self):
+        target = Target('http://127.0.0.1:8001/expenses/?page_size=2', {'Authorization': 'Token x'})
+        self.assertEquals(('127.0.0.1', 8001), (target.host, target.port))
+        self.assertEquals(
+            b'GET /expenses/?page_size=2 HTTP/1.1\r\nHost: 127.0.0.1:8001\r\nConnection: close\r\n'
+            b'Authorization: Token x\r\n\r\n',
+            target.request
+        )
+        self.assertRaises(ValueError, Target, 'https://tfinance.io/')
+
+    def test_percentile(self):
+        result = LoadResult('', requests=10, elapsed=2, latencies=[i / 10 for i in range(10, 0, -1)])
+        self.assertEquals(5, result.throughput)
+        self.assertEquals((0.6, 1.0), (result.percentile(50), result.percentile(99)))
+
+    def test_run_load(self):
+        requests = []
+
+        async def handle(reader, writer):
+            try:
+                request = await reader.readuntil(b'\r\n\r\n')
+            except asyncio.IncompleteReadError:
+                # an idle client left without finishing its request
+                writer.close()
+                return
+            requests.append(request)
+            status = b'200 OK' if b'Token good' in request else b'401 Unauthorized'
+            writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: 2\r\n\r\n{}')
+            await writer.drain()
+            writer.close()
+
+        async def run(token: str):
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await run_load(
+                    Target(f'http://127.0.0.1:{port}/', {'Authorization': f'Token {token}'}),
+                    concurrency=3, duration=0.2, slow_clients=1, slow_delay=0.01, idle_clients=2
+                )
+
+        result = asyncio.run(run('good'))
+        self.assertGreater(result.requests, 0)
+        self.assertEquals((0, len(result.latencies)), (result.errors, result.requests))
+        self.assertGreater(result.slow_requests, 0)
+        self.assertEquals(result.requests + result.slow_requests, len(requests))
+
+        requests.clear()
+        result = asyncio.run(run('bad'))
+        self.assertEquals((0, 0), (result.requests, result.slow_requests))
+        # the slow clients' failures are errors too
+        self.assertEquals(len(requests), result.errors)
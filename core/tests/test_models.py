@@ -1,7 +1,9 @@
+from datetime import date
+
 from django.test import TestCase
 from django.db import IntegrityError
 
-from core.models import Currency, User, AccountType, Account
+from core.models import Currency, User, AccountType, Account, AccountBalanceSnapshot
 
 
 class CoreModelsTestCase(TestCase):
@@ -52,3 +54,18 @@ class CoreModelsTestCase(TestCase):
             }
         )
 
+    def test_account_str(self):
+        account = Account.objects.create(
+            account_type=AccountType.objects.create(name='Mobile Money', code='MNO'),
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+        )
+        self.assertEquals(repr(account), '<Account: tyne>')
+        self.assertEquals(str(account), 'Acc(tyne • 01 • Mobile Money • SAF)')
+
+        snapshot = AccountBalanceSnapshot.objects.create(
+            account=account, snapshot_date=date(2022, 3, 2), balance=150
+        )
+        self.assertEquals(repr(snapshot), '<AccountBalanceSnapshot: 2022-03-02 (150)>')
+        self.assertEquals(str(snapshot), f'Snapshot({account.pk} • 2022-03-02 • 150)')
@@ -0,0 +1,129 @@
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from core.models import Currency, User, AccountType, Account, ExchangeRate, CacheVersion
+from core.net_worth import convert, exchange_rates, net_worths
+
+
+class NetWorthTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.kes = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.usd = Currency.objects.create(country='United States', code='USD', symbol='$')
+        self.eur = Currency.objects.create(country='Germany', code='EUR', symbol='€')
+        self.user = User.objects.create(username='rih', email='rih@tfinance.io', currency=self.kes)
+        self.user_2 = User.objects.create(username='van', email='van@tfinance.io', currency=self.usd)
+        self.account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+
+        def account(user, number, balance, currency=None):
+            return Account.objects.create(
+                account_type=self.account_type, user=user, account_number=number, account_provider='SAF',
+                balance=balance, currency=currency
+            )
+
+        account(self.user, '01', 1000)
+        account(self.user, '02', 500, self.kes)
+        account(self.user, '03', 10, self.usd)
+        account(self.user, '04', 7, self.eur)
+        account(self.user_2, '05', 2600, self.kes)
+
+        # rates against USD
+        exchange_rates.load([
+            (date(2023, 1, 1), 'USD', Decimal(1)),
+            (date(2023, 1, 1), 'KES', Decimal('0.01')),
+            (date(2023, 2, 1), 'USD', Decimal(1)),
+            (date(2023, 2, 1), 'KES', Decimal('0.0065')),
+        ])
+
+    def test_net_worths(self):
+        with self.assertNumQueries(4):
+            # the version stamp of the rates after the load, the rate date, its rates and the balances
+            rih, van = net_worths(on=date(2023, 1, 15))
+
+        self.assertEquals('KES', rih.currency)
+        self.assertDictEqual({'EUR': 7, 'KES': 1500, 'USD': 10}, rih.balances)
+        self.assertEquals(Decimal('2500.00'), rih.total)
+        self.assertListEqual(['EUR'], rih.missing_rates)
+        self.assertEquals(('USD', Decimal('26.00'), []), (van.currency, van.total, van.missing_rates))
+
+        with self.assertNumQueries(1):
+            # rates of the day are in memory
+            van, = net_worths(Account.objects.filter(user=self.user_2), date(2023, 1, 15))
+        self.assertEquals(Decimal('26.00'), van.total)
+
+        van, = net_worths(Account.objects.filter(user=self.user_2), date(2023, 2, 1))
+        self.assertEquals(Decimal('16.90'), van.total)
+
+        # no rates yet
+        van, = net_worths(Account.objects.filter(user=self.user_2), date(2022, 12, 31))
+        self.assertEquals((Decimal('0.00'), ['KES']), (van.total, van.missing_rates))
+
+    def test_convert(self):
+        rates = {'USD': Decimal(1), 'KES': Decimal('0.01'), 'XXX': Decimal(0)}
+        self.assertEquals(Decimal(100), convert(1, 'USD', 'KES', rates))
+        self.assertEquals(Decimal(7), convert(7, 'XXX', 'XXX', rates))
+        self.assertIsNone(convert(1, 'USD', 'XXX', rates))
+        self.assertIsNone(convert(1, 'XXX', 'USD', rates))
+        self.assertIsNone(convert(1, 'EUR', 'USD', rates))
+
+    def test_rates(self):
+        self.assertEquals((None, {}), exchange_rates.rates_on(date(2022, 12, 31)))
+
+        rate_date, rates = exchange_rates.rates_on(date(2023, 3, 1))
+        self.assertEquals(date(2023, 2, 1), rate_date)
+        self.assertEquals(Decimal('0.0065'), rates['KES'])
+
+        with self.assertNumQueries(0):
+            exchange_rates.rates_on(date(2023, 3, 1))
+
+        # replacing a rate drops the rates in memory
+        exchange_rates.load([(date(2023, 2, 1), 'KES', Decimal('0.007'))])
+        self.assertEquals(4, ExchangeRate.objects.count())
+        self.assertEquals(Decimal('0.007'), exchange_rates.rates_on(date(2023, 3, 1))[1]['KES'])
+
+        # rates loaded by another process, the command or a worker, are seen once the check interval is over
+        ExchangeRate.objects.filter(code='KES', rate_date=date(2023, 2, 1)).update(rate=Decimal('0.008'))
+        CacheVersion.objects.filter(key='exchange-rates').update(version='other')
+        self.assertEquals(Decimal('0.007'), exchange_rates.rates_on(date(2023, 3, 1))[1]['KES'])
+        with override_settings(CACHE_VERSION_CHECK_INTERVAL=0):
+            self.assertEquals(Decimal('0.008'), exchange_rates.rates_on(date(2023, 3, 1))[1]['KES'])
+
+    def test_commands(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('date,code,rate\n2023-03-01,EUR,1.1\n2023-03-01,usd,1\n2023-03-01,KES,0.007\n')
+
+        try:
+            out = StringIO()
+            call_command('load_exchange_rates', file.name, stdout=out)
+            self.assertEquals('3 exchange rates loaded', out.getvalue().strip())
+        finally:
+            os.remove(file.name)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('date,code,rate\n2023-03-01,EUR,1.1\n2023-03-01,USD,0\n')
+
+        try:
+            with self.assertRaisesMessage(CommandError, 'line 3: the rate must be greater than 0'):
+                call_command('load_exchange_rates', file.name, stdout=StringIO())
+        finally:
+            os.remove(file.name)
+        self.assertRaises(ValueError, exchange_rates.load, [(date(2023, 3, 1), 'USD', Decimal(-1))])
+        self.assertEquals(Decimal(1), ExchangeRate.objects.get(code='USD', rate_date=date(2023, 3, 1)).rate)
+
+        out, err = StringIO(), StringIO()
+        call_command('net_worth_report', date='2023-03-02', stdout=out, stderr=err)
+        self.assertListEqual(
+            [
+                'user_id,username,currency,total,missing_rates',
+                f'{self.user.pk},rih,KES,4028.57,',
+                f'{self.user_2.pk},van,USD,18.20,',
+            ],
+            out.getvalue().splitlines()
+        )
+        self.assertEquals('2 users, exchange rates of 2023-03-01', err.getvalue().strip())
@@ -0,0 +1,46 @@
+from django.test import TestCase
+
+from core.models import Currency, User, AccountType, Account
+from core.optimizer import optimize_queryset, serializer_class_lookups
+from core.serializers import AccountSerializer, UserSerializer
+from expenses.serializers import ExpenseSerializer, TransactionSerializer
+
+
+class OptimizerTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+
+    def add_accounts(self, count: int):
+        start = Account.objects.count()
+        for number in range(start, start + count):
+            user = User.objects.create(username=f'u{number}', email=f'u{number}@tfinance.io', currency=self.currency)
+            Account.objects.create(
+                account_type=self.account_type, user=user, account_number=f'{number}', account_provider='SAF'
+            )
+
+    def test_lookups(self):
+        self.assertTupleEqual(('currency',), serializer_class_lookups(UserSerializer).select)
+        self.assertTupleEqual(
+            ('account_type', 'user__currency'), serializer_class_lookups(AccountSerializer).select
+        )
+        self.assertTupleEqual(
+            ('account__account_type', 'account__user__currency'),
+            serializer_class_lookups(TransactionSerializer).select
+        )
+
+        lookups = serializer_class_lookups(ExpenseSerializer)
+        self.assertTupleEqual(('user__currency',), lookups.select)
+        self.assertListEqual(['tags'], [path for path, _, _ in lookups.prefetch])
+
+    def test_constant_queries(self):
+        for count in (1, 5):
+            self.add_accounts(count)
+
+            with self.assertNumQueries(1):
+                data = AccountSerializer(optimize_queryset(Account.objects.all(), AccountSerializer), many=True).data
+            self.assertEquals(Account.objects.count(), len(data))
+
+            with self.assertNumQueries(1):
+                UserSerializer(optimize_queryset(User.objects.all(), UserSerializer), many=True).data
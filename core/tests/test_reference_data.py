@@ -0,0 +1,61 @@
+from django.test import TestCase, override_settings
+
+from core.models import Currency, AccountType, CacheVersion
+from core.reference_data import reference_data
+from core.serializers import UserSerializer
+
+
+class ReferenceDataTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.currency_2 = Currency.objects.create(country='Ecuador', code='USD', symbol='$')
+        self.currency_3 = Currency.objects.create(country='United States', code='USD', symbol='$')
+        self.account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+
+    def test_lookups(self):
+        # the version stamp and the table
+        with self.assertNumQueries(2):
+            self.assertEquals(self.currency, reference_data.get(Currency, pk=self.currency.pk))
+            self.assertEquals(self.currency, reference_data.get(Currency, code='KES'))
+            self.assertEquals(3, len(reference_data.all(Currency)))
+
+        with self.assertNumQueries(0):
+            self.assertIs(reference_data.get(Currency, pk=self.currency.pk), reference_data.get(Currency, code='KES'))
+            self.assertRaises(Currency.MultipleObjectsReturned, reference_data.get, Currency, code='USD')
+            self.assertRaises(Currency.DoesNotExist, reference_data.get, Currency, pk=9000)
+            self.assertRaises(Currency.DoesNotExist, reference_data.get, Currency, code='XXX')
+
+        with self.assertNumQueries(2):
+            self.assertEquals(self.account_type, reference_data.get(AccountType, code='MNO'))
+
+    def test_invalidation(self):
+        reference_data.get(Currency, pk=self.currency.pk)
+
+        self.currency.symbol = 'KSh'
+        self.currency.save()
+        with self.assertNumQueries(2):
+            self.assertEquals('KSh', reference_data.get(Currency, pk=self.currency.pk).symbol)
+
+        self.currency_3.delete()
+        self.assertEquals(self.currency_2, reference_data.get(Currency, code='USD'))
+
+        # another process changing the table writes a new stamp in the database,
+        # seen once the check interval is over
+        CacheVersion.objects.filter(key='reference-data:core.Currency').update(version='other')
+        with self.assertNumQueries(0):
+            reference_data.get(Currency, pk=self.currency.pk)
+
+        # the stamp, again once the lock is held, and the table
+        with override_settings(CACHE_VERSION_CHECK_INTERVAL=0), self.assertNumQueries(3):
+            reference_data.get(Currency, pk=self.currency.pk)
+
+    def test_serializer(self):
+        reference_data.get(Currency, pk=self.currency.pk)
+
+        # only the username uniqueness check
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                UserSerializer(data={'username': 'big', 'password': '12345', 'currency': self.currency.pk}).is_valid()
+            )
+        self.assertFalse(UserSerializer(data={'username': 'bog', 'password': '12345', 'currency': 9000}).is_valid())
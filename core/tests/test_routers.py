@@ -0,0 +1,144 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.middleware import read_only_middleware
+from core.models import Currency, User, AccountType, Account
+from core.routers import ReplicaRouter, primary, read_only_scope
+from core.test_runner import TestRunner
+from expenses.models import Transaction
+
+
+@override_settings(READ_REPLICA_DATABASE='replica')
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def test_scopes(self):
+        self.assertEquals(DEFAULT_DB_ALIAS, Account.objects.all().db)
+
+        with read_only_scope():
+            self.assertEquals('replica', Account.objects.all().db)
+
+            with primary():
+                self.assertEquals(DEFAULT_DB_ALIAS, Account.objects.all().db)
+
+            # reads after a write see it
+            self.assertEquals(DEFAULT_DB_ALIAS, Account.objects.select_for_update().db)
+            self.assertEquals(DEFAULT_DB_ALIAS, Account.objects.all().db)
+
+            with read_only_scope():
+                self.assertEquals('replica', Account.objects.all().db)
+
+        self.assertEquals(DEFAULT_DB_ALIAS, Account.objects.all().db)
+
+        with override_settings(READ_REPLICA_DATABASE=None), read_only_scope():
+            self.assertEquals(DEFAULT_DB_ALIAS, Account.objects.all().db)
+
+    def test_instances_read_from_the_replica(self):
+        account = Account(pk=1)
+        account._state.db = 'replica'
+        router = ReplicaRouter()
+
+        self.assertEquals(DEFAULT_DB_ALIAS, router.db_for_write(Account, instance=account))
+        self.assertEquals(DEFAULT_DB_ALIAS, router.db_for_read(Transaction, instance=account))
+        transaction = Transaction()
+        transaction._state.db = DEFAULT_DB_ALIAS
+        self.assertTrue(router.allow_relation(account, transaction))
+
+        other = Account(pk=2)
+        other._state.db = 'other'
+        self.assertIsNone(router.allow_relation(account, other))
+
+    def test_mirrored_replica(self):
+        # the test runner reads from the primary when the replica is only a mirror of it in tests
+        default = settings.DATABASES['default']
+        with override_settings(DATABASES={'default': default, 'replica': {**default, 'TEST': {}}}):
+            self.assertFalse(TestRunner.mirrored_replica())
+        with override_settings(DATABASES={'default': default, 'replica': {**default, 'TEST': {'MIRROR': 'default'}}}):
+            self.assertTrue(TestRunner.mirrored_replica())
+
+    def test_middleware(self):
+        def get_response(request):
+            return Account.objects.all().db
+
+        middleware = read_only_middleware(get_response)
+        self.assertEquals('replica', middleware(RequestFactory().get('/')))
+        self.assertEquals(DEFAULT_DB_ALIAS, middleware(RequestFactory().post('/')))
+
+
+# a replica of its own, a test mirror is the primary under another name
+REPLICA = 'replica' if (
+    'replica' in settings.DATABASES and not settings.DATABASES['replica'].get('TEST', {}).get('MIRROR')
+) else None
+
+
+@skipUnless(REPLICA, 'needs a replica database of its own, run with --settings=tyne_finance.test_settings')
+@override_settings(READ_REPLICA_DATABASE=REPLICA)
+class ReplicaRoutingTestCase(TransactionTestCase):
+    """The replica lags: the token and the latest balance are only on the primary"""
+    databases = {DEFAULT_DB_ALIAS, REPLICA or DEFAULT_DB_ALIAS}
+
+    def setUp(self) -> None:
+        for alias, balance in ((DEFAULT_DB_ALIAS, 100), (settings.READ_REPLICA_DATABASE, 50)):
+            currency = Currency.objects.using(alias).create(pk=1, country='Kenya', code='KES', symbol='Ksh')
+            user = User.objects.using(alias).create(pk=1, username='rih', email='rih@tfinance.io', currency=currency)
+            Account.objects.using(alias).create(
+                pk=1,
+                account_type=AccountType.objects.using(alias).create(pk=1, name='Mobile Money', code='MNO'),
+                user=user,
+                account_number='01',
+                account_provider='SAF',
+                active=True,
+                balance=balance
+            )
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {User.objects.get(pk=1).get_user_auth_token().key}')
+
+    def test_get_reads_the_replica(self):
+        req = self.client.get('/core/accounts/balances/')
+        self.assertEquals(200, req.status_code)
+        self.assertEquals(50, req.json()['accounts'][0]['balance'])
+
+        Transaction.objects.using(settings.READ_REPLICA_DATABASE).create(account_id=1, transaction_type='CD', amount=7)
+        req = self.client.get('/expenses/accounts/1/transactions/')
+        self.assertListEqual([7], [tr['amount'] for tr in req.json()['transactions']])
+        self.assertIn('7', self.client.get('/expenses/export/transactions/').getvalue().decode())
+
+        out = StringIO()
+        call_command('export_ledger', 'transactions', stdout=out)
+        self.assertEquals(2, len(out.getvalue().splitlines()))
+
+    def test_writes_go_to_the_primary(self):
+        req = self.client.post('/expenses/transactions/bulk/', [
+            {'transaction_type': 'CD', 'amount': 10, 'account_id': 1},
+        ], format='json')
+        self.assertEquals(201, req.status_code)
+        self.assertEquals(110, Account.objects.get(pk=1).balance)
+        self.assertEquals(50, Account.objects.using(settings.READ_REPLICA_DATABASE).get(pk=1).balance)
+
+    def test_read_after_write(self):
+        with read_only_scope():
+            self.assertEquals(50, Account.objects.get(pk=1).balance)
+            Transaction.objects.create(account_id=1, transaction_type='CD', amount=10)
+            self.assertEquals(110, Account.objects.get(pk=1).balance)
+
+    def test_balances_move_on_the_database_written_to(self):
+        def balances():
+            return [Account.objects.using(alias).get(pk=1).balance for alias in (DEFAULT_DB_ALIAS, REPLICA)]
+
+        Transaction.objects.create(account_id=1, transaction_type='CD', amount=10)
+        Transaction.objects.using(REPLICA).create(account_id=1, transaction_type='CD', amount=3)
+        self.assertEquals([110, 53], balances())
+
+        Transaction.objects.using(REPLICA).all().delete()
+        self.assertEquals([110, 50], balances())
+
+        # the reversals are read from the primary the rows are deleted from
+        with read_only_scope():
+            Transaction.objects.all().delete()
+        self.assertEquals([100, 50], balances())
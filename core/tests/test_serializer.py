@@ -1,10 +1,13 @@
+from unittest import mock
+
 from django.test import TestCase
 from django.core.exceptions import PermissionDenied
 
+from core.identity_map import identity_map_scope
 from core.utils import DateTimeFormatter
 from core.models import Currency, User, Account, AccountType
 from core.serializers import CurrencySerializer, NoEditOrCreateModelSerializer, AccountTypeSerializer, UserSerializer, \
-    AccountSerializer
+    AccountSerializer, CachedFieldsModelSerializer
 
 
 class CoreSerializerTestCase(DateTimeFormatter, TestCase):
@@ -137,6 +140,7 @@ class CoreSerializerTestCase(DateTimeFormatter, TestCase):
                 'balance': 0,
                 'last_balance_update': None,
                 'active': False,
+                'currency': None,
             }
         )
 
@@ -192,3 +196,49 @@ class CoreSerializerTestCase(DateTimeFormatter, TestCase):
             {},
             {}
         )
+
+    def test_identity_map(self):
+        accounts = [
+            {
+                'account_number': number,
+                'account_provider': 'AIRTEL',
+                'account_type_code': self.account_type.code,
+                'user_id': self.user.pk
+            } for number in ('02', '03', '04')
+        ]
+        acc = AccountSerializer(data=accounts, many=True)
+
+        # the user is fetched once for the whole list, the account types are read once into the reference data
+        # with their version stamp, plus one uniqueness check per account
+        with self.assertNumQueries(3 + 3):
+            self.assertTrue(acc.is_valid())
+
+        self.assertEquals(len(acc.child.identity_map), 1)
+        self.assertEquals(len(acc.save()), 3)
+
+        # nothing is carried over to the next serializer
+        self.assertEquals(len(AccountSerializer(data=accounts[0]).identity_map), 0)
+
+        # one map for the whole request
+        with identity_map_scope() as identity_map:
+            UserSerializer(data={'username': 'big', 'password': '12345', 'currency': self.currency.pk}).is_valid()
+            with self.assertNumQueries(1):
+                UserSerializer(data={'username': 'bog', 'password': '12345', 'currency': self.currency.pk}).is_valid()
+            self.assertIs(UserSerializer().identity_map, identity_map)
+
+    def test_cached_fields(self):
+        CachedFieldsModelSerializer._field_prototypes.clear()
+
+        with mock.patch.object(UserSerializer, 'build_field', wraps=UserSerializer().build_field) as build_field:
+            create, create_2 = UserSerializer().fields, UserSerializer().fields
+            update, update_2 = UserSerializer(self.user).fields, UserSerializer(self.user).fields
+
+        # the model fields are built once for creating and once for updating
+        self.assertEquals(2 * 6, build_field.call_count)
+
+        self.assertTrue(create['username'].required)
+        self.assertFalse(update['username'].required)
+        self.assertFalse(update_2['user_currency'].required)
+        self.assertIsNot(create['username'], create_2['username'])
+        self.assertIsNot(update['user_currency'], update_2['user_currency'])
+        self.assertIs(update_2['user_currency'].parent, update_2.serializer)
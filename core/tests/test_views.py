@@ -1,8 +1,20 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import RequestFactory, TestCase, override_settings
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.test import APIClient
 
+from core.authentication import CachedTokenAuthentication, PooledHashingModelBackend
+from core.hashing import PasswordHashingBusy, password_hashing
 from core.models import Currency, User, AccountType, Account
+from core.net_worth import exchange_rates
+from core.throttling import LoginThrottle
 
 
 class CoreViewsTestCaseNoAuth(TestCase):
@@ -34,9 +46,12 @@ class CoreViewsTestCaseNoAuth(TestCase):
             account_provider='SAF',
         )
         self.client = APIClient()
+        LoginThrottle.cache().clear()
 
     def test_login_view(self):
         self.assertEquals(400, self.client.post('/core/auth/login/').status_code)
+        for data in ({'username': 123, 'password': 'x'}, {'username': 'rih', 'password': ['test@123']}):
+            self.assertEquals(400, self.client.post('/core/auth/login/', data, format='json').status_code)
 
         self.assertEquals(
             401,
@@ -56,6 +71,19 @@ class CoreViewsTestCaseNoAuth(TestCase):
         self.user.refresh_from_db(fields=['last_login'])
         self.assertIsNotNone(self.user.last_login)
 
+    def test_login_queries(self):
+        self.client.credentials()
+        Token.objects.filter(user=self.user).delete()
+
+        # user with currency, last_login and the token (created in a savepoint on the first login)
+        with self.assertNumQueries(1 + 1 + (1 + 3)):
+            req = self.client.post('/core/auth/login/', {'username': 'rih', 'password': 'test@123'})
+        self.assertEquals('BBD', req.json().get('user').get('user_currency').get('code'))
+
+        with self.assertNumQueries(3):
+            token = self.client.post('/core/auth/login/', {'username': 'rih', 'password': 'test@123'}).json()['token']
+        self.assertEquals(req.json().get('token'), token)
+
     def test_sign_up(self):
         req = self.client.post('/core/auth/sign-up/')
         self.assertEquals(400, req.status_code)
@@ -71,6 +99,70 @@ class CoreViewsTestCaseNoAuth(TestCase):
         self.assertTrue('user' in req.json())
         self.assertTrue('token' in req.json())
 
+    @override_settings(LOGIN_THROTTLE_RATES={'username': (2, 60), 'ip': (6, 300)})
+    def test_login_throttle(self):
+        def login(username, password='test@123'):
+            return self.client.post('/core/auth/login/', {'username': username, 'password': password})
+
+        self.assertEquals(401, login('rih', 'nope').status_code)
+        # a successful login starts the failures of the username over
+        self.assertEquals(200, login('rih').status_code)
+        self.assertEquals(401, login('rih', 'nope').status_code)
+        self.assertEquals(401, login('RIH', 'nope').status_code)
+
+        with patch.object(PooledHashingModelBackend, 'check') as check:
+            req = login('rih')
+            check.assert_not_called()
+        self.assertEquals((429, '60'), (req.status_code, req['Retry-After']))
+        self.assertEquals(401, login('van', 'nope').status_code)
+
+        # every attempt counts for the IP, the refused ones too
+        req = login('nobody')
+        self.assertEquals((429, '300'), (req.status_code, req['Retry-After']))
+
+    @override_settings(LOGIN_THROTTLE_RATES={'username': (2, 60), 'ip': (100, 60)})
+    def test_login_throttle_counts_first(self):
+        request = RequestFactory().post('/core/auth/login/')
+
+        # attempts still being checked count, parallel attempts can not all get under the limit
+        throttles = [LoginThrottle(request, 'rih') for _ in range(3)]
+        self.assertListEqual([True, True, False], [throttle.allow() for throttle in throttles])
+        self.assertEquals('username', throttles[2].exceeded)
+
+    def test_password_hashing_busy(self):
+        with patch.object(password_hashing, 'submit', side_effect=PasswordHashingBusy):
+            req = self.client.post('/core/auth/login/', {'username': 'rih', 'password': 'test@123'})
+            self.assertEquals((503, '1'), (req.status_code, req['Retry-After']))
+
+            req = self.client.post(
+                '/core/auth/sign-up/',
+                {'username': 'jim', 'password': 'test@123', 'currency': self.currency.pk}
+            )
+            self.assertEquals(503, req.status_code)
+            self.assertFalse(User.objects.filter(username='jim').exists())
+
+    async def test_async_login(self):
+        url = '/core/auth/login/async/'
+        self.assertEquals(400, (await self.async_client.post(url)).status_code)
+        self.assertEquals(405, (await self.async_client.get(url)).status_code)
+        req = await self.async_client.post(url, {'username': 123, 'password': 'x'}, content_type='application/json')
+        self.assertEquals(400, req.status_code)
+
+        req = await self.async_client.post(url, {'username': 'rih', 'password': 'nope'}, content_type='application/json')
+        self.assertEquals(401, req.status_code)
+        req = await self.async_client.post(url, {'username': 'van', 'password': 'test@123'})
+        self.assertEquals(401, req.status_code)
+
+        req = await self.async_client.post(url, {'username': 'rih', 'password': 'test@123'}, content_type='application/json')
+        self.assertEquals(200, req.status_code)
+        self.assertEquals('BBD', req.json()['user']['user_currency']['code'])
+        self.assertTrue(await Token.objects.filter(key=req.json()['token'], user=self.user).aexists())
+        await self.user.arefresh_from_db(fields=['last_login'])
+        self.assertIsNotNone(self.user.last_login)
+
+        with override_settings(LOGIN_THROTTLE_RATES={'username': (10, 60), 'ip': (0, 60)}):
+            self.assertEquals(429, (await self.async_client.post(url, {'username': 'rih', 'password': 'x'})).status_code)
+
 
 class CoreViewsTestCase(CoreViewsTestCaseNoAuth):
 
@@ -82,6 +174,8 @@ class CoreViewsTestCase(CoreViewsTestCaseNoAuth):
         self.assertTrue(Token.objects.filter(user=self.user).exists())
         self.assertEquals(200, self.client.post('/core/auth/logout/').status_code)
         self.assertFalse(Token.objects.filter(user=self.user).exists())
+        # the cached token is forgotten too
+        self.assertEquals(401, self.client.post('/core/auth/logout/').status_code)
 
     def test_refresh_token(self):
         pv_tk = self.user.get_user_auth_token()
@@ -89,3 +183,70 @@ class CoreViewsTestCase(CoreViewsTestCaseNoAuth):
         self.assertEquals(200, req.status_code)
         self.assertNotEquals(pv_tk.key, req.json().get('token'))
         self.assertFalse(Token.objects.filter(pk=pv_tk.pk).exists())
+        self.assertEquals(401, self.client.post('/core/auth/refresh-token/').status_code)
+
+    def test_cached_token_authentication(self):
+        key = self.user.get_user_auth_token().key
+        authentication = CachedTokenAuthentication()
+
+        with self.assertNumQueries(1):
+            user, token = authentication.authenticate_credentials(key)
+        with self.assertNumQueries(0):
+            self.assertEquals((user, token), authentication.authenticate_credentials(key))
+        self.assertEquals(self.user, user)
+
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials('nope')
+
+        # deleted from anywhere, not only by logout
+        Token.objects.filter(key=key).delete()
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials(key)
+
+        key = self.user.get_user_auth_token().key
+        authentication.authenticate_credentials(key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaisesMessage(AuthenticationFailed, 'User inactive or deleted.'):
+            authentication.authenticate_credentials(key)
+
+        self.user.is_active = True
+        self.user.save()
+        authentication.authenticate_credentials(key)
+        self.user.delete()
+        with self.assertRaisesMessage(AuthenticationFailed, 'Invalid token.'):
+            authentication.authenticate_credentials(key)
+
+    def test_cached_token_timeout(self):
+        # a per-process cache keeps a token deleted by another worker working until it expires
+        cache = CachedTokenAuthentication.cache()
+        if isinstance(cache, LocMemCache):
+            self.assertLessEqual(cache.default_timeout, settings.CACHE_VERSION_CHECK_INTERVAL)
+
+    def test_net_worth(self):
+        usd = Currency.objects.create(country='United States', code='USD', symbol='$')
+        Account.objects.create(
+            account_type=self.account_type, user=self.user, account_number='02', account_provider='BNK',
+            balance=10, currency=usd
+        )
+        Account.objects.filter(pk=self.account.pk).update(balance=300)
+        exchange_rates.load([(date(2023, 1, 1), 'USD', Decimal(1)), (date(2023, 1, 1), 'BBD', Decimal('0.5'))])
+
+        self.assertEquals(400, self.client.get('/core/net-worth/', {'date': '01-01-2023'}).status_code)
+
+        req = self.client.get('/core/net-worth/', {'date': '2023-01-02'})
+        self.assertEquals(200, req.status_code)
+        self.assertDictEqual(
+            {
+                'success': True,
+                'currency': 'BBD',
+                'total': '320.00',
+                'balances': [{'currency': 'BBD', 'balance': 300}, {'currency': 'USD', 'balance': 10}],
+                'missing_rates': [],
+                'rates_date': '2023-01-01'
+            },
+            req.json()
+        )
+
+        req = self.client.get('/core/net-worth/', {'date': '2022-12-31'})
+        self.assertEquals(('300.00', ['USD'], None), tuple(req.json()[key] for key in ('total', 'missing_rates', 'rates_date')))
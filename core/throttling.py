@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+class LoginThrottle:
+    """
+        Counts logins per IP and failed logins per username in fixed windows
+        (LOGIN_THROTTLE_RATES), kept in the LOGIN_THROTTLE_CACHE cache
+
+        Check `allow` before authenticating so attempts over the limits never reach the
+        password hasher, then call `succeeded` when the password was right.
+        An attempt is counted before it is checked, as a failure for the username until it
+        succeeds, so parallel attempts can not all get in under the limit.
+        The cache is in local memory, its calls do not block async views
+    """
+
+    def __init__(self, request, username: str):
+        self.keys = {
+            'username': f'login:username:{username.lower()}',
+            # X-Forwarded-For is used as DRF throttles use it, following NUM_PROXIES
+            'ip': f'login:ip:{BaseThrottle().get_ident(request)}',
+        }
+        # scope of the limit the attempt went over
+        self.exceeded = None
+
+    @staticmethod
+    def cache():
+        return caches[settings.LOGIN_THROTTLE_CACHE]
+
+    def count(self, scope: str) -> int:
+        """Count an attempt in the window of `scope`, the attempts of the window with this one"""
+        _, window = settings.LOGIN_THROTTLE_RATES[scope]
+        # add starts the window, incr keeps its expiry
+        if self.cache().add(self.keys[scope], 1, window):
+            return 1
+        try:
+            return self.cache().incr(self.keys[scope])
+        except ValueError:
+            # expired in between
+            self.cache().add(self.keys[scope], 1, window)
+            return 1
+
+    def allow(self) -> bool:
+        """Whether this attempt may go ahead, it is counted for the IP and the username first"""
+        for scope in ('ip', 'username'):
+            limit, _ = settings.LOGIN_THROTTLE_RATES[scope]
+            if self.count(scope) > limit:
+                self.exceeded = scope
+                return False
+
+        return True
+
+    def succeeded(self):
+        self.cache().delete(self.keys['username'])
+
+    def retry_after(self) -> int:
+        """Seconds until the window of the limit that was exceeded has started over, at most"""
+        return settings.LOGIN_THROTTLE_RATES[self.exceeded][1]
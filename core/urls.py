@@ -1,15 +1,21 @@
 from django.urls import path
 
-from .views import auth
+from .views import accounts, auth, reports
 
 app_name = "core"
 
 
 urlpatterns = [
 
+    # accounts/balances/
+    path('accounts/balances/', accounts.balances, name='balances'),
+
     # auth/login/
     path('auth/login/', auth.login, name='sign-in'),
 
+    # auth/login/async/
+    path('auth/login/async/', auth.alogin, name='sign-in-async'),
+
     # auth/logout/
     path('auth/logout/', auth.logout, name='sign-out'),
 
@@ -18,4 +24,7 @@ urlpatterns = [
 
     # auth/sign-up/
     path('auth/sign-up/', auth.sign_up, name='sign-up'),
+
+    # net-worth/
+    path('net-worth/', reports.net_worth, name='net-worth'),
 ]
@@ -1,5 +1,5 @@
 from typing import Any
-from datetime import date, datetime
+from datetime import date, datetime, time
 
 from django.utils import timezone
 
@@ -20,6 +20,11 @@ class DateTimeFormatter:
         ).strftime("%Y-%m-%dT%H:%M:%S.%f%z")
         return f'{dt[:-2]}:{dt[-2:]}'
 
+    @staticmethod
+    def day_start(day: date) -> datetime:
+        """Midnight at the start of `day` in the current timezone"""
+        return timezone.make_aware(datetime.combine(day, time.min))
+
     @staticmethod
     def make_date(value: Any) -> date:
         if type(value) == datetime:
@@ -0,0 +1,24 @@
+from django.http import JsonResponse
+from rest_framework import status
+
+from core.decorators import async_api_view
+from core.fast_serializers import FastSerializer
+from core.models import Account
+from core.serializers import AccountBalanceSerializer
+
+
+async def account_balances(user) -> list:
+    return await FastSerializer.for_class(AccountBalanceSerializer).aserialize(
+        Account.objects.filter(user=user).order_by('pk')
+    )
+
+
+@async_api_view(['GET'])
+async def balances(request):
+    """
+        Balances of the user's accounts, async
+    """
+    return JsonResponse({
+        'success': True,
+        'accounts': await account_balances(request.user)
+    }, status=status.HTTP_200_OK)
@@ -1,3 +1,7 @@
+import json
+from typing import Dict
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate
 from django.http import JsonResponse
 from django.utils import timezone
@@ -5,8 +9,47 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
 
+from core.authentication import PooledHashingModelBackend
+from core.decorators import async_api_view
+from core.hashing import PasswordHashingBusy
 from core.models import User
 from core.serializers import UserSerializer
+from core.throttling import LoginThrottle
+
+
+def throttled_response(throttle: LoginThrottle) -> JsonResponse:
+    response = JsonResponse({
+        'success': False,
+        'message': 'Too many login attempts, try again later'
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = throttle.retry_after()
+    return response
+
+
+def busy_response() -> JsonResponse:
+    response = JsonResponse({
+        'success': False,
+        'message': 'Too many requests at the moment, try again shortly'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = 1
+    return response
+
+
+def login_data(request) -> Dict:
+    """The body of an async login request, JSON or a form"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+def credential(data, field: str) -> str | None:
+    """A login field of the request, None when it is missing, empty or not a string (a JSON number)"""
+    value = data.get(field)
+    return value if isinstance(value, str) and value else None
 
 
 @api_view(['POST'])
@@ -20,13 +63,21 @@ def login(request):
     resp = {'message': 'username and password required', 'success': False}
     status_code = status.HTTP_400_BAD_REQUEST
 
-    if username := request.data.get('username'):
-        if password := request.data.get('password'):
-            authenticated_user: User | None = authenticate(username=username, password=password)
+    if username := credential(request.data, 'username'):
+        if password := credential(request.data, 'password'):
+            throttle = LoginThrottle(request, username)
+            if not throttle.allow():
+                return throttled_response(throttle)
+
+            try:
+                authenticated_user: User | None = authenticate(request, username=username, password=password)
+            except PasswordHashingBusy:
+                return busy_response()
 
             if authenticated_user:
+                throttle.succeeded()
                 authenticated_user.last_login = timezone.now()
-                authenticated_user.save()
+                authenticated_user.save(update_fields=['last_login'])
                 status_code = status.HTTP_200_OK
                 resp.update({
                     'message': 'user found',
@@ -42,6 +93,48 @@ def login(request):
     return JsonResponse(resp, status=status_code)
 
 
+@async_api_view(['POST'], authenticated=False)
+async def alogin(request):
+    """
+        login, async: the event loop keeps serving other requests while the password is hashed
+    """
+    resp = {'message': 'username and password required', 'success': False}
+    status_code = status.HTTP_400_BAD_REQUEST
+    data = login_data(request)
+
+    if username := credential(data, 'username'):
+        if password := credential(data, 'password'):
+            throttle = LoginThrottle(request, username)
+            if not throttle.allow():
+                return throttled_response(throttle)
+
+            try:
+                authenticated_user: User | None = await PooledHashingModelBackend().aauthenticate(
+                    request, username=username, password=password
+                )
+            except PasswordHashingBusy:
+                return busy_response()
+
+            if authenticated_user:
+                throttle.succeeded()
+                authenticated_user.last_login = timezone.now()
+                await authenticated_user.asave(update_fields=['last_login'])
+                token, _ = await Token.objects.aget_or_create(user=authenticated_user)
+                status_code = status.HTTP_200_OK
+                resp.update({
+                    'message': 'user found',
+                    'success': True,
+                    'token': token.key,
+                    'user': await sync_to_async(lambda: UserSerializer(authenticated_user).data)()
+                })
+
+            else:
+                resp.update({'message': 'Incorrect username or password'})
+                status_code = status.HTTP_401_UNAUTHORIZED
+
+    return JsonResponse(resp, status=status_code)
+
+
 @api_view(['POST'])
 def logout(request):
     """
@@ -72,9 +165,13 @@ def sign_up(request):
     user_ser = UserSerializer(data=request.data)
 
     if user_ser.is_valid():
-        user: User = user_ser.save()
+        try:
+            user: User = user_ser.save()
+        except PasswordHashingBusy:
+            return busy_response()
+
         user.last_login = timezone.now()
-        user.save()
+        user.save(update_fields=['last_login'])
         return JsonResponse({
             'success': True,
             'user': UserSerializer(user).data,
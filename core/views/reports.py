@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view
+
+from core.models import Account
+from core.net_worth import NetWorth, exchange_rates, net_worths
+
+
+@api_view(['GET'])
+def net_worth(request):
+    """
+        Balances of the user's accounts added up in the user's currency
+        optional query param: date (YYYY-MM-DD), the exchange rates of that day, today by default
+    """
+    on = timezone.localdate()
+
+    if value := request.GET.get('date'):
+        try:
+            on = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'message': 'Use the format YYYY-MM-DD for the date'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    worth = next(net_worths(Account.objects.filter(user=request.user), on), None)
+
+    if worth is None:
+        # no accounts
+        worth = NetWorth(request.user.pk, request.user.username, getattr(request.user.currency, 'code', None))
+
+    return JsonResponse({
+        'success': True,
+        'currency': worth.currency,
+        'total': worth.total,
+        'balances': [{'currency': code, 'balance': balance} for code, balance in worth.balances.items()],
+        'missing_rates': worth.missing_rates,
+        'rates_date': exchange_rates.rates_on(on)[0]
+    }, status=status.HTTP_200_OK)
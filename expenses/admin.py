@@ -74,7 +74,7 @@ class PaymentModelAdmin(ModelAdminWithoutAccountFormFieldExtras):
         ),
         (
             'Payment Dates', {
-                'fields': ['renewal_date', 'start_date', 'end_date']
+                'fields': ['renewal_date', 'start_date', 'end_date', 'last_renewed_on', 'next_renewal_on']
             }
         ),
         (
@@ -83,9 +83,9 @@ class PaymentModelAdmin(ModelAdminWithoutAccountFormFieldExtras):
             }
         )
     ]
-    readonly_fields = ['date_added', 'date_modified', 'renewal_count']
+    readonly_fields = ['date_added', 'date_modified', 'renewal_count', 'last_renewed_on', 'next_renewal_on']
     list_filter = ['start_date', 'tags']
-    list_display = ['pk', 'start_date', 'renewal_count', 'is_annual', 'amount']
+    list_display = ['pk', 'start_date', 'next_renewal_on', 'renewal_count', 'is_annual', 'amount']
     list_display_links = ['pk', 'start_date']
     actions = None
 
@@ -107,7 +107,8 @@ class TransactionModelAdmin(ModelAdminWithoutAccountFormFieldExtras):
     readonly_fields = ('transaction_date', 'automatic')
     list_display = ['id', 'transaction_date', 'transaction_type', 'amount', 'transaction_charge', 'get_account_name', 'automatic']
     list_filter = ['transaction_type', 'automatic']
-    actions = None
+    # only delete_selected, it goes through TransactionQuerySet.delete and reverses the balances
+    actions = []
 
     def get_account_name(self, obj: Transaction):
         return f'{obj.account.account_number} • {obj.account.account_provider}'
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ExpensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expenses'
+
+    def ready(self):
+        from core.reference_data import reference_data
+        from . import signals  # noqa: F401
+        from .models import UsageTag
+
+        reference_data.register(UsageTag)
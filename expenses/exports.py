@@ -0,0 +1,121 @@
+import csv
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from core.utils import DateTimeFormatter
+from .models import Expense, Transaction
+
+TRANSACTION_COLUMNS = (
+    'id', 'transaction_date', 'transaction_type', 'amount', 'transaction_charge', 'automatic',
+    'transaction_for', 'transaction_for_id', 'account_id', 'account_number', 'account_provider'
+)
+EXPENSE_COLUMNS = ('id', 'date_occurred', 'amount', 'planned', 'narration', 'tags', 'date_created')
+
+
+class Echo:
+    """File-like object that hands back what is written, for csv.writer"""
+
+    @staticmethod
+    def write(value):
+        return value
+
+
+def chunks(queryset: QuerySet, fields: Sequence[str], chunk_size: int) -> Iterator[List[Dict]]:
+    """
+        values() rows of `queryset` in id order, `chunk_size` rows per query
+
+        Every chunk is read from where the last one ended, so only one chunk is in
+        memory whatever the database driver does with large result sets
+    """
+    queryset = queryset.order_by('pk').values(*fields)
+    last_pk = 0
+
+    while rows := list(queryset.filter(pk__gt=last_pk)[:chunk_size]):
+        last_pk = rows[-1]['id']
+        yield rows
+
+        if len(rows) < chunk_size:
+            break
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def transaction_rows(queryset: QuerySet = None, chunk_size: int = 2000) -> Iterator[Dict]:
+    queryset = Transaction.objects.all() if queryset is None else queryset
+    fields = (*TRANSACTION_COLUMNS[:-2], 'account__account_number', 'account__account_provider')
+
+    for rows in chunks(queryset, fields, chunk_size):
+        for row in rows:
+            yield {column: export_value(row[field]) for column, field in zip(TRANSACTION_COLUMNS, fields)}
+
+
+def expense_rows(queryset: QuerySet = None, chunk_size: int = 2000) -> Iterator[Dict]:
+    queryset = Expense.objects.all() if queryset is None else queryset
+    fields = [column for column in EXPENSE_COLUMNS if column != 'tags']
+
+    for rows in chunks(queryset, fields, chunk_size):
+        tags = {}
+        for expense_id, code in Expense.tags.through.objects.using(queryset.db).filter(
+            expense_id__in=[row['id'] for row in rows]
+        ).order_by('usagetag__code').values_list('expense_id', 'usagetag__code'):
+            tags.setdefault(expense_id, []).append(code)
+
+        for row in rows:
+            row['tags'] = tags.get(row['id'], [])
+            yield {column: export_value(row[column]) for column in EXPENSE_COLUMNS}
+
+
+def csv_lines(rows: Iterator[Dict], columns: Sequence[str]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+
+    for row in rows:
+        yield writer.writerow([
+            ' '.join(value) if isinstance(value, list) else value for value in (row[column] for column in columns)
+        ])
+
+
+def ndjson_lines(rows: Iterator[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+EXPORTS = {
+    'transactions': (transaction_rows, TRANSACTION_COLUMNS, 'transaction_date'),
+    'expenses': (expense_rows, EXPENSE_COLUMNS, 'date_occurred'),
+}
+OUTPUTS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_lines(kind: str, output: str, queryset: QuerySet, chunk_size: int = 2000) -> Iterator[str]:
+    """Lines of the `kind` ('transactions' or 'expenses') export of `queryset` as `output` ('csv' or 'ndjson')"""
+    row_builder, columns, _ = EXPORTS[kind]
+    rows = row_builder(queryset, chunk_size)
+    return csv_lines(rows, columns) if output == 'csv' else ndjson_lines(rows)
+
+
+def dated(kind: str, queryset: QuerySet, start: date = None, end: date = None) -> QuerySet:
+    """`queryset` limited to the (local) days from `start` to `end`, both included"""
+    field = EXPORTS[kind][2]
+    as_bound = DateTimeFormatter.day_start if kind == 'transactions' else (lambda day: day)
+
+    if start:
+        queryset = queryset.filter(**{f'{field}__gte': as_bound(start)})
+    if end:
+        queryset = queryset.filter(**{f'{field}__lt': as_bound(end + timedelta(days=1))})
+
+    return queryset
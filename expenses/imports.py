@@ -0,0 +1,233 @@
+import csv
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.models import Account, User
+from core.utils import DateTimeFormatter
+from .models import Expense, Transaction
+
+# model field -> statement column
+DEFAULT_COLUMNS = {
+    'transaction_date': 'date',
+    'transaction_type': 'type',
+    'amount': 'amount',
+    'transaction_charge': 'charge',
+    'account_number': 'account',
+    'narration': 'narration',
+    'reference': 'reference',
+}
+TRANSACTION_TYPES = {
+    'db': 'DB', 'dr': 'DB', 'debit': 'DB',
+    'cd': 'CD', 'cr': 'CD', 'credit': 'CD',
+}
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    duplicates: int = 0
+    error_count: int = 0
+    # (line, messages) of the first `error_limit` rows that could not be imported
+    errors: List[Tuple[int, Dict]] = field(default_factory=list)
+
+    def add_error(self, line: int, error: ValidationError, error_limit: int):
+        self.error_count += 1
+        if len(self.errors) < error_limit:
+            self.errors.append((line, error.message_dict if hasattr(error, 'error_dict') else {'row': error.messages}))
+
+
+@dataclass
+class StatementRow:
+    line: int
+    transaction: Transaction
+    narration: str
+    content_hash: str = ''
+
+
+def parse_amount(value: str, name: str) -> int:
+    try:
+        amount = Decimal((value or '0').replace(',', '').strip())
+    except InvalidOperation:
+        raise ValidationError({name: 'Not a number'})
+
+    if amount != amount.to_integral_value():
+        raise ValidationError({name: 'Amounts are whole numbers'})
+
+    return int(amount)
+
+
+def parse_timestamp(value: str) -> datetime:
+    value = (value or '').strip()
+
+    try:
+        if parsed := parse_datetime(value):
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+        if parsed := parse_date(value):
+            return DateTimeFormatter.day_start(parsed)
+    except ValueError:
+        pass
+
+    raise ValidationError({'transaction_date': 'Use the format YYYY-MM-DD or YYYY-MM-DD HH:MM:SS'})
+
+
+class StatementParser:
+    """
+        Turns statement rows into unsaved transactions
+
+        - Without a type column, negative amounts are debits
+        - Without an account column every row goes to `account`
+        - Rows are hashed for deduplication, from the account and the reference column
+          when there is one, otherwise from the row content and how many identical rows
+          came before it on the same day (the count is reset when the day changes, so
+          statements are expected in date order)
+    """
+
+    def __init__(self, user: User, account: Account = None, columns: Dict[str, str] = None):
+        self.account = account
+        self.columns = {**DEFAULT_COLUMNS, **(columns or {})}
+        self.accounts = {acc.account_number: acc for acc in Account.objects.filter(user=user)}
+        self.seen_on_day = {}
+        self.current_day = None
+
+    def value(self, row: Dict[str, str], name: str) -> str:
+        return (row.get(self.columns[name]) or '').strip()
+
+    def parse(self, line: int, row: Dict[str, str]) -> StatementRow:
+        account = self.account
+        if account_number := self.value(row, 'account_number'):
+            if (account := self.accounts.get(account_number)) is None:
+                raise ValidationError({'account': f'No account with number {account_number}'})
+        elif account is None:
+            raise ValidationError({'account': 'Required'})
+
+        amount = parse_amount(self.value(row, 'amount'), 'amount')
+        transaction_type = self.value(row, 'transaction_type')
+        if transaction_type:
+            if (transaction_type := TRANSACTION_TYPES.get(transaction_type.lower())) is None:
+                raise ValidationError({'transaction_type': 'Use DB (debit) or CD (credit)'})
+        else:
+            transaction_type = 'DB' if amount < 0 else 'CD'
+
+        transaction = Transaction(
+            account=account,
+            transaction_type=transaction_type,
+            amount=abs(amount),
+            transaction_charge=abs(parse_amount(self.value(row, 'transaction_charge'), 'transaction_charge')),
+            transaction_date=parse_timestamp(self.value(row, 'transaction_date'))
+        )
+        parsed = StatementRow(line, transaction, self.value(row, 'narration'))
+        parsed.content_hash = transaction.content_hash = self.content_hash(parsed, self.value(row, 'reference'))
+        return parsed
+
+    def content_hash(self, parsed: StatementRow, reference: str) -> str:
+        tr = parsed.transaction
+
+        if reference:
+            key = f'{tr.account.pk}|ref|{reference}'
+        else:
+            day = timezone.localdate(tr.transaction_date)
+            if day != self.current_day:
+                self.current_day, self.seen_on_day = day, {}
+
+            key = '|'.join(str(part) for part in (
+                tr.account.pk, tr.transaction_date.isoformat(), tr.transaction_type, tr.amount,
+                tr.transaction_charge, parsed.narration
+            ))
+            ordinal = self.seen_on_day[key] = self.seen_on_day.get(key, -1) + 1
+            key = f'{key}|{ordinal}'
+
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+def batches(rows: Iterable, batch_size: int) -> Iterator[List]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def import_statement(
+        file: Iterable[str], user: User, account: Account = None, columns: Dict[str, str] = None,
+        create_expenses: bool = False, batch_size: int = 1000, error_limit: int = 1000
+) -> ImportResult:
+    """
+        Import a CSV statement (with a header line) into transactions of the accounts of `user`
+
+        - The file is read a row at a time and written `batch_size` rows at a time,
+          each batch is one database transaction
+        - Rows already imported are skipped, rows that fail parsing or validation are
+          reported in the result and do not stop the import
+        - With `create_expenses`, each debit gets an expense with the row narration
+    """
+    result = ImportResult()
+    parser = StatementParser(user, account, columns)
+
+    def parsed_rows():
+        # line 1 is the header
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            result.rows += 1
+            try:
+                yield parser.parse(line, row)
+            except ValidationError as error:
+                result.add_error(line, error, error_limit)
+
+    for batch in batches(parsed_rows(), batch_size):
+        import_batch(batch, result, create_expenses, error_limit)
+
+    return result
+
+
+def import_batch(batch: List[StatementRow], result: ImportResult, create_expenses: bool, error_limit: int):
+    existing = set(Transaction.objects.filter(
+        content_hash__in=[row.content_hash for row in batch]
+    ).values_list('content_hash', flat=True))
+
+    rows = []
+    for row in batch:
+        if row.content_hash in existing:
+            result.duplicates += 1
+        else:
+            existing.add(row.content_hash)
+            rows.append(row)
+
+    errors = Transaction.transactions_cleaner([row.transaction for row in rows])
+    for index, error in errors.items():
+        result.add_error(rows[index].line, error, error_limit)
+    rows = [row for index, row in enumerate(rows) if index not in errors]
+
+    if not rows:
+        return
+
+    with db_transaction.atomic():
+        if create_expenses:
+            debits = [row for row in rows if row.transaction.transaction_type == 'DB']
+            expenses = Expense.bulk_record(
+                Expense(
+                    user_id=row.transaction.account.user_id,
+                    amount=row.transaction.amount,
+                    narration=row.narration,
+                    date_occurred=timezone.localdate(row.transaction.transaction_date)
+                )
+                for row in debits
+            )
+            for row, expense in zip(debits, expenses):
+                row.transaction.transaction_for = 'EX'
+                row.transaction.transaction_for_id = expense.pk
+
+        Transaction.bulk_record(row.transaction for row in rows)
+
+    result.created += len(rows)
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.serializers import BaseSerializer, ListSerializer, ModelSerializer
+
+from expenses.models import Expense
+from expenses.serializers import ExpenseSerializer, PaymentSerializer, TransactionSerializer
+
+
+def build_tree(serializer: BaseSerializer, cached: bool) -> int:
+    """Builds the fields of `serializer` and its nested serializers, returns how many were built"""
+    if cached:
+        fields = serializer.get_fields()
+    else:
+        # what every instance did before the fields were cached
+        fields = ModelSerializer.get_fields(serializer)
+        if getattr(serializer, 'instance', None) and hasattr(serializer, 'get_field_set'):
+            for field in fields.values():
+                field.required = False
+
+    count = len(fields)
+    for field in fields.values():
+        if isinstance(field, BaseSerializer):
+            count += build_tree(field.child if isinstance(field, ListSerializer) else field, cached)
+
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Time building serializer fields with and without the per class cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=2000, help='Serializers built per run')
+
+    def handle(self, *args, **options):
+        number = options['number']
+        # an unsaved expense is enough to build the fields for updating
+        cases = (
+            ('transaction (create)', lambda: TransactionSerializer()),
+            ('expense (create)', lambda: ExpenseSerializer()),
+            ('expense (update)', lambda: ExpenseSerializer(Expense(pk=1))),
+            ('payment (create)', lambda: PaymentSerializer()),
+        )
+
+        for name, make in cases:
+            # fill the cache before timing
+            fields = build_tree(make(), True)
+            timings = {}
+
+            for cached in (False, True):
+                start = time.perf_counter()
+                for _ in range(number):
+                    build_tree(make(), cached)
+                timings[cached] = time.perf_counter() - start
+
+            self.stdout.write(
+                f'{name}: {fields} fields, {number} serializers, without cache {timings[False] * 1000:.0f}ms, '
+                f'with cache {timings[True] * 1000:.0f}ms ({timings[False] / timings[True]:.1f}x)'
+            )
@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.fast_serializers import FastSerializer
+from core.optimizer import optimize_queryset
+from expenses.models import Expense, Transaction
+from expenses.serializers import ExpenseSerializer, TransactionSerializer, FastTransactionSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare the serializers of transaction and expense lists with their fast (values()) versions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows of each list')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs of each serializer, the best one is shown')
+
+    def handle(self, *args, **options):
+        cases = (
+            ('transactions', Transaction.objects.order_by('-pk'), TransactionSerializer,
+             FastTransactionSerializer.for_class(TransactionSerializer)),
+            ('expenses', Expense.objects.order_by('-pk'), ExpenseSerializer,
+             FastSerializer.for_class(ExpenseSerializer)),
+        )
+
+        for name, queryset, serializer_class, fast in cases:
+            queryset = queryset[:options['rows']]
+            # the rows are read up front so only the representation is timed
+            instances = list(optimize_queryset(queryset, serializer_class))
+            rows = fast.rows(queryset)
+
+            drf_time, drf_data = self.best(options['repeat'], lambda: serializer_class(instances, many=True).data)
+            fast_time, fast_data = self.best(options['repeat'], lambda: fast.represent(rows))
+
+            identical = json.dumps(drf_data, cls=DjangoJSONEncoder) == json.dumps(fast_data, cls=DjangoJSONEncoder)
+            self.stdout.write(
+                f'{name}: {len(rows)} rows, serializer {drf_time * 1000:.1f}ms, fast {fast_time * 1000:.1f}ms '
+                f'({drf_time / fast_time if fast_time else 0:.1f}x), identical output: {"yes" if identical else "NO"}'
+            )
+
+    @staticmethod
+    def best(repeat: int, run):
+        times, result = [], None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            result = run()
+            times.append(time.perf_counter() - start)
+        return min(times), result
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.routers import read_only_scope
+from expenses import exports
+from expenses.models import Expense, Transaction
+
+
+class Command(BaseCommand):
+    help = 'Write transactions or expenses as CSV or NDJSON, a chunk of rows at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(exports.EXPORTS))
+        parser.add_argument('--output', choices=list(exports.OUTPUTS), default='csv')
+        parser.add_argument('--user', type=int, help='Only rows of this user id')
+        parser.add_argument('--start', help='First day as YYYY-MM-DD')
+        parser.add_argument('--end', help='Last day as YYYY-MM-DD')
+        parser.add_argument('--file', help='Write to this file instead of stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+
+        try:
+            start, end = (
+                datetime.strptime(value, '%Y-%m-%d').date() if (value := options[param]) else None
+                for param in ('start', 'end')
+            )
+        except ValueError:
+            raise CommandError('Use the format YYYY-MM-DD for dates')
+
+        with read_only_scope():
+            queryset = Transaction.objects.all() if kind == 'transactions' else Expense.objects.all()
+            if options['user']:
+                queryset = queryset.filter(
+                    **{'account__user' if kind == 'transactions' else 'user': options['user']}
+                )
+
+            lines = exports.export_lines(
+                kind, options['output'], exports.dated(kind, queryset, start, end), options['chunk_size']
+            )
+
+            if options['file']:
+                with open(options['file'], 'w', newline='') as file:
+                    file.writelines(lines)
+            else:
+                for line in lines:
+                    self.stdout.write(line, ending='')
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Account, User
+from expenses.imports import DEFAULT_COLUMNS, import_statement
+
+
+class Command(BaseCommand):
+    help = 'Import the transactions of a CSV bank or mobile money statement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header line')
+        parser.add_argument('--user', type=int, required=True, help='Id of the user the statement belongs to')
+        parser.add_argument('--account', type=int, help='Id of the account of rows without an account column')
+        parser.add_argument(
+            '--column', action='append', default=[], metavar='FIELD=HEADER',
+            help=f'Statement column of a field, fields are {", ".join(DEFAULT_COLUMNS)}'
+        )
+        parser.add_argument('--expenses', action='store_true', help='Create an expense for each debit')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(pk=options['user'])
+            account = Account.objects.get(pk=options['account'], user=user) if options['account'] else None
+        except (User.DoesNotExist, Account.DoesNotExist):
+            raise CommandError('The user or the account does not exist')
+
+        columns = {}
+        for column in options['column']:
+            name, _, header = column.partition('=')
+            if name not in DEFAULT_COLUMNS or not header:
+                raise CommandError(f'Use FIELD=HEADER for columns, fields are {", ".join(DEFAULT_COLUMNS)}')
+            columns[name] = header
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as file:
+            result = import_statement(
+                file, user, account, columns,
+                create_expenses=options['expenses'],
+                batch_size=options['batch_size']
+            )
+
+        for line, messages in result.errors:
+            self.stderr.write(f'line {line}: {messages}')
+
+        self.stdout.write(
+            f'{result.rows} rows: {result.created} imported, {result.duplicates} duplicates, '
+            f'{result.error_count} errors'
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from expenses.models import MonthlySpend
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly spend rollup from the expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only rebuild this user id')
+
+    def handle(self, *args, **options):
+        MonthlySpend.rebuild(options['users'])
+        self.stdout.write(f'{MonthlySpend.objects.count()} monthly spend rows')
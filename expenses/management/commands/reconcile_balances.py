@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from expenses.reconciliation import reconcile_balances
+
+
+class Command(BaseCommand):
+    help = 'Compare account balances with the sum of their transactions and report (or fix) the drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Move drifted balances back to the ledger sum')
+        parser.add_argument('--shard-size', type=int, default=10000, help='Account ids per grouped query')
+        parser.add_argument('--workers', type=int, default=1, help='Processes reconciling shards in parallel')
+        parser.add_argument('--limit', type=int, default=1000, help='Drifted accounts to list')
+
+    def handle(self, *args, **options):
+        result = reconcile_balances(options['fix'], options['shard_size'], options['workers'], options['limit'])
+
+        for drift in result.drifts:
+            self.stdout.write(
+                f'account {drift.account_id}: balance {drift.recorded}, ledger {drift.ledger}, drift {drift.drift}'
+            )
+        self.stdout.write(
+            f'{result.accounts} accounts, {result.drifted} drifted, {result.fixed} fixed'
+        )
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from expenses.renewals import renew_payments
+
+
+class Command(BaseCommand):
+    help = 'Post the automatic transactions of recurring payments due on a date (today by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Run date as YYYY-MM-DD')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        run_date = timezone.localdate()
+
+        if options['date']:
+            try:
+                run_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Use the format YYYY-MM-DD for the date')
+
+        result = renew_payments(run_date, options['batch_size'])
+        self.stdout.write(
+            f'{result.run_date}: {result.renewed} payments renewed, {result.skipped} skipped'
+        )
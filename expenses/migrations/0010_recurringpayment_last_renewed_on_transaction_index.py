@@ -0,0 +1,22 @@
+# Generated by Django 4.2.1 on 2026-10-17 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0009_remove_expense_account_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='last_renewed_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_for', 'transaction_for_id'], name='expenses_tr_transac_48987a_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.1 on 2026-10-17 12:39
+
+import calendar
+from datetime import date, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# a copy of RenewalDateCalculator as it was when this migration was written, the migration
+# does not change with the app code
+def parse(renewal_date: str):
+    if '-' in renewal_date:
+        month, day = renewal_date.split('-')
+        return int(month), int(day)
+    return None, int(renewal_date)
+
+
+def clamp(year: int, month: int, day: int) -> date:
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def next_renewal(month, day, after: date, start_date: date = None, end_date: date = None):
+    reference = after + timedelta(days=1)
+    if start_date and start_date > reference:
+        reference = start_date
+
+    if month is None:
+        renewal = clamp(reference.year, reference.month, day)
+        if renewal < reference:
+            next_month = (reference.replace(day=1) + timedelta(days=32)).replace(day=1)
+            renewal = clamp(next_month.year, next_month.month, day)
+    else:
+        renewal = clamp(reference.year, month, day)
+        if renewal < reference:
+            renewal = clamp(reference.year + 1, month, day)
+
+    if end_date and renewal > end_date:
+        return None
+
+    return renewal
+
+
+def set_renewal_fields(apps, schema_editor):
+    RecurringPayment = apps.get_model('expenses', 'RecurringPayment')
+    yesterday = timezone.localdate() - timedelta(days=1)
+    payments = []
+
+    for payment in RecurringPayment.objects.iterator(chunk_size=1000):
+        payment.renewal_month, payment.renewal_day = parse(payment.renewal_date)
+        payment.next_renewal_on = next_renewal(
+            payment.renewal_month,
+            payment.renewal_day,
+            payment.last_renewed_on or yesterday,
+            payment.start_date,
+            payment.end_date
+        )
+        payments.append(payment)
+
+        if len(payments) == 1000:
+            RecurringPayment.objects.bulk_update(payments, ['renewal_month', 'renewal_day', 'next_renewal_on'])
+            payments = []
+
+    RecurringPayment.objects.bulk_update(payments, ['renewal_month', 'renewal_day', 'next_renewal_on'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_recurringpayment_last_renewed_on_transaction_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='next_renewal_on',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='renewal_day',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='recurringpayment',
+            name='renewal_month',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recurringpayment',
+            index=models.Index(fields=['user', 'next_renewal_on'], name='expenses_re_user_id_64aab8_idx'),
+        ),
+        migrations.RunPython(set_renewal_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.1 on 2026-10-17 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_monthlyspend'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date_occurred', 'id'], name='expenses_ex_user_id_547552_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'transaction_date', 'id'], name='expenses_tr_account_e51c05_idx'),
+        ),
+    ]
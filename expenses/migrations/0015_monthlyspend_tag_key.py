@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-17 13:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_tag_keys(apps, schema_editor):
+    MonthlySpend = apps.get_model('expenses', 'MonthlySpend')
+    MonthlySpend.objects.filter(tag__isnull=False).update(tag_key=models.F('tag_id'))
+
+    # rows of all tags created twice by concurrent first expenses of a month, merged into one
+    duplicates = MonthlySpend.objects.filter(tag__isnull=True).values('user', 'month').annotate(
+        rows=models.Count('pk'), total=models.Sum('amount'), count=models.Sum('expense_count'), keep=models.Min('pk')
+    ).filter(rows__gt=1)
+
+    for row in duplicates:
+        MonthlySpend.objects.filter(pk=row['keep']).update(amount=row['total'], expense_count=row['count'])
+        MonthlySpend.objects.filter(user=row['user'], month=row['month'], tag__isnull=True).exclude(
+            pk=row['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('expenses', '0014_transaction_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='monthlyspend',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='monthlyspend',
+            name='tag_key',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(set_tag_keys, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='monthlyspend',
+            unique_together={('user', 'month', 'tag_key')},
+        ),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+from collections import defaultdict
+from datetime import date, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from django.db import connection, models, router, transaction as db_transaction
+from django.db.models.functions import TruncMinute, TruncMonth
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import PermissionDenied, ValidationError, ObjectDoesNotExist
 
-from core.models import Account, User
+from core.models import Account, AccountBalanceSnapshot, User
+from core.utils import DateTimeFormatter
+from .utils import RenewalDateCalculator
 from .validators import RenewalDateValidator
 
 
@@ -28,6 +35,85 @@ class Expense(models.Model):
     date_modified = models.DateTimeField(auto_now=True)
     date_occurred = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date_occurred', 'id'])
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rollup_key()
+        return instance
+
+    @property
+    def rollup_key(self) -> Tuple[int, date, int] | None:
+        """(user, month, amount) this expense adds to the monthly spend rollup"""
+        if self.user_id is None or self.date_occurred is None:
+            return None
+        return self.user_id, DateTimeFormatter.make_date(self.date_occurred).replace(day=1), self.amount
+
+    def remember_rollup_key(self):
+        self._saved_rollup_key = self.rollup_key if self.pk else None
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        adding = self._state.adding
+
+        with db_transaction.atomic(using=using):
+            super().save(force_insert, force_update, using, update_fields)
+            previous, current = getattr(self, '_saved_rollup_key', None), self.rollup_key
+
+            if previous != current:
+                # a new expense has no tags yet
+                tag_ids = [None] if adding else [None, *self.tags.values_list('pk', flat=True)]
+                if previous:
+                    MonthlySpend.apply(previous[0], previous[1], tag_ids, -previous[2], -1)
+                if current:
+                    MonthlySpend.apply(current[0], current[1], tag_ids, current[2], 1)
+
+        self.remember_rollup_key()
+
+    def delete(self, using=None, keep_parents=False):
+        with db_transaction.atomic(using=using):
+            if previous := getattr(self, '_saved_rollup_key', None):
+                tag_ids = [None, *self.tags.values_list('pk', flat=True)]
+                MonthlySpend.apply(previous[0], previous[1], tag_ids, -previous[2], -1)
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    @classmethod
+    def bulk_record(cls, expenses: Iterable['Expense']) -> List['Expense']:
+        """
+            Create many untagged expenses at once, the monthly spend rollup
+            is updated once per user and month
+
+            Backends that cannot return the ids of bulk inserted rows (MySQL)
+            insert the expenses one by one, the created expenses always have their ids
+        """
+        expenses = list(expenses)
+
+        if any(expense.pk for expense in expenses):
+            raise PermissionDenied('Cannot update an expense')
+
+        with db_transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                cls.objects.bulk_create(expenses)
+            else:
+                for expense in expenses:
+                    # skips Expense.save, the rollup is updated below
+                    models.Model.save(expense)
+
+            rollups = defaultdict(lambda: [0, 0])
+            for expense in expenses:
+                expense.remember_rollup_key()
+                if key := expense.rollup_key:
+                    rollups[key[:2]][0] += key[2]
+                    rollups[key[:2]][1] += 1
+
+            for (user_id, month), (amount, count) in rollups.items():
+                MonthlySpend.apply(user_id, month, [None], amount, count)
+
+        return expenses
+
     def __repr__(self):
         return f'<Expense: {self.date_occurred} ({self.amount})>'
 
@@ -35,6 +121,85 @@ class Expense(models.Model):
         return f'Expense({self.date_occurred} • {self.amount})'
 
 
+class MonthlySpend(models.Model):
+    """
+        Expenses of a user added up per month, per tag and for all tags (tag is null)
+
+        Kept up to date as expenses change, use `rebuild` to backfill it
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()
+    tag = models.ForeignKey(UsageTag, on_delete=models.CASCADE, blank=True, null=True)
+    # the tag id, 0 for the row of all tags: unique keys do not hold for null tags on MySQL
+    tag_key = models.PositiveIntegerField(default=0)
+    amount = models.IntegerField(default=0)
+    expense_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('user', 'month', 'tag_key'),)
+
+    @classmethod
+    def apply(cls, user_id: int, month: date, tag_ids: Iterable[int | None], amount: int, count: int):
+        """Add `amount` and `count` to the rows of the month for each tag"""
+        for tag_id in tag_ids:
+            rows = cls.objects.filter(user_id=user_id, month=month, tag_key=tag_id or 0)
+            change = {'amount': models.F('amount') + amount, 'expense_count': models.F('expense_count') + count}
+
+            if not rows.update(**change):
+                # first change of the month, a row inserted meanwhile by a concurrent change is kept
+                # (the insert waits for it and is ignored) and both changes are added to it
+                cls.objects.bulk_create(
+                    [cls(user_id=user_id, month=month, tag_id=tag_id, tag_key=tag_id or 0)], ignore_conflicts=True
+                )
+                rows.update(**change)
+
+    @classmethod
+    def rebuild(cls, user_ids: Iterable[int] = None):
+        """Recompute the rollup from the expenses, for all users or only `user_ids`"""
+        expenses = Expense.objects.filter(user__isnull=False)
+        tagged = Expense.tags.through.objects.filter(expense__user__isnull=False)
+        rollups = cls.objects.all()
+
+        if user_ids is not None:
+            expenses = expenses.filter(user__in=user_ids)
+            tagged = tagged.filter(expense__user__in=user_ids)
+            rollups = rollups.filter(user__in=user_ids)
+
+        totals = expenses.values('user', month=TruncMonth('date_occurred')).annotate(
+            total=models.Sum('amount'), count=models.Count('pk')
+        ).values_list('user', 'month', 'total', 'count')
+        tag_totals = tagged.values(
+            'usagetag', user=models.F('expense__user'), month=TruncMonth('expense__date_occurred')
+        ).annotate(
+            total=models.Sum('expense__amount'), count=models.Count('pk')
+        ).values_list('user', 'month', 'usagetag', 'total', 'count')
+
+        with db_transaction.atomic():
+            rollups.delete()
+            cls.objects.bulk_create(
+                (
+                    cls(user_id=user_id, month=month, amount=total, expense_count=count)
+                    for user_id, month, total, count in totals.iterator(chunk_size=2000)
+                ),
+                batch_size=2000
+            )
+            cls.objects.bulk_create(
+                (
+                    cls(
+                        user_id=user_id, month=month, tag_id=tag_id, tag_key=tag_id, amount=total, expense_count=count
+                    )
+                    for user_id, month, tag_id, total, count in tag_totals.iterator(chunk_size=2000)
+                ),
+                batch_size=2000
+            )
+
+    def __repr__(self):
+        return f'<MonthlySpend: {self.month:%Y-%m} ({self.amount})>'
+
+    def __str__(self):
+        return f'MonthlySpend({self.user_id} • {self.month:%Y-%m} • {self.tag_id} • {self.amount})'
+
+
 class RecurringPayment(models.Model):
     user = models.ForeignKey(User, on_delete=models.RESTRICT)
     tags = models.ManyToManyField(UsageTag)
@@ -48,13 +213,61 @@ class RecurringPayment(models.Model):
         help_text="Two digits, 01 | 31, monthly; Four Digits, 12-01, 12-31, annual (month-day)."
     )
     renewal_count = models.IntegerField(default=0)
+    last_renewed_on = models.DateField(blank=True, null=True)
+    renewal_month = models.PositiveSmallIntegerField(blank=True, null=True)
+    renewal_day = models.PositiveSmallIntegerField(default=1)
+    next_renewal_on = models.DateField(blank=True, null=True, db_index=True)
     date_added = models.DateTimeField(auto_now_add=True)
     date_modified = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'next_renewal_on'])
+        ]
+
     @property
     def is_annual(self) -> bool:
         return '-' in self.renewal_date
 
+    # what the next renewal is worked out from
+    SCHEDULE_FIELDS = ('renewal_date', 'start_date', 'end_date', 'last_renewed_on')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        payment = super().from_db(db, field_names, values)
+        payment._loaded_schedule = payment.schedule()
+        return payment
+
+    def schedule(self) -> Tuple:
+        # deferred fields are left out rather than loaded
+        return tuple(str(self.__dict__.get(name)) for name in self.SCHEDULE_FIELDS)
+
+    def set_renewal_fields(self):
+        """
+            Store the parsed renewal_date and the next renewal, after the last one
+            or from today for payments that have not been renewed
+        """
+        self.renewal_month, self.renewal_day = RenewalDateCalculator.parse(self.renewal_date)
+        self.next_renewal_on = RenewalDateCalculator.next_renewal(
+            self.renewal_month,
+            self.renewal_day,
+            DateTimeFormatter.make_date(self.last_renewed_on or timezone.localdate() - timedelta(days=1)),
+            DateTimeFormatter.make_date(self.start_date),
+            DateTimeFormatter.make_date(self.end_date) if self.end_date else None
+        )
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        # only when the schedule changes: editing anything else of an overdue payment
+        # must not move it past the renewal still to be posted
+        if self._state.adding or self.schedule() != getattr(self, '_loaded_schedule', None):
+            self.set_renewal_fields()
+
+            if update_fields is not None:
+                update_fields = {*update_fields, 'renewal_month', 'renewal_day', 'next_renewal_on'}
+
+        super().save(force_insert, force_update, using, update_fields)
+        self._loaded_schedule = self.schedule()
+
     def __repr__(self):
         return f'<Payment: {"annual" if self.is_annual else "monthly"} ({self.amount})>'
 
@@ -65,14 +278,17 @@ class RecurringPayment(models.Model):
 class TransactionActions:
 
     @staticmethod
-    def transaction_cleaner(account: Account, transaction_type: str, transaction_for: str, for_id: int, is_model=True):
+    def transaction_cleaner(
+            account: Account, transaction_type: str, transaction_for: str, for_id: int, is_model=True,
+            existing_ids: Set[int] = None
+    ):
         """
             Clean a transaction
 
             - Account must be active
             - Credit transactions cannot have expense or payments as they are the opposite of a cost
             - Transaction for and id must exist together, cannot have one without the other
-            - for ID must point to an existing item
+            - for ID must point to an existing item, looked up in `existing_ids` when given
 
         """
         if not account.active:
@@ -95,7 +311,10 @@ class TransactionActions:
             else:
                 klass = Expense if transaction_for == 'EX' else RecurringPayment
                 try:
-                    klass.objects.get(pk=for_id)
+                    if existing_ids is None:
+                        klass.objects.get(pk=for_id)
+                    elif for_id not in existing_ids:
+                        raise klass.DoesNotExist
                 except ObjectDoesNotExist:
                     item_type = 'Expense' if transaction_for == "EX" else 'Payment'
                     raise ValidationError({
@@ -107,6 +326,85 @@ class TransactionActions:
                     'transaction_for': _('Required')
                 })
 
+    @classmethod
+    def transactions_cleaner(cls, transactions: Sequence['Transaction']) -> Dict[int, ValidationError]:
+        """
+            Clean many transactions with transaction_cleaner, the items they point to
+            are looked up in one query per item type
+
+            Returns the errors by position in `transactions`
+        """
+        existing_ids = {}
+        for transaction_for, klass in (('EX', Expense), ('RP', RecurringPayment)):
+            for_ids = {
+                tr.transaction_for_id for tr in transactions
+                if tr.transaction_for == transaction_for and tr.transaction_for_id is not None
+            }
+            existing_ids[transaction_for] = set(
+                klass.objects.filter(pk__in=for_ids).values_list('pk', flat=True)
+            ) if for_ids else set()
+
+        errors = {}
+        for index, tr in enumerate(transactions):
+            try:
+                cls.transaction_cleaner(
+                    tr.account, tr.transaction_type, tr.transaction_for, tr.transaction_for_id,
+                    existing_ids=existing_ids.get(tr.transaction_for)
+                )
+            except ValidationError as error:
+                errors[index] = error
+
+        return errors
+
+
+class TransactionQuerySet(models.QuerySet):
+    DELETE_BATCH_SIZE = 1000
+
+    def delete(self):
+        """
+            Delete the transactions and reverse what they did to the account balances
+
+            The rows are locked first, then the net reversal of each account and minute is read
+            in one aggregate query and the locked rows go in one DELETE (both per batch of ids),
+            and each account gets one balance update, all in one database transaction on
+            the database the rows are deleted from. A concurrent delete of the same rows waits
+            for the lock and finds nothing left to reverse
+        """
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+
+        # the reversals are read from the database written to, not a replica
+        self._for_write = True
+        deleted, per_model = 0, {}
+
+        with db_transaction.atomic(using=self.db):
+            pks = list(self.order_by().select_for_update().values_list('pk', flat=True))
+            balance_changes = defaultdict(lambda: defaultdict(int))
+
+            for start in range(0, len(pks), self.DELETE_BATCH_SIZE):
+                locked = Transaction.objects.using(self.db).filter(pk__in=pks[start:start + self.DELETE_BATCH_SIZE])
+
+                # per minute in UTC rather than per local day: truncating to a local date needs the time zone
+                # tables on MySQL, a minute is always within one local day
+                reversals = locked.values(
+                    'account_id', minute=TruncMinute('transaction_date', tzinfo=dt_timezone.utc)
+                ).annotate(total=models.Sum(Transaction.balance_effect_expression()))
+
+                for row in reversals:
+                    balance_changes[row['account_id']][timezone.localdate(row['minute'])] -= row['total']
+
+                count, counts = super(TransactionQuerySet, locked).delete()
+                deleted += count
+                for label, label_count in counts.items():
+                    per_model[label] = per_model.get(label, 0) + label_count
+
+            Transaction.move_account_balances(balance_changes, using=self.db)
+
+        return deleted, per_model
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
 
 class Transaction(TransactionActions, models.Model):
     """
@@ -120,9 +418,19 @@ class Transaction(TransactionActions, models.Model):
     amount = models.IntegerField()
     transaction_charge = models.IntegerField(default=0)
     automatic = models.BooleanField(default=False)
-    transaction_date = models.DateTimeField(auto_now_add=True)
+    transaction_date = models.DateTimeField(default=timezone.now, editable=False)
     transaction_for = models.CharField(max_length=2, choices=TRANSACTION_FOR_CHOICES, null=True, blank=True)
     transaction_for_id = models.IntegerField(null=True, blank=True)
+    # set on imported rows to recognise them when a statement is imported again
+    content_hash = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['transaction_for', 'transaction_for_id']),
+            models.Index(fields=['account', 'transaction_date', 'id'])
+        ]
 
     def __str__(self):
         return f'Transaction: {self.transaction_type} • ({self.amount})'
@@ -130,6 +438,55 @@ class Transaction(TransactionActions, models.Model):
     def __repr__(self):
         return f'<Transaction: {self.transaction_type} ({self.amount})>'
 
+    @property
+    def balance_effect(self) -> int:
+        """How much this transaction moves the account balance"""
+        return -self.amount if self.transaction_type == 'DB' else self.amount
+
+    @staticmethod
+    def balance_effect_expression(prefix: str = ''):
+        """Database expression of balance_effect, `prefix` is the lookup path to the transaction"""
+        amount = models.F(f'{prefix}amount')
+        return models.Case(
+            models.When(**{f'{prefix}transaction_type': 'DB'}, then=-amount),
+            default=amount
+        )
+
+    @classmethod
+    def bulk_record(cls, transactions: Iterable['Transaction'], batch_size: int = None) -> List['Transaction']:
+        """
+            Create many transactions at once
+
+            - Rows are inserted with bulk_create, clean them before calling this
+            - Each account is updated once with the net of its debits and credits
+            - Everything happens in one database transaction
+        """
+        transactions = list(transactions)
+
+        if any(tr.pk for tr in transactions):
+            raise PermissionDenied('Cannot update a transaction')
+
+        with db_transaction.atomic():
+            created = cls.objects.bulk_create(transactions, batch_size=batch_size)
+
+            balance_changes = defaultdict(lambda: defaultdict(int))
+            for tr in created:
+                balance_changes[tr.account_id][timezone.localdate(tr.transaction_date)] += tr.balance_effect
+
+            cls.move_account_balances(balance_changes)
+
+        return created
+
+    @staticmethod
+    def move_account_balances(balance_changes: Dict[int, Dict[date, int]], using: str = None):
+        """Apply {account id: {day: change}} with one balance update per account, call it in a database transaction"""
+        now = timezone.now()
+        for account_id, day_changes in balance_changes.items():
+            Account.adjust_balance(account_id, sum(day_changes.values()), now, using=using)
+
+            for day, change in day_changes.items():
+                AccountBalanceSnapshot.record_change(account_id, change, day, using=using)
+
     def get_transaction_item(self):
         item: Expense | RecurringPayment | None = None
 
@@ -150,25 +507,32 @@ class Transaction(TransactionActions, models.Model):
         if self.pk:
             raise PermissionDenied('Cannot update a transaction')
 
-        super().save(force_insert, force_update, using, update_fields)
-
         # Once a transaction is created you need to update the balance of the account
-        # and the last_balance_update time
-        if self.transaction_type == 'DB':
-            self.account.balance -= self.amount
-        else:
-            self.account.balance += self.amount
-        self.account.last_balance_update = timezone.now()
-        self.account.save()
+        # and the last_balance_update time. The balance is moved in the database
+        # (balance = balance ± amount) so concurrent transactions never overwrite each other
+        with db_transaction.atomic(using=using):
+            super().save(force_insert, force_update, using, update_fields)
+            self.move_account_balance(self.balance_effect, using=self._state.db)
+
         return self
 
     def delete(self, using=None, keep_parents=False):
-        # Once a transaction is deleted you need to update the balance of the account
-        # and the last_balance_update time
-        if self.transaction_type == 'DB':
-            self.account.balance += self.amount
-        else:
-            self.account.balance -= self.amount
-        self.account.last_balance_update = timezone.now()
-        self.account.save()
-        return super().delete(using=None, keep_parents=False)
+        # Once a transaction is deleted you need to reverse its effect on the balance
+        # of the account and update the last_balance_update time
+        using = using or router.db_for_write(self.__class__, instance=self)
+        with db_transaction.atomic(using=using):
+            self.move_account_balance(-self.balance_effect, using=using)
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    def move_account_balance(self, amount: int, using: str = None):
+        """Apply `amount` to the account row and its snapshots and keep the loaded account in step"""
+        now = timezone.now()
+        Account.adjust_balance(self.account_id, amount, now, using=using)
+        AccountBalanceSnapshot.record_change(
+            self.account_id, amount, timezone.localdate(self.transaction_date), using=using
+        )
+
+        # an account that is not loaded yet will be read with the new balance
+        if self._meta.get_field('account').is_cached(self):
+            self.account.balance += amount
+            self.account.last_balance_update = now
@@ -0,0 +1,102 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Tuple
+
+from django.db import connections
+from django.db.models import F, Min, Max, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.models import Account
+from .models import Transaction
+
+
+@dataclass
+class BalanceDrift:
+    account_id: int
+    # Account.balance and the balance the transactions add up to
+    recorded: int
+    ledger: int
+
+    @property
+    def drift(self) -> int:
+        return self.recorded - self.ledger
+
+
+@dataclass
+class ReconcileResult:
+    accounts: int = 0
+    drifted: int = 0
+    fixed: int = 0
+    # the first `report_limit` drifted accounts
+    drifts: List[BalanceDrift] = field(default_factory=list)
+
+    def add(self, other: 'ReconcileResult', report_limit: int):
+        self.accounts += other.accounts
+        self.drifted += other.drifted
+        self.fixed += other.fixed
+        self.drifts.extend(other.drifts[:report_limit - len(self.drifts)])
+
+
+def shards(shard_size: int) -> Iterator[Tuple[int, int]]:
+    """[start, end) account id ranges `shard_size` ids wide covering every account"""
+    bounds = Account.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return
+
+    for start in range(bounds['first'], bounds['last'] + 1, shard_size):
+        yield start, start + shard_size
+
+
+def reconcile_shard(start: int, end: int, fix: bool = False, report_limit: int = 1000) -> ReconcileResult:
+    """
+        Compare the balances of the accounts with ids in [start, end) with the sum of their transactions,
+        in one grouped query
+
+        Fixing moves the balance by the drift (balance = balance - drift) rather than setting it,
+        so transactions posted while the job runs are not lost
+    """
+    accounts = Account.objects.filter(pk__gte=start, pk__lt=end)
+    result = ReconcileResult(accounts=accounts.count())
+
+    drifted = accounts.annotate(
+        ledger=Coalesce(Sum(Transaction.balance_effect_expression('transaction__')), Value(0))
+    ).exclude(balance=F('ledger')).order_by('pk').values_list('pk', 'balance', 'ledger')
+
+    for pk, recorded, ledger in drifted:
+        drift = BalanceDrift(pk, recorded, ledger)
+        result.drifted += 1
+        if len(result.drifts) < report_limit:
+            result.drifts.append(drift)
+        if fix:
+            result.fixed += Account.adjust_balance(pk, -drift.drift)
+
+    return result
+
+
+def reconcile_balances(
+        fix: bool = False, shard_size: int = 10000, workers: int = 1, report_limit: int = 1000
+) -> ReconcileResult:
+    """
+        Reconcile every account balance with the transaction ledger, `shard_size` account ids at a time
+
+        With more than one worker the shards are spread over a pool of forked processes, each worker
+        opens its own database connection. Forking is required: a worker gets Django set up and the
+        database settings of this process (a test database included), a spawned one would read the
+        settings file again. It is not available on Windows
+    """
+    result = ReconcileResult()
+    ranges = list(shards(shard_size))
+
+    if workers > 1 and len(ranges) > 1:
+        # forked workers must not share the connection of this process
+        connections.close_all()
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            results = pool.map(reconcile_shard, *zip(*ranges), [fix] * len(ranges), [report_limit] * len(ranges))
+            for shard_result in results:
+                result.add(shard_result, report_limit)
+    else:
+        for start, end in ranges:
+            result.add(reconcile_shard(start, end, fix, report_limit), report_limit)
+
+    return result
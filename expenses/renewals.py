@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Tuple
+
+from django.db import transaction as db_transaction
+from django.db.models import F, OuterRef, Subquery, QuerySet
+
+from core.models import Account
+from .models import RecurringPayment, Transaction
+from .utils import RenewalDateCalculator
+
+
+@dataclass
+class RenewalResult:
+    run_date: date
+    renewed: int = 0
+    skipped: int = 0
+
+
+def due_payments(run_date: date) -> QuerySet:
+    """Payments to renew on `run_date`, read off the next_renewal_on index"""
+    return RecurringPayment.objects.filter(next_renewal_on__lte=run_date)
+
+
+def renew_payments(run_date: date, batch_size: int = 1000) -> RenewalResult:
+    """
+        Post an automatic debit for every payment due on `run_date`
+
+        - The debit goes to the account the payment was last paid from,
+          payments never paid before or paid from an inactive account are skipped
+        - Each batch is one database transaction, renewed payments move their next
+          renewal past the run date so the job can be stopped and run again for the same date
+    """
+    result = RenewalResult(run_date)
+    payments = due_payments(run_date)
+    last_pk = 0
+
+    while batch_ids := list(
+        payments.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+    ):
+        last_pk = batch_ids[-1]
+
+        with db_transaction.atomic():
+            renewed, skipped = renew_batch(payments.filter(pk__in=batch_ids), run_date)
+
+        result.renewed += renewed
+        result.skipped += skipped
+
+    return result
+
+
+def renew_batch(payments: QuerySet, run_date: date) -> Tuple[int, int]:
+    """Renew a batch of due payments, returns how many were renewed and skipped"""
+    last_account = Transaction.objects.filter(
+        transaction_for='RP',
+        transaction_for_id=OuterRef('pk')
+    ).order_by('-transaction_date', '-pk').values('account_id')[:1]
+
+    # locking the rows keeps a second run from renewing them at the same time
+    rows = list(
+        payments.select_for_update().annotate(
+            renewal_account_id=Subquery(last_account)
+        ).values_list('pk', 'amount', 'renewal_account_id', 'renewal_month', 'renewal_day')
+    )
+    active_accounts = set(Account.objects.filter(
+        pk__in={row[2] for row in rows if row[2]},
+        active=True
+    ).values_list('pk', flat=True))
+    renewals = [row for row in rows if row[2] in active_accounts]
+
+    Transaction.bulk_record(
+        Transaction(
+            transaction_type='DB',
+            transaction_for='RP',
+            transaction_for_id=pk,
+            amount=amount,
+            account_id=account_id,
+            automatic=True
+        ) for pk, amount, account_id, _, _ in renewals
+    )
+
+    renewed = RecurringPayment.objects.filter(pk__in=[row[0] for row in renewals])
+    renewed.update(
+        renewal_count=F('renewal_count') + 1,
+        last_renewed_on=run_date
+    )
+
+    # payments with the same renewal month and day renew next on the same date
+    for month, day in {(row[3], row[4]) for row in renewals}:
+        renewed.filter(renewal_month=month, renewal_day=day).update(
+            next_renewal_on=RenewalDateCalculator.next_renewal(month, day, run_date)
+        )
+    renewed.filter(end_date__lt=F('next_renewal_on')).update(next_renewal_on=None)
+
+    return len(renewals), len(rows) - len(renewals)
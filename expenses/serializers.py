@@ -1,45 +1,39 @@
-from typing import Dict, OrderedDict, Callable
+from collections import defaultdict
+from typing import Dict, OrderedDict, List, Tuple, Type
 
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.db.models import Manager, Model, QuerySet
+from django.utils.functional import cached_property
 from django.utils import timezone, translation
 from rest_framework.fields import IntegerField
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, ListSerializer
 
-from core.serializers import NoEditOrCreateModelSerializer, ModelSerializerRequiredFalsifiable,\
-    AccountSerializer, UserSerializer, NoEditModelSerializer
+from core.serializers import Cache, NoEditOrCreateModelSerializer, ModelSerializerRequiredFalsifiable,\
+    AccountSerializer, UserSerializer, NoEditModelSerializer, CachedFieldsModelSerializer
+from core.fast_serializers import FastSerializer
 from core.models import Account, User
+from core.optimizer import optimize_queryset
 from core.utils import DateTimeFormatter
 from .models import UsageTag, Expense, RecurringPayment, Transaction, TransactionActions
 from .validators import RenewalDateValidator
 
 
-class ValidateRecItems(DateTimeFormatter):
-    _cache = {}
+class ValidateRecItems(Cache, DateTimeFormatter):
 
-    def master_validator(self, key: str, query_func: Callable, message: str):
+    def master_validator(self, model: Type[Model], pk: int, message: str):
         try:
-            self._cache.update({
-                key: query_func()
-            })
+            self.identity_map.get(model, pk=pk)
         except ObjectDoesNotExist:
             raise ValidationError(
                 translation.gettext_lazy(message)
             )
 
     def validate_account_id(self, value: int):
-        self.master_validator(
-            'account',
-            lambda: Account.objects.get(pk=value),
-            f'No Account with ID {value}'
-        )
+        self.master_validator(Account, value, f'No Account with ID {value}')
         return value
 
     def validate_user_id(self, value: int):
-        self.master_validator(
-            'user',
-            lambda: User.objects.get(pk=value),
-            f'No user account with ID {value}'
-        )
+        self.master_validator(User, value, f'No user account with ID {value}')
         return value
 
     def start_and_end_date_validations(self, validated_data: OrderedDict, instance):
@@ -63,8 +57,8 @@ class UsageTagSerializer(NoEditOrCreateModelSerializer):
 
 class ExpenseSerializer(ValidateRecItems, ModelSerializerRequiredFalsifiable):
     tags = UsageTagSerializer(many=True, read_only=True)
-    account = AccountSerializer(read_only=True)
-    account_id = IntegerField(write_only=True)
+    user = UserSerializer(read_only=True)
+    user_id = IntegerField(write_only=True)
 
     class Meta:
         model = Expense
@@ -78,19 +72,6 @@ class ExpenseSerializer(ValidateRecItems, ModelSerializerRequiredFalsifiable):
             )
         return value
 
-    def update_account_value(self, validated_data: Dict):
-        if 'account' in self._cache and 'account_id' in validated_data:
-            validated_data.update({'account': self._cache.get('account')})
-        return validated_data
-
-    # TODO apparently you don't need this
-    def update(self, instance, validated_data):
-        return super().update(instance, self.update_account_value(validated_data))
-
-    # TODO apparently you don't need this
-    def create(self, validated_data):
-        return super().create(self.update_account_value(validated_data))
-
 
 class PaymentSerializer(ValidateRecItems, ModelSerializerRequiredFalsifiable):
     tags = UsageTagSerializer(many=True, read_only=True)
@@ -99,8 +80,8 @@ class PaymentSerializer(ValidateRecItems, ModelSerializerRequiredFalsifiable):
 
     class Meta:
         model = RecurringPayment
-        fields = '__all__'
-        read_only_fields = ('renewal_count',)
+        exclude = ('renewal_month', 'renewal_day')
+        read_only_fields = ('renewal_count', 'last_renewed_on', 'next_renewal_on')
         extra_kwargs = {
             'renewal_date': {
                 'validators': [RenewalDateValidator('12-31')]
@@ -113,14 +94,55 @@ class PaymentSerializer(ValidateRecItems, ModelSerializerRequiredFalsifiable):
         return validated_data
 
 
-class TransactionSerializer(ValidateRecItems, TransactionActions, NoEditModelSerializer, ModelSerializer):
+class TransactionListSerializer(ListSerializer):
+
+    def create(self, validated_data):
+        return Transaction.bulk_record(Transaction(**attrs) for attrs in validated_data)
+
+    def to_representation(self, data):
+        """
+            Transactions are loaded with their accounts and the items they are for
+            are fetched per type with one query each, instead of once per transaction
+        """
+        transactions = data.all() if isinstance(data, Manager) else data
+
+        if isinstance(transactions, QuerySet):
+            transactions = optimize_queryset(transactions, type(self.child))
+
+        transactions = list(transactions)
+        self.child.transaction_items = self.get_transaction_items(transactions)
+        return [self.child.to_representation(transaction) for transaction in transactions]
+
+    @staticmethod
+    def get_transaction_items(transactions: List[Transaction]) -> Dict[Tuple[str, int], Expense | RecurringPayment]:
+        item_ids = defaultdict(set)
+
+        for transaction in transactions:
+            if transaction.transaction_for and transaction.transaction_for_id is not None:
+                item_ids[transaction.transaction_for].add(transaction.transaction_for_id)
+
+        item_models = {'EX': Expense, 'RP': RecurringPayment}
+
+        return {
+            (transaction_for, item.pk): item
+            for transaction_for, ids in item_ids.items()
+            for item in optimize_queryset(
+                item_models[transaction_for].objects.filter(pk__in=ids),
+                ExpenseSerializer if transaction_for == 'EX' else PaymentSerializer
+            )
+        }
+
+
+class TransactionSerializer(ValidateRecItems, TransactionActions, NoEditModelSerializer, CachedFieldsModelSerializer):
     account = AccountSerializer(read_only=True)
     account_id = IntegerField(write_only=True)
     item = None
+    transaction_items: Dict[Tuple[str, int], Expense | RecurringPayment] | None = None
 
     class Meta:
         model = Transaction
-        fields = '__all__'
+        exclude = ('content_hash',)
+        list_serializer_class = TransactionListSerializer
 
     def validate(self, attrs):
         if self.instance:
@@ -128,7 +150,7 @@ class TransactionSerializer(ValidateRecItems, TransactionActions, NoEditModelSer
 
         validated_data: OrderedDict = super().validate(attrs)
         self.transaction_cleaner(
-            self._cache.get('account'),
+            self.identity_map.get(Account, pk=validated_data.get('account_id')),
             validated_data.get('transaction_type'),
             validated_data.get('transaction_for'),
             validated_data.get('transaction_for_id'),
@@ -136,18 +158,79 @@ class TransactionSerializer(ValidateRecItems, TransactionActions, NoEditModelSer
         )
         return validated_data
 
+    def get_item(self, instance: Transaction):
+        if self.transaction_items is not None:
+            return self.transaction_items.get((instance.transaction_for, instance.transaction_for_id))
+        return instance.get_transaction_item()
+
+    @cached_property
+    def item_serializers(self) -> Dict[type, ModelSerializer]:
+        return {
+            Expense: ExpenseSerializer(context=self.context),
+            RecurringPayment: PaymentSerializer(context=self.context)
+        }
+
     def to_representation(self, instance: Transaction):
         representation = super().to_representation(instance)
 
         if instance:
-            if item := instance.get_transaction_item():
-                if isinstance(item, RecurringPayment):
-                    representation.update({
-                        'item': PaymentSerializer(item).data
-                    })
-                elif isinstance(item, Expense):
-                    representation.update({
-                        'item': ExpenseSerializer(item).data
-                    })
+            if item := self.get_item(instance):
+                representation.update({
+                    'item': self.item_serializers[type(item)].to_representation(item)
+                })
 
         return representation
+
+
+class FastTransactionSerializer(FastSerializer):
+    """FastSerializer of TransactionSerializer, adds the expense or payment each transaction is for"""
+
+    @staticmethod
+    def item_queries(rows: List[Dict]) -> List[Tuple[str, FastSerializer, QuerySet]]:
+        """(transaction_for, serializer, queryset) of the items of each type the rows are for"""
+        item_ids = defaultdict(set)
+        for row in rows:
+            if row['transaction_for'] and row['transaction_for_id'] is not None:
+                item_ids[row['transaction_for']].add(row['transaction_for_id'])
+
+        queries = []
+        for transaction_for, ids in item_ids.items():
+            model, serializer_class = (Expense, ExpenseSerializer) if transaction_for == 'EX' else \
+                (RecurringPayment, PaymentSerializer)
+            queries.append((transaction_for, FastSerializer.for_class(serializer_class), model.objects.filter(pk__in=ids)))
+
+        return queries
+
+    def related(self, rows: List[Dict]) -> Dict:
+        related = super().related(rows)
+        related['items'] = items = {}
+
+        for transaction_for, fast, queryset in self.item_queries(rows):
+            item_rows = fast.rows(queryset)
+            items.update({
+                (transaction_for, row['pk']): item for row, item in zip(item_rows, fast.represent(item_rows))
+            })
+
+        return related
+
+    async def arelated(self, rows: List[Dict]) -> Dict:
+        related = await super().arelated(rows)
+        related['items'] = items = {}
+
+        for transaction_for, fast, queryset in self.item_queries(rows):
+            item_rows = await fast.arows(queryset)
+            items.update({
+                (transaction_for, row['pk']): item for row, item in zip(item_rows, await fast.arepresent(item_rows))
+            })
+
+        return related
+
+    def represent(self, rows: List[Dict], related: Dict = None) -> List[Dict]:
+        related = self.related(rows) if related is None else related
+        representations = super().represent(rows, related)
+
+        for row, representation in zip(rows, representations):
+            if item := related['items'].get((row['transaction_for'], row['transaction_for_id'])):
+                representation['item'] = item
+
+        return representations
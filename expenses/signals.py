@@ -0,0 +1,30 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .models import Expense, MonthlySpend
+
+
+@receiver(m2m_changed, sender=Expense.tags.through)
+def update_monthly_spend_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Move expenses in and out of the tag rows of the monthly spend rollup as tags change"""
+    if action in ('pre_remove', 'pre_clear'):
+        # only pairs that exist are removed, remember them before they are gone
+        links = sender.objects.filter(**{'usagetag' if reverse else 'expense': instance})
+        if pk_set is not None:
+            links = links.filter(**{'expense__in' if reverse else 'usagetag__in': pk_set})
+        instance._removed_tag_pairs = list(links.values_list('expense', 'usagetag'))
+        return
+
+    if action in ('post_remove', 'post_clear'):
+        pairs, sign = getattr(instance, '_removed_tag_pairs', []), -1
+    elif action == 'post_add':
+        pairs, sign = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set], 1
+    else:
+        return
+
+    expenses = Expense.objects.in_bulk({expense_id for expense_id, _ in pairs})
+
+    for expense_id, tag_id in pairs:
+        if key := expenses[expense_id].rollup_key:
+            user_id, month, amount = key
+            MonthlySpend.apply(user_id, month, [tag_id], sign * amount, sign)
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable, List, Sequence, Tuple, Type
+
+from django.db import transaction as db_transaction
+from django.db.models import Model
+
+from core.models import User
+from core.reference_data import reference_data
+from .models import Expense, MonthlySpend, RecurringPayment, UsageTag
+
+TAGGABLE = {
+    'expenses': Expense,
+    'payments': RecurringPayment,
+}
+
+
+@dataclass
+class TaggingResult:
+    # items of the user among the ids given
+    items: int = 0
+    added: int = 0
+    removed: int = 0
+
+
+def resolve_tags(codes: Iterable[str]) -> Tuple[List[UsageTag], List[str]]:
+    """The tags of `codes` and the codes that do not exist"""
+    tags, unknown = [], []
+
+    for code in dict.fromkeys(codes):
+        try:
+            tags.append(reference_data.get(UsageTag, code=code))
+        except UsageTag.DoesNotExist:
+            unknown.append(code)
+
+    return tags, unknown
+
+
+def change_tags(
+        model: Type[Model], user: User, item_ids: Sequence[int], tags: Sequence[UsageTag], remove: bool = False,
+        batch_size: int = 1000
+) -> TaggingResult:
+    """
+        Add `tags` to (or remove them from) the items of `user` among `item_ids`
+
+        - Each batch of items is one database transaction: the items are locked, the links
+          they already have are read once, new links are written with one bulk_create and
+          removed ones with one delete
+        - Bulk writes skip m2m_changed, the monthly spend rollup of expenses is updated here,
+          once per user, month and tag
+    """
+    result = TaggingResult()
+    tags_field = model._meta.get_field('tags')
+    through = tags_field.remote_field.through
+    item_column, tag_column = f'{tags_field.m2m_field_name()}_id', f'{tags_field.m2m_reverse_field_name()}_id'
+    tag_ids = [tag.pk for tag in tags]
+    item_ids = list(dict.fromkeys(item_ids))
+
+    for start in range(0, len(item_ids), batch_size):
+        with db_transaction.atomic():
+            # locked so links read here are still there (or still missing) when written
+            items = list(
+                model.objects.select_for_update().filter(pk__in=item_ids[start:start + batch_size], user=user).only(
+                    *(('user_id', 'date_occurred', 'amount') if model is Expense else ('user_id',))
+                )
+            )
+            links = through.objects.filter(
+                **{f'{item_column}__in': [item.pk for item in items], f'{tag_column}__in': tag_ids}
+            )
+            existing = set(links.values_list(item_column, tag_column))
+
+            if remove:
+                changed = existing
+                if changed:
+                    links.delete()
+            else:
+                changed = [(item.pk, tag_id) for item in items for tag_id in tag_ids if (item.pk, tag_id) not in existing]
+                through.objects.bulk_create(
+                    [through(**{item_column: item_id, tag_column: tag_id}) for item_id, tag_id in changed],
+                    ignore_conflicts=True
+                )
+
+            if model is Expense:
+                update_rollups(items, changed, -1 if remove else 1)
+
+        result.items += len(items)
+        if remove:
+            result.removed += len(changed)
+        else:
+            result.added += len(changed)
+
+    return result
+
+
+def update_rollups(expenses: List[Expense], links: Iterable[Tuple[int, int]], sign: int):
+    by_pk = {expense.pk: expense for expense in expenses}
+    changes = defaultdict(lambda: [0, 0])
+
+    for expense_id, tag_id in links:
+        if key := by_pk[expense_id].rollup_key:
+            user_id, month, amount = key
+            changes[(user_id, month, tag_id)][0] += sign * amount
+            changes[(user_id, month, tag_id)][1] += sign
+
+    for (user_id, month, tag_id), (amount, count) in changes.items():
+        MonthlySpend.apply(user_id, month, [tag_id], amount, count)
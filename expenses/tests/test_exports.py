@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from datetime import date
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Currency, User, AccountType, Account
+from expenses import exports
+from expenses.models import Transaction, Expense, UsageTag
+
+
+class ExportsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.user = User.objects.create(username='rih', email='rih@tfinance.io', currency=self.currency)
+        self.account = Account.objects.create(
+            account_type=AccountType.objects.create(name='Mobile Money', code='MNO'),
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+            active=True
+        )
+        food = UsageTag.objects.create(title='Food', code='FD')
+        fare = UsageTag.objects.create(title='Fare', code='FR')
+
+        for day in range(1, 6):
+            expense = Expense.objects.create(
+                user=self.user, amount=day, narration=f'Day, {day}', date_occurred=date(2023, 1, day)
+            )
+            expense.tags.add(food, *([fare] if day % 2 else []))
+
+    def test_chunks(self):
+        expenses = Expense.objects.all()
+        with self.assertNumQueries(3):
+            sizes = [len(rows) for rows in exports.chunks(expenses, ['id'], 2)]
+        self.assertListEqual([2, 2, 1], sizes)
+
+    def test_csv(self):
+        with self.assertNumQueries(2 * 2):
+            lines = list(exports.export_lines('expenses', 'csv', Expense.objects.all(), chunk_size=3))
+
+        rows = list(csv.reader(io.StringIO(''.join(lines))))
+        self.assertListEqual(list(exports.EXPENSE_COLUMNS), rows[0])
+        self.assertEquals(6, len(rows))
+        self.assertListEqual(['1', '2023-01-01', '1', 'False', 'Day, 1', 'FD FR'], rows[1][:6])
+        self.assertEquals('FD', rows[2][5])
+
+    def test_ndjson(self):
+        Transaction.objects.create(
+            transaction_type='CD', amount=100, account=self.account
+        )
+        lines = list(exports.export_lines('transactions', 'ndjson', Transaction.objects.all()))
+
+        self.assertEquals(1, len(lines))
+        row = json.loads(lines[0])
+        self.assertEquals(100, row['amount'])
+        self.assertEquals('SAF', row['account_provider'])
+
+    def test_dated(self):
+        queryset = exports.dated('expenses', Expense.objects.all(), date(2023, 1, 2), date(2023, 1, 3))
+        self.assertListEqual([2, 3], list(queryset.order_by('amount').values_list('amount', flat=True)))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_ledger', 'expenses', '--output', 'ndjson', '--start', '2023-01-05', stdout=out)
+        self.assertListEqual([5], [json.loads(line)['amount'] for line in out.getvalue().splitlines()])
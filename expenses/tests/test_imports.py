@@ -0,0 +1,103 @@
+import io
+import os
+import tempfile
+from datetime import date
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Currency, User, AccountType, Account
+from expenses.imports import import_statement
+from expenses.models import Transaction, Expense, MonthlySpend
+
+STATEMENT = '''date,type,amount,charge,account,narration
+2023-01-01 08:00:00,CD,1000,0,01,Salary
+2023-01-01 09:00:00,DB,200,5,01,Lunch
+2023-01-01 09:00:00,DB,200,5,01,Lunch
+2023-01-02,debit,1.5,0,01,Fare
+2023-01-02,DB,50,0,09,Fare
+2023-01-03,DB,100,0,02,Fare
+'''
+
+
+class StatementImportTestCase(TestCase):
+
+    def setUp(self) -> None:
+        currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.user = User.objects.create(username='rih', email='rih@tfinance.io', currency=currency)
+        account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+        self.account = Account.objects.create(
+            account_type=account_type, user=self.user, account_number='01', account_provider='SAF', active=True
+        )
+        self.inactive = Account.objects.create(
+            account_type=account_type, user=self.user, account_number='02', account_provider='SAF'
+        )
+
+    def test_import(self):
+        result = import_statement(io.StringIO(STATEMENT), self.user, batch_size=2)
+
+        self.assertEquals(6, result.rows)
+        self.assertEquals(3, result.created)
+        self.assertEquals(0, result.duplicates)
+        self.assertEquals(3, result.error_count)
+        self.assertListEqual([5, 6, 7], [line for line, _ in result.errors])
+        self.assertIn('amount', result.errors[0][1])
+        self.assertIn('account', result.errors[1][1])
+        self.assertIn('account', result.errors[2][1])
+
+        self.account.refresh_from_db()
+        self.assertEquals(1000 - 400, self.account.balance)
+        self.assertEquals(2, Transaction.objects.filter(transaction_type='DB', transaction_charge=5).count())
+        self.assertEquals(
+            date(2023, 1, 1),
+            Transaction.objects.order_by('pk').first().transaction_date.date()
+        )
+
+        # importing again adds nothing
+        result = import_statement(io.StringIO(STATEMENT), self.user, batch_size=4)
+        self.assertEquals(3, result.duplicates)
+        self.assertEquals(0, result.created)
+        self.account.refresh_from_db()
+        self.assertEquals(600, self.account.balance)
+
+    def test_import_columns_and_expenses(self):
+        statement = 'When,Amount,Details,Receipt\n2023-01-05,-300,Groceries,QX1\n2023-01-06,-300,Groceries,QX2\n'
+        columns = {'transaction_date': 'When', 'amount': 'Amount', 'narration': 'Details', 'reference': 'Receipt'}
+
+        # accounts, duplicates, then the expenses (insert and a new rollup row) and the transactions
+        # (insert, balance and a snapshot per day) in savepoints of the batch transaction
+        with self.assertNumQueries(2 + 1 + (1 + 1 + 3 + 1) + (1 + 1 + 1 + 4 + 2 + 1) + 1):
+            result = import_statement(
+                io.StringIO(statement), self.user, self.account, columns, create_expenses=True
+            )
+        self.assertEquals(2, result.created)
+
+        transactions = Transaction.objects.order_by('pk')
+        self.assertListEqual(['EX', 'EX'], [tr.transaction_for for tr in transactions])
+        self.assertListEqual(
+            ['Groceries', 'Groceries'],
+            [Expense.objects.get(pk=tr.transaction_for_id).narration for tr in transactions]
+        )
+        self.assertEquals(600, MonthlySpend.objects.get(user=self.user, tag=None).amount)
+
+        # a receipt already imported is a duplicate whatever the rest of the row says
+        statement = 'When,Amount,Details,Receipt\n2023-01-07,-10,Fare,QX2\n'
+        result = import_statement(io.StringIO(statement), self.user, self.account, columns)
+        self.assertEquals(1, result.duplicates)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('When,amount\n2023-01-05,250\n')
+
+        try:
+            out = io.StringIO()
+            call_command(
+                'import_statement', file.name, '--user', self.user.pk, '--account', self.account.pk,
+                '--column', 'transaction_date=When', stdout=out
+            )
+        finally:
+            os.unlink(file.name)
+
+        self.assertIn('1 imported', out.getvalue())
+        self.account.refresh_from_db()
+        self.assertEquals(250, self.account.balance)
@@ -1,9 +1,13 @@
-from django.test import TestCase
-from django.db import IntegrityError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.db import IntegrityError, connection
 from django.core.exceptions import PermissionDenied
+from django.utils import timezone
 
-from core.models import User, Account, Currency, AccountType
-from expenses.models import UsageTag, Expense, RecurringPayment, Transaction
+from core.models import User, Account, Currency, AccountType, AccountBalanceSnapshot
+from expenses.models import UsageTag, Expense, RecurringPayment, Transaction, MonthlySpend
 
 
 class ExpenseModelsTestCase(TestCase):
@@ -25,7 +29,7 @@ class ExpenseModelsTestCase(TestCase):
             account_provider='SAF',
         )
         self.expense = Expense.objects.create(
-            account=self.account,
+            user=self.user,
             date_occurred='2022-03-02'
         )
         self.payment = RecurringPayment.objects.create(
@@ -44,7 +48,7 @@ class ExpenseModelsTestCase(TestCase):
     def test_expense(self):
         self.expense.tags.add(self.usage_tag, self.usage_tag_2)
         self.assertFalse(self.expense.planned)
-        self.assertTrue(all([num == 0 for num in [self.expense.transaction_charge, self.expense.amount]]))
+        self.assertEquals(self.expense.amount, 0)
         self.assertIsNotNone(self.expense.date_created)
         self.assertListEqual(
             [tag.code for tag in self.expense.tags.all()],
@@ -53,7 +57,7 @@ class ExpenseModelsTestCase(TestCase):
 
     def test_recurring_payments(self):
         self.payment.tags.add(self.usage_tag, self.usage_tag_2)
-        self.assertTrue(all([num == 0 for num in [self.payment.transaction_charge, self.payment.amount]]))
+        self.assertEquals(self.payment.amount, 0)
         self.assertIsNotNone(self.payment.date_added)
         self.assertIsNotNone(self.payment.date_modified)
         self.assertIs(self.payment.renewal_count, 0)
@@ -80,3 +84,329 @@ class ExpenseModelsTestCase(TestCase):
         self.assertEquals(self.account.balance, 0 - 400)
         transaction.delete()
         self.assertEquals(self.account.balance, 0)
+
+
+class TransactionBulkRecordTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            username='tyne',
+            email='tyne@tfinance.io',
+            currency=Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        )
+        self.account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+        self.account = Account.objects.create(
+            account_type=self.account_type,
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+            active=True
+        )
+        self.account_2 = Account.objects.create(
+            account_type=self.account_type,
+            user=self.user,
+            account_number='02',
+            account_provider='SAF',
+            active=True
+        )
+
+    def test_bulk_record(self):
+        transactions = [
+            Transaction(transaction_type='DB', amount=100, account=self.account),
+            Transaction(transaction_type='DB', amount=250, account=self.account),
+            Transaction(transaction_type='CD', amount=1000, account=self.account),
+            Transaction(transaction_type='CD', amount=40, account=self.account_2),
+        ]
+
+        # savepoint, one insert, per account a balance update and the day's snapshot
+        # (shift, lookup, balance read and insert) and the savepoint release
+        with self.assertNumQueries(1 + 1 + 2 * (1 + 4) + 1):
+            Transaction.bulk_record(transactions)
+
+        self.assertEquals(Transaction.objects.filter(account=self.account).count(), 3)
+        self.account.refresh_from_db()
+        self.account_2.refresh_from_db()
+        self.assertEquals(self.account.balance, 1000 - 100 - 250)
+        self.assertEquals(self.account_2.balance, 40)
+        self.assertIsNotNone(self.account.last_balance_update)
+        self.assertIsNotNone(self.account_2.last_balance_update)
+
+        self.assertRaises(
+            PermissionDenied,
+            Transaction.bulk_record,
+            Transaction.objects.filter(account=self.account)
+        )
+
+
+class TransactionBalanceConcurrencyTestCase(TransactionTestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            username='tyne',
+            email='tyne@tfinance.io',
+            currency=Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        )
+        self.account = Account.objects.create(
+            account_type=AccountType.objects.create(name='Mobile Money', code='MNO'),
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+            active=True,
+            balance=1000
+        )
+
+    def test_stale_account_instances(self):
+        # both instances were loaded before either transaction was written
+        stale_1 = Account.objects.get(pk=self.account.pk)
+        stale_2 = Account.objects.get(pk=self.account.pk)
+        Transaction.objects.create(transaction_type='DB', amount=100, account=stale_1)
+        transaction = Transaction.objects.create(transaction_type='CD', amount=30, account=stale_2)
+        self.account.refresh_from_db()
+        self.assertEquals(self.account.balance, 1000 - 100 + 30)
+
+        transaction.delete()
+        self.account.refresh_from_db()
+        self.assertEquals(self.account.balance, 1000 - 100)
+
+    @skipUnlessDBFeature('test_db_allows_multiple_connections')
+    def test_parallel_writers(self):
+        writers, per_writer = 8, 10
+
+        def write(writer: int):
+            try:
+                account = Account.objects.get(pk=self.account.pk)
+                for _ in range(per_writer):
+                    Transaction.objects.create(
+                        transaction_type='DB' if writer % 2 else 'CD',
+                        amount=writer + 1,
+                        account=account
+                    )
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=writers) as executor:
+            list(executor.map(write, range(writers)))
+
+        expected = 1000 + sum(
+            (-1 if writer % 2 else 1) * (writer + 1) * per_writer for writer in range(writers)
+        )
+        self.account.refresh_from_db()
+        self.assertEquals(Transaction.objects.filter(account=self.account).count(), writers * per_writer)
+        self.assertEquals(self.account.balance, expected)
+
+
+    @skipUnlessDBFeature('test_db_allows_multiple_connections')
+    def test_parallel_deletes(self):
+        for amount in range(1, 11):
+            Transaction.objects.create(transaction_type='DB', amount=amount, account=self.account)
+
+        def delete(_):
+            try:
+                return Transaction.objects.filter(account=self.account).delete()[0]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            deleted = list(executor.map(delete, range(4)))
+
+        # the rows are reversed once, by the delete that got them
+        self.assertEquals(10, sum(deleted))
+        self.account.refresh_from_db()
+        self.assertEquals(1000, self.account.balance)
+
+class AccountBalanceSnapshotTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            username='tyne',
+            email='tyne@tfinance.io',
+            currency=Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        )
+        self.account = Account.objects.create(
+            account_type=AccountType.objects.create(name='Mobile Money', code='MNO'),
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+            active=True,
+            balance=1000
+        )
+        self.today = timezone.localdate()
+
+    def backdate(self, transaction: Transaction, days: int):
+        transaction.transaction_date -= timedelta(days=days)
+        Transaction.objects.filter(pk=transaction.pk).update(transaction_date=transaction.transaction_date)
+
+    def test_snapshots_maintained(self):
+        before = timezone.now()
+        Transaction.objects.create(transaction_type='DB', amount=100, account=self.account)
+        transaction = Transaction.objects.create(transaction_type='CD', amount=50, account=self.account)
+        snapshot = AccountBalanceSnapshot.objects.get(account=self.account)
+        self.assertEquals(snapshot.snapshot_date, self.today)
+        self.assertEquals(snapshot.balance, 950)
+
+        # opening balance is recovered by walking back from the snapshot
+        self.assertEquals(self.account.balance_at(before), 1000)
+        self.assertEquals(self.account.balance_at(timezone.now()), 950)
+
+        transaction.delete()
+        snapshot.refresh_from_db()
+        self.assertEquals(snapshot.balance, 900)
+
+    def test_balance_at(self):
+        first = Transaction.objects.create(transaction_type='DB', amount=100, account=self.account)
+        second = Transaction.objects.create(transaction_type='DB', amount=200, account=self.account)
+        self.backdate(first, 10)
+        self.backdate(second, 5)
+        AccountBalanceSnapshot.objects.filter(account=self.account).delete()
+        AccountBalanceSnapshot.objects.create(
+            account=self.account, snapshot_date=self.today - timedelta(days=10), balance=900
+        )
+        Transaction.objects.create(transaction_type='CD', amount=1000, account=self.account)
+
+        self.assertEquals(AccountBalanceSnapshot.objects.filter(account=self.account).count(), 2)
+        self.assertEquals(self.account.balance_at(first.transaction_date - timedelta(days=1)), 1000)
+        self.assertEquals(self.account.balance_at(first.transaction_date), 900)
+        self.assertEquals(self.account.balance_at(second.transaction_date - timedelta(seconds=1)), 900)
+        self.assertEquals(self.account.balance_at(second.transaction_date), 700)
+        self.assertEquals(self.account.balance_at(timezone.now()), 1700)
+
+        # only the tail after the nearest snapshot is replayed
+        with self.assertNumQueries(2):
+            self.account.balance_at(second.transaction_date)
+
+        # deleting an old transaction shifts every snapshot from its day on
+        first.delete()
+        self.assertListEqual(
+            list(AccountBalanceSnapshot.objects.filter(account=self.account).order_by(
+                'snapshot_date'
+            ).values_list('balance', flat=True)),
+            [1000, 1800]
+        )
+        self.assertEquals(self.account.balance_at(timezone.now()), 1800)
+
+    def test_queryset_delete(self):
+        other = Account.objects.create(
+            account_type=self.account.account_type, user=self.user, account_number='02', account_provider='SAF'
+        )
+        old = Transaction.objects.create(transaction_type='DB', amount=100, account=self.account)
+        self.backdate(old, 10)
+        AccountBalanceSnapshot.objects.create(
+            account=self.account, snapshot_date=self.today - timedelta(days=10), balance=900
+        )
+        for amount in range(1, 21):
+            Transaction.objects.create(transaction_type='CD', amount=amount, account=self.account)
+            Transaction.objects.create(transaction_type='DB', amount=amount, account=other)
+        kept = Transaction.objects.create(transaction_type='CD', amount=5, account=self.account)
+
+        # savepoint and release, the lock, the aggregate and the delete, then per account a balance update
+        # and per day of its transactions a snapshot update and check, however many rows go
+        stale = Transaction.objects.exclude(pk=kept.pk)
+        with self.assertNumQueries(2 + 3 + (1 + 2 * 2) + (1 + 2)):
+            deleted, _ = Transaction.objects.exclude(pk=kept.pk).delete()
+
+        self.assertEquals(41, deleted)
+        self.assertListEqual(
+            [(self.account.pk, 1005), (other.pk, 0)],
+            list(Account.objects.filter(pk__in=[self.account.pk, other.pk]).order_by('pk').values_list('pk', 'balance'))
+        )
+        self.assertListEqual(
+            [1000, 1005],
+            list(AccountBalanceSnapshot.objects.filter(account=self.account).order_by(
+                'snapshot_date'
+            ).values_list('balance', flat=True))
+        )
+        self.assertRaises(TypeError, Transaction.objects.all()[:1].delete)
+
+        # deleting the same rows again reverses nothing
+        self.assertEquals((0, {}), stale.delete())
+        self.assertEquals(1005, Account.objects.get(pk=self.account.pk).balance)
+
+
+class MonthlySpendTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            username='tyne',
+            email='tyne@tfinance.io',
+            currency=Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        )
+        self.food = UsageTag.objects.create(title='FOOD', code='FD')
+        self.rent = UsageTag.objects.create(title='Rent', code='RNT')
+
+    def rollup(self):
+        return {
+            (row.month, row.tag_id): (row.amount, row.expense_count)
+            for row in MonthlySpend.objects.filter(user=self.user) if row.expense_count
+        }
+
+    def assertRollupMatchesRebuild(self):
+        rollup = self.rollup()
+        MonthlySpend.rebuild()
+        self.assertDictEqual(rollup, self.rollup())
+
+    def test_monthly_spend(self):
+        lunch = Expense.objects.create(user=self.user, amount=300, date_occurred='2023-01-12')
+        dinner = Expense.objects.create(user=self.user, amount=700, date_occurred=date(2023, 1, 20))
+        Expense.objects.create(user=self.user, amount=5000, date_occurred='2023-02-01').tags.add(self.rent)
+        lunch.tags.add(self.food)
+        dinner.tags.add(self.food, self.rent)
+
+        jan, feb = date(2023, 1, 1), date(2023, 2, 1)
+        self.assertDictEqual(self.rollup(), {
+            (jan, None): (1000, 2),
+            (jan, self.food.pk): (1000, 2),
+            (jan, self.rent.pk): (700, 1),
+            (feb, None): (5000, 1),
+            (feb, self.rent.pk): (5000, 1),
+        })
+        self.assertRollupMatchesRebuild()
+
+        # updated, moved to another month, re-tagged and deleted
+        dinner = Expense.objects.get(pk=dinner.pk)
+        dinner.amount = 900
+        dinner.save()
+        lunch = Expense.objects.get(pk=lunch.pk)
+        lunch.date_occurred = '2023-02-10'
+        lunch.save()
+        self.rent.expense_set.remove(dinner)
+        dinner.tags.remove(self.rent)
+        lunch.tags.clear()
+        lunch.tags.add(self.rent)
+
+        self.assertDictEqual(self.rollup(), {
+            (jan, None): (900, 1),
+            (jan, self.food.pk): (900, 1),
+            (feb, None): (5300, 2),
+            (feb, self.rent.pk): (5300, 2),
+        })
+        self.assertRollupMatchesRebuild()
+
+        Expense.objects.get(pk=dinner.pk).delete()
+        self.assertDictEqual(self.rollup(), {
+            (feb, None): (5300, 2),
+            (feb, self.rent.pk): (5300, 2),
+        })
+        self.assertRollupMatchesRebuild()
+
+
+class MonthlySpendConcurrencyTestCase(TransactionTestCase):
+
+    @skipUnlessDBFeature('test_db_allows_multiple_connections')
+    def test_parallel_first_expenses(self):
+        user = User.objects.create(username='tyne', email='tyne@tfinance.io')
+        writers = 8
+
+        def write(writer: int):
+            try:
+                Expense.objects.create(user=user, amount=writer + 1, date_occurred='2023-01-12')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=writers) as executor:
+            list(executor.map(write, range(writers)))
+
+        # one row of all tags for the month however the first expenses raced
+        self.assertListEqual(
+            [(sum(range(1, writers + 1)), writers)],
+            list(MonthlySpend.objects.filter(user=user, tag__isnull=True).values_list('amount', 'expense_count'))
+        )
@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Currency, User, AccountType, Account
+from expenses.models import Transaction
+from expenses.reconciliation import BalanceDrift, reconcile_balances, reconcile_shard
+
+
+def create_accounts():
+    """Five accounts, the second with a ledger that drifted and the fourth with a balance that did"""
+    user = User.objects.create(
+        username='tyne',
+        email='tyne@tfinance.io',
+        currency=Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+    )
+    account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+    accounts = [
+        Account.objects.create(
+            account_type=account_type, user=user, account_number=f'0{number}', account_provider='SAF'
+        )
+        for number in range(5)
+    ]
+
+    for account in accounts[:3]:
+        Transaction.objects.create(account=account, transaction_type='CD', amount=500)
+        Transaction.objects.create(account=account, transaction_type='DB', amount=200)
+
+    # drift: updates that skip the balance
+    Transaction.objects.filter(account=accounts[1], transaction_type='DB').update(amount=0)
+    Account.objects.filter(pk=accounts[3].pk).update(balance=40)
+
+    return accounts
+
+
+class ReconciliationTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.accounts = create_accounts()
+
+    def test_reconcile_shard(self):
+        with self.assertNumQueries(2):
+            result = reconcile_shard(self.accounts[0].pk, self.accounts[-1].pk + 1)
+
+        self.assertEquals((5, 2, 0), (result.accounts, result.drifted, result.fixed))
+        self.assertListEqual(
+            [BalanceDrift(self.accounts[1].pk, 300, 500), BalanceDrift(self.accounts[3].pk, 40, 0)],
+            result.drifts
+        )
+        self.assertEquals(-200, result.drifts[0].drift)
+
+        # only the accounts in the shard
+        result = reconcile_shard(self.accounts[2].pk, self.accounts[4].pk)
+        self.assertEquals((2, 1), (result.accounts, result.drifted))
+
+    def test_reconcile_balances(self):
+        result = reconcile_balances(fix=True, shard_size=2, report_limit=1)
+
+        self.assertEquals((5, 2, 2), (result.accounts, result.drifted, result.fixed))
+        self.assertListEqual([BalanceDrift(self.accounts[1].pk, 300, 500)], result.drifts)
+        self.assertListEqual(
+            [300, 500, 300, 0, 0],
+            [account.balance for account in Account.objects.order_by('pk')]
+        )
+        self.assertEquals(0, reconcile_balances().drifted)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('reconcile_balances', stdout=out)
+        self.assertListEqual(
+            [
+                f'account {self.accounts[1].pk}: balance 300, ledger 500, drift -200',
+                f'account {self.accounts[3].pk}: balance 40, ledger 0, drift 40',
+                '5 accounts, 2 drifted, 0 fixed',
+            ],
+            out.getvalue().splitlines()
+        )
+
+
+class ParallelReconciliationTestCase(TransactionTestCase):
+    """Forked workers connect to the test database, it has to be one they can reach (not SQLite in memory)"""
+
+    def setUp(self) -> None:
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('forked workers can not reach an in-memory SQLite database')
+        self.accounts = create_accounts()
+
+    def test_workers(self):
+        result = reconcile_balances(fix=True, shard_size=2, workers=2, report_limit=1)
+
+        # the shards of the workers are merged, drifts in id order up to the report limit
+        self.assertEquals((5, 2, 2), (result.accounts, result.drifted, result.fixed))
+        self.assertListEqual([BalanceDrift(self.accounts[1].pk, 300, 500)], result.drifts)
+        self.assertListEqual(
+            [300, 500, 300, 0, 0],
+            [account.balance for account in Account.objects.order_by('pk')]
+        )
+        self.assertEquals(0, reconcile_balances(workers=2, shard_size=1).drifted)
@@ -0,0 +1,143 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Currency, User, AccountType, Account
+from expenses.models import RecurringPayment, Transaction
+from expenses.renewals import due_payments, renew_payments
+from expenses.utils import RenewalDateCalculator
+
+
+class RenewalsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            username='tyne',
+            email='tyne@tfinance.io',
+            currency=Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        )
+        self.account = Account.objects.create(
+            account_type=AccountType.objects.create(name='Mobile Money', code='MNO'),
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+            active=True
+        )
+        self.monthly = self.payment(renewal_date='31', amount=100, last_renewed_on='2023-01-31')
+        self.annual = self.payment(renewal_date='02-29', amount=1000, last_renewed_on='2022-02-28')
+        self.not_due = self.payment(renewal_date='15', amount=10, last_renewed_on='2023-02-15')
+        self.ended = self.payment(renewal_date='28', amount=10, last_renewed_on='2023-01-28', end_date='2023-02-01')
+        self.never_paid = RecurringPayment.objects.create(
+            user=self.user, start_date='2020-01-01', renewal_date='28', amount=10, last_renewed_on='2023-01-28'
+        )
+
+    def payment(self, **kwargs) -> RecurringPayment:
+        payment = RecurringPayment.objects.create(user=self.user, start_date='2020-01-01', **kwargs)
+        Transaction.objects.create(
+            transaction_type='DB',
+            transaction_for='RP',
+            transaction_for_id=payment.pk,
+            amount=payment.amount,
+            account=self.account
+        )
+        return payment
+
+    def test_next_renewal(self):
+        self.assertEquals(RenewalDateCalculator.parse('05'), (None, 5))
+        self.assertEquals(RenewalDateCalculator.parse('12-31'), (12, 31))
+        self.assertEquals(RenewalDateCalculator.next_renewal(None, 31, date(2023, 1, 31)), date(2023, 2, 28))
+        self.assertEquals(RenewalDateCalculator.next_renewal(None, 31, date(2023, 12, 31)), date(2024, 1, 31))
+        self.assertEquals(RenewalDateCalculator.next_renewal(None, 5, date(2023, 3, 4)), date(2023, 3, 5))
+        self.assertEquals(RenewalDateCalculator.next_renewal(2, 29, date(2023, 1, 1)), date(2023, 2, 28))
+        self.assertEquals(RenewalDateCalculator.next_renewal(2, 29, date(2023, 2, 28)), date(2024, 2, 29))
+        self.assertEquals(
+            RenewalDateCalculator.next_renewal(None, 5, date(2023, 3, 4), start_date=date(2023, 6, 1)),
+            date(2023, 6, 5)
+        )
+        self.assertIsNone(RenewalDateCalculator.next_renewal(None, 5, date(2023, 3, 5), end_date=date(2023, 4, 1)))
+
+    def test_renewal_fields(self):
+        self.assertEquals(self.monthly.next_renewal_on, date(2023, 2, 28))
+        self.assertEquals((self.annual.renewal_month, self.annual.renewal_day), (2, 29))
+        self.assertIsNone(self.ended.next_renewal_on)
+
+        # payments not renewed yet are next due from today on
+        payment = RecurringPayment.objects.create(user=self.user, start_date='2020-01-01', renewal_date='12-31')
+        self.assertEquals(payment.next_renewal_on, date(timezone.localdate().year, 12, 31))
+        payment.renewal_date = f'{timezone.localdate():%m-%d}'
+        payment.save(update_fields=['renewal_date'])
+        payment.refresh_from_db()
+        self.assertEquals(payment.next_renewal_on, timezone.localdate())
+
+        for renewal_date in ('0', '00', '13-01', 'x'):
+            with self.assertRaises(ValidationError):
+                RecurringPayment.objects.create(user=self.user, start_date='2020-01-01', renewal_date=renewal_date)
+
+    def test_overdue_payment_keeps_its_renewal(self):
+        RecurringPayment.objects.filter(pk=self.never_paid.pk).update(
+            last_renewed_on=None, next_renewal_on=date(2023, 2, 28)
+        )
+        payment = RecurringPayment.objects.get(pk=self.never_paid.pk)
+
+        # editing anything but the schedule leaves the renewal still to be posted
+        payment.narration = 'Gym'
+        payment.amount = 20
+        payment.save()
+        payment.refresh_from_db()
+        self.assertEquals(payment.next_renewal_on, date(2023, 2, 28))
+
+        payment.start_date = date(2030, 1, 1)
+        payment.save()
+        payment.refresh_from_db()
+        self.assertEquals(payment.next_renewal_on, date(2030, 1, 28))
+
+    def test_due_payments(self):
+        self.assertSetEqual(
+            set(due_payments(date(2023, 2, 28))),
+            {self.monthly, self.annual, self.never_paid}
+        )
+        self.assertSetEqual(set(due_payments(date(2023, 2, 27))), set())
+
+        # upcoming payments are a range on next_renewal_on
+        self.assertSetEqual(
+            set(RecurringPayment.objects.filter(
+                user=self.user,
+                next_renewal_on__range=(date(2023, 3, 10), date(2023, 3, 17))
+            )),
+            {self.not_due}
+        )
+
+    def test_renew_payments(self):
+        self.account.refresh_from_db()
+        balance = self.account.balance
+
+        result = renew_payments(date(2023, 2, 28), batch_size=2)
+        self.assertEquals(result.renewed, 2)
+        self.assertEquals(result.skipped, 1)
+
+        renewals = Transaction.objects.filter(automatic=True)
+        self.assertSetEqual(
+            set(renewals.values_list('transaction_for_id', 'amount', 'account')),
+            {(self.monthly.pk, 100, self.account.pk), (self.annual.pk, 1000, self.account.pk)}
+        )
+        self.account.refresh_from_db()
+        self.assertEquals(self.account.balance, balance - 1100)
+
+        for payment, next_renewal in ((self.monthly, date(2023, 3, 31)), (self.annual, date(2024, 2, 29))):
+            payment.refresh_from_db()
+            self.assertEquals(payment.renewal_count, 1)
+            self.assertEquals(payment.last_renewed_on, date(2023, 2, 28))
+            self.assertEquals(payment.next_renewal_on, next_renewal)
+
+        # running again for the same date does nothing
+        result = renew_payments(date(2023, 2, 28))
+        self.assertEquals(result.renewed, 0)
+        self.assertEquals(renewals.count(), 2)
+
+        # payments from inactive accounts are skipped
+        Account.objects.filter(pk=self.account.pk).update(active=False)
+        result = renew_payments(date(2023, 3, 31))
+        self.assertEquals(result.renewed, 0)
+        self.assertEquals(result.skipped, 3)
@@ -1,11 +1,18 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.test import TestCase
+from django.utils import timezone
 from django.core.exceptions import PermissionDenied
 
+from core.fast_serializers import FastSerializer
 from core.models import Currency, User, Account, AccountType
-from core.serializers import AccountTypeSerializer, UserSerializer, AccountSerializer
+from core.optimizer import optimize_queryset
+from core.serializers import UserSerializer, AccountSerializer
 from core.utils import DateTimeFormatter
 from expenses.models import UsageTag, Expense, RecurringPayment, Transaction
-from expenses.serializers import UsageTagSerializer, ExpenseSerializer, PaymentSerializer, TransactionSerializer
+from expenses.serializers import UsageTagSerializer, ExpenseSerializer, PaymentSerializer, TransactionSerializer, \
+    FastTransactionSerializer
 
 
 class ExpenseTestCase(DateTimeFormatter, TestCase):
@@ -38,7 +45,7 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
         )
         self.tag = UsageTag.objects.create(title='Rent', code='RNT')
         self.expense = Expense.objects.create(
-            account=self.account,
+            user=self.user,
             planned=True,
             narration="I need a roof",
             amount=6000,
@@ -80,23 +87,13 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
             ExpenseSerializer(instance=self.expense).data,
             {
                 'tags': [{'title': 'Rent', 'code': 'RNT'}],
-                'account': {
-                    'account_type': AccountTypeSerializer(self.account_type).data,
-                    'account_number': '01',
-                    'user': UserSerializer(self.user).data,
-                    'account_provider': 'SAF',
-                    'date_added': self.datetime_timezone_str(self.account.date_added),
-                    'date_modified': self.datetime_timezone_str(self.account.date_modified),
-                    'balance': 0,
-                    'last_balance_update': None,
-                    'active': False,
-                },
+                'user': UserSerializer(self.user).data,
                 'planned': True,
                 'narration': 'I need a roof',
                 'amount': 6000,
                 'date_occurred': '2020-03-23',
-                'transaction_charge': 0,
-                'date_created': self.datetime_timezone_str(self.expense.date_created)
+                'date_created': self.datetime_timezone_str(self.expense.date_created),
+                'date_modified': self.datetime_timezone_str(self.expense.date_modified)
             }
         )
 
@@ -117,20 +114,20 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
         expense = exp.save()
         self.assertEquals(expense.date_occurred, dt.date())
 
-        # an account id that does not exist
+        # a user id that does not exist
         exp = ExpenseSerializer(data={
-            'account_id': 2000
+            'user_id': 2000
         }, instance=self.expense)
         self.assertFalse(exp.is_valid())
-        self.assertListEqual(['account_id'], list(exp.errors.keys()))
+        self.assertListEqual(['user_id'], list(exp.errors.keys()))
 
-        # a correct account ID
+        # a correct user ID
         exp = ExpenseSerializer(data={
-            'account_id': self.account_2.pk
+            'user_id': self.user_2.pk
         }, instance=self.expense)
         self.assertTrue(exp.is_valid())
         expense = exp.save()
-        self.assertEquals(expense.account, self.account_2)
+        self.assertEquals(expense.user, self.user_2)
 
     def test_expense_serializer_create(self):
         exp = ExpenseSerializer(data={
@@ -138,17 +135,17 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
             'narration': 'test',
             'amount': 3000,
             'planned': True,
-            'account_id': 100
+            'user_id': 100
         })
         self.assertFalse(exp.is_valid())
-        self.assertListEqual(['account_id', 'date_occurred'], list(exp.errors.keys()))
+        self.assertListEqual(['user_id', 'date_occurred'], list(exp.errors.keys()))
 
         exp = ExpenseSerializer(data={
             'date_occurred': self.past_date(3).strftime('%Y-%m-%d'),
             'narration': 'test',
             'amount': 3000,
             'planned': True,
-            'account_id': self.account.pk
+            'user_id': self.user.pk
         })
         self.assertTrue(exp.is_valid())
         expense = exp.save()
@@ -156,7 +153,7 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
         self.assertEquals(expense.date_occurred, self.past_date(3).date())
         self.assertEquals(expense.narration, 'test')
         self.assertEquals(expense.amount, 3000)
-        self.assertTrue(self.account.expense_set.filter(pk=expense.pk).exists())
+        self.assertTrue(self.user.expense_set.filter(pk=expense.pk).exists())
 
     def test_payment_serializer(self):
         self.assertDictEqual(
@@ -177,11 +174,12 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
                 },
                 'narration': 'landlord',
                 'amount': 500,
-                'transaction_charge': 0,
                 'start_date': '2020-01-06',
                 'end_date': None,
                 'renewal_date': '10',
                 'renewal_count': 0,
+                'last_renewed_on': None,
+                'next_renewal_on': str(self.payment.next_renewal_on),
                 'date_added': self.datetime_timezone_str(self.payment.date_added),
                 'date_modified': self.datetime_timezone_str(self.payment.date_modified)
             }
@@ -353,6 +351,7 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
                 'transaction_for_id': trans.transaction_for_id,
                 'transaction_date': self.datetime_timezone_str(trans.transaction_date),
                 'amount': trans.amount,
+                'transaction_charge': trans.transaction_charge,
                 'account': AccountSerializer(trans.account).data,
                 'automatic': False,
                 'item': ExpenseSerializer(trans.get_transaction_item()).data
@@ -368,6 +367,7 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
                 'transaction_for_id': self.transaction.transaction_for_id,
                 'transaction_date': self.datetime_timezone_str(self.transaction.transaction_date),
                 'amount': self.transaction.amount,
+                'transaction_charge': self.transaction.transaction_charge,
                 'account': AccountSerializer(self.transaction.account).data,
                 'automatic': False,
                 'item': PaymentSerializer(self.transaction.get_transaction_item()).data
@@ -383,6 +383,7 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
                 'transaction_for_id': self.transaction_2.transaction_for_id,
                 'transaction_date': self.datetime_timezone_str(self.transaction_2.transaction_date),
                 'amount': self.transaction_2.amount,
+                'transaction_charge': self.transaction_2.transaction_charge,
                 'account': AccountSerializer(self.transaction_2.account).data,
                 'automatic': False,
             }
@@ -402,3 +403,86 @@ class ExpenseTestCase(DateTimeFormatter, TestCase):
 
         # error when you try to update using the serializer
         self.assertRaises(PermissionDenied, tr.update, {}, {})
+
+    def test_transaction_list(self):
+        for _ in range(5):
+            Transaction.objects.create(
+                transaction_type='DB',
+                transaction_for='EX',
+                transaction_for_id=self.expense.pk,
+                amount=10,
+                account=self.account_2
+            )
+            Transaction.objects.create(
+                transaction_type='DB',
+                transaction_for='RP',
+                transaction_for_id=self.payment.pk,
+                amount=10,
+                account=self.account_2
+            )
+
+        transactions = Transaction.objects.order_by('pk')
+
+        # transactions, expenses with their tags, payments with their tags
+        with self.assertNumQueries(5):
+            data = TransactionSerializer(transactions, many=True).data
+
+        self.assertEquals(len(data), 12)
+        self.assertListEqual(
+            data,
+            [TransactionSerializer(instance=transaction).data for transaction in transactions]
+        )
+        self.assertFalse('item' in data[1])
+        self.assertEquals(data[2].get('item'), ExpenseSerializer(self.expense).data)
+        self.assertEquals(data[3].get('item'), PaymentSerializer(self.payment).data)
+
+    def test_optimized_querysets(self):
+        for count in (1, 5):
+            for _ in range(count):
+                Expense.objects.create(
+                    user=self.user_2, narration='Fare', amount=10, date_occurred='2020-03-23'
+                ).tags.add(self.tag)
+                RecurringPayment.objects.create(
+                    user=self.user_2, narration='Gym', amount=10, start_date='2020-01-06', renewal_date='10'
+                ).tags.add(self.tag)
+
+            # rows with their users and currencies, then the tags
+            with self.assertNumQueries(2):
+                expenses = ExpenseSerializer(
+                    optimize_queryset(Expense.objects.all(), ExpenseSerializer), many=True
+                ).data
+            with self.assertNumQueries(2):
+                payments = PaymentSerializer(
+                    optimize_queryset(RecurringPayment.objects.all(), PaymentSerializer), many=True
+                ).data
+
+            self.assertEquals(Expense.objects.count(), len(expenses))
+            self.assertEquals(RecurringPayment.objects.count(), len(payments))
+
+    def test_fast_serializers(self):
+        Expense.objects.create(narration='No user', amount=1, date_occurred='2020-03-24')
+        Transaction.objects.create(
+            transaction_type='DB', transaction_for='EX', transaction_for_id=self.expense.pk, amount=10,
+            account=self.account_2
+        )
+        # whole seconds leave the microseconds out of isoformat
+        Expense.objects.filter(pk=self.expense.pk).update(date_created=timezone.now().replace(microsecond=0))
+
+        cases = (
+            (Expense.objects.order_by('pk'), ExpenseSerializer, FastSerializer.for_class(ExpenseSerializer)),
+            (RecurringPayment.objects.all(), PaymentSerializer, FastSerializer.for_class(PaymentSerializer)),
+            (Transaction.objects.order_by('pk'), TransactionSerializer,
+             FastTransactionSerializer.for_class(TransactionSerializer)),
+        )
+
+        for tz in ('Africa/Nairobi', 'UTC'):
+            with timezone.override(tz):
+                for queryset, serializer_class, fast in cases:
+                    self.assertEquals(
+                        json.dumps(serializer_class(queryset, many=True).data, cls=DjangoJSONEncoder),
+                        json.dumps(fast.serialize(queryset), cls=DjangoJSONEncoder)
+                    )
+
+        # rows, tags of the expenses and of the payments
+        with self.assertNumQueries(1 + 2 + 2):
+            FastTransactionSerializer.for_class(TransactionSerializer).serialize(Transaction.objects.all())
@@ -0,0 +1,66 @@
+from django.test import TestCase
+
+from core.models import Currency, User
+from expenses.models import Expense, RecurringPayment, UsageTag, MonthlySpend
+from expenses.tagging import change_tags, resolve_tags
+
+
+class TaggingTestCase(TestCase):
+
+    def setUp(self) -> None:
+        currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.user = User.objects.create(username='rih', email='rih@tfinance.io', currency=currency)
+        self.user_2 = User.objects.create(username='van', email='van@tfinance.io', currency=currency)
+        self.food = UsageTag.objects.create(title='Food', code='FD')
+        self.fare = UsageTag.objects.create(title='Fare', code='FR')
+        self.expenses = [
+            Expense.objects.create(user=self.user, amount=amount, date_occurred=f'2023-0{month}-01')
+            for amount, month in ((100, 1), (200, 1), (400, 2))
+        ]
+        self.other = Expense.objects.create(user=self.user_2, amount=800, date_occurred='2023-01-01')
+
+    def spend(self, tag: UsageTag, month: str):
+        rollup = MonthlySpend.objects.filter(user=self.user, tag=tag, month=month).first()
+        return (rollup.amount, rollup.expense_count) if rollup else (0, 0)
+
+    def test_resolve_tags(self):
+        tags, unknown = resolve_tags(['FD', 'NOPE', 'FD'])
+        self.assertListEqual([self.food], tags)
+        self.assertListEqual(['NOPE'], unknown)
+
+    def test_tag_and_untag(self):
+        self.expenses[0].tags.add(self.food)
+        ids = [expense.pk for expense in self.expenses] + [self.other.pk]
+
+        # per batch: a savepoint, the lock, the existing links and one insert, then a rollup update
+        # (and an insert and the update again for rows that do not exist yet) per month and tag
+        with self.assertNumQueries((1 + 3 + (1 + 3) + 1) + (1 + 3 + (2 + 4) + 1)):
+            result = change_tags(Expense, self.user, ids, [self.food, self.fare], batch_size=2)
+
+        self.assertEquals(3, result.items)
+        self.assertEquals(5, result.added)
+        self.assertEquals(2, self.expenses[1].tags.count())
+        self.assertFalse(self.other.tags.exists())
+        self.assertTupleEqual((300, 2), self.spend(self.food, '2023-01-01'))
+        self.assertTupleEqual((300, 2), self.spend(self.fare, '2023-01-01'))
+        self.assertTupleEqual((400, 1), self.spend(self.food, '2023-02-01'))
+
+        # nothing new the second time
+        self.assertEquals(0, change_tags(Expense, self.user, ids, [self.food]).added)
+
+        result = change_tags(Expense, self.user, ids[:2], [self.food], remove=True)
+        self.assertEquals(2, result.removed)
+        self.assertFalse(self.expenses[0].tags.filter(pk=self.food.pk).exists())
+        self.assertTupleEqual((0, 0), self.spend(self.food, '2023-01-01'))
+        self.assertTupleEqual((300, 2), self.spend(self.fare, '2023-01-01'))
+
+        MonthlySpend.rebuild([self.user.pk])
+        self.assertTupleEqual((300, 2), self.spend(self.fare, '2023-01-01'))
+        self.assertTupleEqual((400, 1), self.spend(self.food, '2023-02-01'))
+
+    def test_payments(self):
+        payment = RecurringPayment.objects.create(
+            user=self.user, narration='Gym', amount=10, start_date='2020-01-06', renewal_date='10'
+        )
+        self.assertEquals(1, change_tags(RecurringPayment, self.user, [payment.pk], [self.fare]).added)
+        self.assertListEqual([self.fare], list(payment.tags.all()))
@@ -46,4 +46,7 @@ class ExpensesValidatorsTestCase(TestCase):
             self.renewal_validator,
             '19-60'
         )
-
+        for value in ('0', '00'):
+            self.assertRaisesMessage(ValidationError, 'Dates should be at least 1', self.renewal_validator, value)
+        self.assertRaisesMessage(ValidationError, 'Dates should be at least 1', self.renewal_validator, '12-00')
+        self.assertRaisesMessage(ValidationError, 'Months should be at least 1', self.renewal_validator, '00-15')
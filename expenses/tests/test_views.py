@@ -0,0 +1,297 @@
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Sum
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Currency, User, AccountType, Account
+from expenses.models import Transaction, RecurringPayment, Expense, UsageTag
+
+
+class ExpensesViewsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.user = User.objects.create(username='rih', email='rih@tfinance.io', currency=self.currency)
+        self.user_2 = User.objects.create(username='van', email='van@tfinance.io', currency=self.currency)
+        self.account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+        self.account = Account.objects.create(
+            account_type=self.account_type,
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+            active=True
+        )
+        self.account_2 = Account.objects.create(
+            account_type=self.account_type,
+            user=self.user_2,
+            account_number='02',
+            account_provider='SAF',
+            active=True
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.get_user_auth_token().key}')
+
+    def test_bulk_create_transactions(self):
+        url = '/expenses/transactions/bulk/'
+
+        # invalid items are reported per item
+        req = self.client.post(url, [
+            {'transaction_type': 'DB', 'amount': 10, 'account_id': self.account.pk},
+            {'transaction_type': 'DB', 'amount': 10, 'account_id': 90000},
+        ], format='json')
+        self.assertEquals(400, req.status_code)
+        self.assertEquals({}, req.json().get('errors')[0])
+        self.assertListEqual(['account_id'], list(req.json().get('errors')[1].keys()))
+
+        # accounts of other users cannot be used
+        req = self.client.post(url, [
+            {'transaction_type': 'DB', 'amount': 10, 'account_id': self.account_2.pk},
+        ], format='json')
+        self.assertEquals(403, req.status_code)
+        self.assertFalse(Transaction.objects.exists())
+
+        req = self.client.post(url, [
+            {'transaction_type': 'DB', 'amount': 300, 'account_id': self.account.pk},
+            {'transaction_type': 'CD', 'amount': 1000, 'account_id': self.account.pk},
+            {'transaction_type': 'DB', 'amount': 50, 'account_id': self.account.pk},
+        ], format='json')
+        self.assertEquals(201, req.status_code)
+        self.assertEquals(3, req.json().get('count'))
+        self.assertEquals(3, self.account.transaction_set.count())
+        self.account.refresh_from_db()
+        self.assertEquals(650, self.account.balance)
+
+    def test_upcoming_payments(self):
+        today = timezone.localdate()
+        soon = RecurringPayment.objects.create(
+            user=self.user, start_date=today, renewal_date=f'{today + timedelta(days=3):%m-%d}'
+        )
+        RecurringPayment.objects.create(
+            user=self.user, start_date=today, renewal_date=f'{today + timedelta(days=20):%m-%d}'
+        )
+        RecurringPayment.objects.create(
+            user=self.user_2, start_date=today, renewal_date=f'{today + timedelta(days=3):%m-%d}'
+        )
+
+        self.assertEquals(400, self.client.get('/expenses/payments/upcoming/?days=a').status_code)
+        req = self.client.get('/expenses/payments/upcoming/')
+        self.assertEquals(200, req.status_code)
+        self.assertListEqual([soon.pk], [payment.get('id') for payment in req.json().get('payments')])
+        req = self.client.get('/expenses/payments/upcoming/?days=30')
+        self.assertEquals(2, len(req.json().get('payments')))
+
+    def test_monthly_spending(self):
+        tag = UsageTag.objects.create(title='FOOD', code='FD')
+        Expense.objects.create(user=self.user, amount=300, date_occurred='2023-01-12').tags.add(tag)
+        Expense.objects.create(user=self.user, amount=700, date_occurred='2023-01-20')
+        Expense.objects.create(user=self.user, amount=50, date_occurred='2023-03-02')
+        Expense.objects.create(user=self.user_2, amount=50, date_occurred='2023-03-02')
+
+        url = '/expenses/spending/monthly/'
+        self.assertEquals(400, self.client.get(f'{url}?start=2023').status_code)
+
+        # the token was cached by the request above
+        with self.assertNumQueries(1):
+            req = self.client.get(url)
+        self.assertListEqual(req.json().get('months'), [
+            {'month': '2023-01', 'tag': None, 'amount': 1000, 'count': 2},
+            {'month': '2023-03', 'tag': None, 'amount': 50, 'count': 1},
+        ])
+        req = self.client.get(f'{url}?start=2023-02&end=2023-12')
+        self.assertListEqual([row.get('month') for row in req.json().get('months')], ['2023-03'])
+        req = self.client.get(f'{url}?by_tag=1')
+        self.assertListEqual(req.json().get('months'), [
+            {'month': '2023-01', 'tag': 'FD', 'amount': 300, 'count': 1},
+        ])
+
+    def test_account_transactions(self):
+        transactions = [
+            Transaction.objects.create(transaction_type='CD', amount=amount, account=self.account)
+            for amount in range(1, 8)
+        ]
+        # a tie on the date is broken by the id
+        Transaction.objects.filter(pk__in=[tr.pk for tr in transactions[2:5]]).update(
+            transaction_date=transactions[2].transaction_date
+        )
+        url = f'/expenses/accounts/{self.account.pk}/transactions/'
+
+        self.assertEquals(404, self.client.get(f'/expenses/accounts/{self.account_2.pk}/transactions/').status_code)
+        self.assertEquals(400, self.client.get(f'{url}?cursor=nope').status_code)
+        self.assertEquals(400, self.client.get(f'{url}?page_size=a').status_code)
+
+        pages, cursor = [], ''
+        while cursor is not None:
+            req = self.client.get(f'{url}?page_size=3&cursor={cursor}')
+            self.assertEquals(200, req.status_code)
+            pages.append([tr.get('amount') for tr in req.json().get('transactions')])
+            cursor = req.json().get('next_cursor')
+
+        self.assertListEqual(pages, [[7, 6, 5], [4, 3, 2], [1]])
+
+    def test_list_expenses(self):
+        for day in range(1, 6):
+            Expense.objects.create(user=self.user, amount=day, date_occurred=f'2023-01-0{day}')
+        Expense.objects.create(user=self.user, amount=6, date_occurred='2023-01-05')
+        Expense.objects.create(user=self.user_2, amount=100, date_occurred='2023-01-05')
+
+        req = self.client.get('/expenses/?page_size=4')
+        self.assertListEqual([expense.get('amount') for expense in req.json().get('expenses')], [6, 5, 4, 3])
+        req = self.client.get(f'/expenses/?page_size=4&cursor={req.json().get("next_cursor")}')
+        self.assertListEqual([expense.get('amount') for expense in req.json().get('expenses')], [2, 1])
+        self.assertIsNone(req.json().get('next_cursor'))
+
+    def test_export(self):
+        Transaction.objects.create(transaction_type='CD', amount=100, account=self.account)
+        Transaction.objects.create(transaction_type='CD', amount=900, account=self.account_2)
+        Expense.objects.create(user=self.user, amount=5, narration='Lunch', date_occurred='2023-01-01')
+        Expense.objects.create(user=self.user, amount=6, narration='Fare', date_occurred='2023-01-02')
+        Expense.objects.create(user=self.user_2, amount=7, narration='Lunch', date_occurred='2023-01-02')
+
+        req = self.client.get('/expenses/export/transactions/')
+        self.assertEquals(200, req.status_code)
+        self.assertEquals('text/csv', req['Content-Type'])
+        self.assertIn('transactions.csv', req['Content-Disposition'])
+        lines = b''.join(req.streaming_content).decode().splitlines()
+        self.assertEquals(2, len(lines))
+        self.assertTrue(lines[1].endswith(',01,SAF'))
+
+        req = self.client.get('/expenses/export/expenses/?output=ndjson&start=2023-01-02')
+        self.assertEquals('application/x-ndjson', req['Content-Type'])
+        lines = b''.join(req.streaming_content).decode().splitlines()
+        self.assertListEqual(['Fare'], [json.loads(line)['narration'] for line in lines])
+
+        self.assertEquals(400, self.client.get('/expenses/export/expenses/?output=xml').status_code)
+        self.assertEquals(400, self.client.get('/expenses/export/expenses/?end=01-01-2023').status_code)
+
+    def test_change_tags(self):
+        UsageTag.objects.create(title='FOOD', code='FD')
+        expenses = [
+            Expense.objects.create(user=self.user, amount=amount, date_occurred='2023-01-01') for amount in (1, 2)
+        ]
+        url = '/expenses/tags/add/'
+        data = {'items': 'expenses', 'ids': [expense.pk for expense in expenses], 'tags': ['FD']}
+
+        self.assertEquals(400, self.client.post(url, {**data, 'items': 'budgets'}, format='json').status_code)
+        self.assertEquals(400, self.client.post(url, {**data, 'tags': []}, format='json').status_code)
+        req = self.client.post(url, {**data, 'tags': ['FD', 'XX']}, format='json')
+        self.assertEquals(400, req.status_code)
+        self.assertIn('XX', req.json().get('message'))
+
+        req = self.client.post(url, data, format='json')
+        self.assertEquals(200, req.status_code)
+        self.assertDictEqual({'success': True, 'items': 2, 'added': 2}, req.json())
+
+        req = self.client.post('/expenses/tags/remove/', data, format='json')
+        self.assertDictEqual({'success': True, 'items': 2, 'removed': 2}, req.json())
+        self.assertFalse(Expense.tags.through.objects.exists())
+
+
+class ExpensesAsyncViewsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.currency = Currency.objects.create(country='Kenya', code='KES', symbol='Ksh')
+        self.user = User.objects.create(username='rih', email='rih@tfinance.io', currency=self.currency)
+        self.user_2 = User.objects.create(username='van', email='van@tfinance.io', currency=self.currency)
+        self.account_type = AccountType.objects.create(name='Mobile Money', code='MNO')
+        self.account = Account.objects.create(
+            account_type=self.account_type,
+            user=self.user,
+            account_number='01',
+            account_provider='SAF',
+            active=True
+        )
+        self.account_2 = Account.objects.create(
+            account_type=self.account_type,
+            user=self.user_2,
+            account_number='02',
+            account_provider='SAF',
+            active=True
+        )
+        self.headers = {'Authorization': f'Token {self.user.get_user_auth_token().key}'}
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=self.headers['Authorization'])
+
+        food = UsageTag.objects.create(title='Food', code='FD')
+        today = timezone.localdate()
+        for day in range(1, 4):
+            expense = Expense.objects.create(user=self.user, amount=day * 10, date_occurred=today - timedelta(days=day))
+            expense.tags.add(food)
+            Transaction.objects.create(
+                transaction_type='DB', amount=day * 10, account=self.account, transaction_for='EX',
+                transaction_for_id=expense.pk
+            )
+        Transaction.objects.create(transaction_type='CD', amount=500, account=self.account)
+        self.payment = RecurringPayment.objects.create(
+            user=self.user, start_date=today, renewal_date=f'{today + timedelta(days=3):%m-%d}'
+        )
+
+    async def test_same_as_sync_views(self):
+        for sync_url, async_url in (
+            (f'/expenses/accounts/{self.account.pk}/transactions/', f'/expenses/async/accounts/{self.account.pk}/transactions/'),
+            ('/expenses/', '/expenses/async/'),
+        ):
+            expected = (await sync_to_async(self.client.get)(f'{sync_url}?page_size=2')).json()
+            req = await self.async_client.get(f'{async_url}?page_size=2', headers=self.headers)
+            self.assertEquals(200, req.status_code)
+            self.assertDictEqual(expected, req.json())
+
+            req = await self.async_client.get(
+                f'{async_url}?page_size=2&cursor={expected["next_cursor"]}', headers=self.headers
+            )
+            expected = (await sync_to_async(self.client.get)(
+                f'{sync_url}?page_size=2&cursor={expected["next_cursor"]}'
+            )).json()
+            self.assertDictEqual(expected, req.json())
+
+        req = await self.async_client.get(f'/expenses/async/accounts/{self.account_2.pk}/transactions/', headers=self.headers)
+        self.assertEquals(404, req.status_code)
+        req = await self.async_client.get('/expenses/async/?cursor=nope', headers=self.headers)
+        self.assertEquals(400, req.status_code)
+
+    async def test_authentication(self):
+        self.assertEquals(401, (await self.async_client.get('/expenses/dashboard/')).status_code)
+        req = await self.async_client.get('/expenses/dashboard/', headers={'Authorization': 'Token nope'})
+        self.assertEquals((401, {'detail': 'Invalid token.'}), (req.status_code, req.json()))
+        self.assertEquals('Token', req.headers['WWW-Authenticate'])
+
+        self.user_2.is_active = False
+        await self.user_2.asave(update_fields=['is_active'])
+        token = await sync_to_async(self.user_2.get_user_auth_token)()
+        req = await self.async_client.get('/expenses/dashboard/', headers={'Authorization': f'Token {token.key}'})
+        self.assertEquals(401, req.status_code)
+
+        req = await self.async_client.post('/expenses/dashboard/', headers=self.headers)
+        self.assertEquals((405, 'GET'), (req.status_code, req.headers['Allow']))
+
+    async def test_dashboard(self):
+        req = await self.async_client.get('/expenses/dashboard/', headers=self.headers)
+        self.assertEquals(200, req.status_code)
+        data = req.json()
+        self.assertListEqual(['success', 'accounts', 'month', 'upcoming_payments', 'transactions'], list(data.keys()))
+
+        self.assertListEqual([self.account.pk], [account['id'] for account in data['accounts']])
+        self.assertEquals(
+            ({'name': 'Mobile Money', 'code': 'MNO'}, None, 440),
+            (data['accounts'][0]['account_type'], data['accounts'][0]['currency'], data['accounts'][0]['balance'])
+        )
+        self.assertDictEqual(
+            data['accounts'][0], (await self.async_client.get('/core/accounts/balances/', headers=self.headers)).json()['accounts'][0]
+        )
+
+        spent = await Expense.objects.filter(
+            user=self.user, date_occurred__gte=timezone.localdate().replace(day=1)
+        ).aaggregate(amount=Sum('amount'), count=Count('pk'))
+        self.assertDictEqual(
+            {'month': f'{timezone.localdate():%Y-%m}', 'amount': spent['amount'] or 0, 'count': spent['count']},
+            data['month']
+        )
+        self.assertListEqual([self.payment.next_renewal_on.isoformat()], [p['next_renewal_on'] for p in data['upcoming_payments']])
+        self.assertListEqual(
+            [500, 30, 20, 10],
+            [tr['amount'] for tr in data['transactions']]
+        )
+        self.assertListEqual(['Food'], [tag['title'] for tag in data['transactions'][1]['item']['tags']])
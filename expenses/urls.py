@@ -0,0 +1,45 @@
+from django.urls import path
+
+from . import views
+
+app_name = "expenses"
+
+
+urlpatterns = [
+
+    # ''
+    path('', views.list_expenses, name='expenses'),
+
+    # accounts/<account_id>/transactions/
+    path('accounts/<int:account_id>/transactions/', views.account_transactions, name='account-transactions'),
+
+    # transactions/bulk/
+    path('transactions/bulk/', views.bulk_create_transactions, name='transactions-bulk'),
+
+    # payments/upcoming/
+    path('payments/upcoming/', views.upcoming_payments, name='payments-upcoming'),
+
+    # spending/monthly/
+    path('spending/monthly/', views.monthly_spending, name='spending-monthly'),
+
+    # tags/add/
+    path('tags/add/', views.change_tags, {'remove': False}, name='tags-add'),
+
+    # tags/remove/
+    path('tags/remove/', views.change_tags, {'remove': True}, name='tags-remove'),
+
+    # async/
+    path('async/', views.alist_expenses, name='expenses-async'),
+
+    # async/accounts/<account_id>/transactions/
+    path('async/accounts/<int:account_id>/transactions/', views.aaccount_transactions, name='account-transactions-async'),
+
+    # dashboard/
+    path('dashboard/', views.dashboard, name='dashboard'),
+
+    # export/transactions/
+    path('export/transactions/', views.export, {'kind': 'transactions'}, name='export-transactions'),
+
+    # export/expenses/
+    path('export/expenses/', views.export, {'kind': 'expenses'}, name='export-expenses'),
+]
@@ -0,0 +1,62 @@
+import calendar
+from datetime import date, timedelta
+from typing import Tuple
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+
+class RenewalDateCalculator:
+
+    @staticmethod
+    def parse(renewal_date: str) -> Tuple[int | None, int]:
+        """
+            '15' -> (None, 15) for monthly payments, '12-31' -> (12, 31) for annual ones
+
+            Raises ValidationError for anything else, RenewalDateValidator gives the reason
+        """
+        try:
+            if '-' in renewal_date:
+                month, day = renewal_date.split('-')
+                month, day = int(month), int(day)
+            else:
+                month, day = None, int(renewal_date)
+        except (TypeError, ValueError):
+            raise ValidationError({'renewal_date': _('Use a valid renewal date')})
+
+        if not 1 <= day <= 31 or month is not None and not 1 <= month <= 12:
+            raise ValidationError({'renewal_date': _('Use a valid renewal date')})
+
+        return month, day
+
+    @staticmethod
+    def clamp(year: int, month: int, day: int) -> date:
+        """The date, moved back to the last day of the month when the month is shorter"""
+        return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+    @classmethod
+    def next_renewal(cls, month: int | None, day: int, after: date, start_date: date = None,
+                     end_date: date = None) -> date | None:
+        """
+            First renewal after `after`, not before `start_date`
+
+            None when that is past `end_date`
+        """
+        reference = after + timedelta(days=1)
+        if start_date and start_date > reference:
+            reference = start_date
+
+        if month is None:
+            renewal = cls.clamp(reference.year, reference.month, day)
+            if renewal < reference:
+                next_month = (reference.replace(day=1) + timedelta(days=32)).replace(day=1)
+                renewal = cls.clamp(next_month.year, next_month.month, day)
+        else:
+            renewal = cls.clamp(reference.year, month, day)
+            if renewal < reference:
+                renewal = cls.clamp(reference.year + 1, month, day)
+
+        if end_date and renewal > end_date:
+            return None
+
+        return renewal
@@ -11,11 +11,15 @@ class RenewalDateValidator(BaseValidator):
     def validate_day(val):
         if val > 31:
             raise ValidationError(_('Dates should not exceed 31'))
+        if val < 1:
+            raise ValidationError(_('Dates should be at least 1'))
 
     @staticmethod
     def validate_month(val):
         if val > 12:
             raise ValidationError(_('Months should not exceed 12'))
+        if val < 1:
+            raise ValidationError(_('Months should be at least 1'))
 
     def __call__(self, value: str):
         try:
@@ -1,3 +1,323 @@
-from django.shortcuts import render
+from datetime import datetime, timedelta
 
-# Create your views here.
+from django.db.models import Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view
+
+from core.decorators import async_api_view
+from core.fast_serializers import FastSerializer
+from core.models import Account
+from core.optimizer import optimize_queryset
+from core.pagination import KeysetPaginator
+from core.views.accounts import account_balances
+from . import exports, tagging
+from .models import RecurringPayment, MonthlySpend, Transaction, Expense
+from .serializers import TransactionSerializer, PaymentSerializer, ExpenseSerializer, FastTransactionSerializer
+
+
+def keyset_page(
+        request, paginator: KeysetPaginator, queryset, serializer_class, key: str, fast: FastSerializer = None
+) -> JsonResponse:
+    """
+        One page of `queryset` for the `cursor` and `page_size` in the request
+
+        With `fast`, the FastSerializer of `serializer_class`, the page is read with values()
+        and represented without the serializer
+    """
+    try:
+        items, next_cursor = paginator.paginate(
+            queryset if fast else optimize_queryset(queryset, serializer_class),
+            request.GET.get('cursor'),
+            request.GET.get('page_size'),
+            fast.rows if fast else list
+        )
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid cursor or page size'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse({
+        'success': True,
+        key: fast.represent(items) if fast else serializer_class(items, many=True).data,
+        'next_cursor': next_cursor
+    }, status=status.HTTP_200_OK)
+
+
+async def akeyset_page(request, paginator: KeysetPaginator, queryset, key: str, fast: FastSerializer) -> JsonResponse:
+    """keyset_page for async views, always on the FastSerializer path"""
+    try:
+        rows, next_cursor = await paginator.apaginate(
+            queryset, request.GET.get('cursor'), request.GET.get('page_size'), fast.arows
+        )
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid cursor or page size'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse({
+        'success': True,
+        key: await fast.arepresent(rows),
+        'next_cursor': next_cursor
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def bulk_create_transactions(request):
+    """
+        Accepts POST request with a list of transactions for the user's accounts
+            [{ 'transaction_type': 'DB' | 'CD', 'amount': int, 'account_id': int, ... }]
+        all transactions are created at once and each account balance is updated once
+    """
+    tr_ser = TransactionSerializer(data=request.data, many=True)
+
+    if not tr_ser.is_valid():
+        return JsonResponse({
+            'success': False,
+            'errors': tr_ser.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    account_ids = {attrs.get('account_id') for attrs in tr_ser.validated_data}
+
+    if Account.objects.filter(pk__in=account_ids, user=request.user).count() != len(account_ids):
+        return JsonResponse({
+            'success': False,
+            'message': 'Transactions can only be added to your accounts'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    transactions = tr_ser.save()
+    return JsonResponse({
+        'success': True,
+        'count': len(transactions)
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+def upcoming_payments(request):
+    """
+        Recurring payments of the user that renew in the next `days` days (7 by default),
+        overdue ones included
+    """
+    try:
+        days = int(request.GET.get('days', 7))
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'days should be a number'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    payments = RecurringPayment.objects.filter(
+        user=request.user,
+        next_renewal_on__lte=timezone.localdate() + timedelta(days=days)
+    ).order_by('next_renewal_on')
+
+    return JsonResponse({
+        'success': True,
+        'payments': PaymentSerializer(optimize_queryset(payments, PaymentSerializer), many=True).data
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def monthly_spending(request):
+    """
+        Spending of the user per month, read from the monthly rollup
+        optional query params:
+            start, end: months as YYYY-MM
+            by_tag: any value to get the spending per tag instead of the month totals
+    """
+    rollups = MonthlySpend.objects.filter(user=request.user)
+
+    try:
+        if start := request.GET.get('start'):
+            rollups = rollups.filter(month__gte=datetime.strptime(start, '%Y-%m').date())
+        if end := request.GET.get('end'):
+            rollups = rollups.filter(month__lte=datetime.strptime(end, '%Y-%m').date())
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Use the format YYYY-MM for months'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    rollups = rollups.filter(tag__isnull=not request.GET.get('by_tag'))
+    months = rollups.values('month', 'tag__code').annotate(
+        total=Sum('amount'), count=Sum('expense_count')
+    ).filter(count__gt=0).order_by('month', 'tag__code')
+
+    return JsonResponse({
+        'success': True,
+        'months': [
+            {
+                'month': f'{row["month"]:%Y-%m}',
+                'tag': row['tag__code'],
+                'amount': row['total'],
+                'count': row['count']
+            } for row in months
+        ]
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def account_transactions(request, account_id: int):
+    """
+        Transactions of one of the user's accounts, newest first
+        query params: cursor (next_cursor of the previous page), page_size
+    """
+    if not Account.objects.filter(pk=account_id, user=request.user).exists():
+        return JsonResponse({
+            'success': False,
+            'message': 'Account not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    transactions = Transaction.objects.filter(account_id=account_id)
+    return keyset_page(
+        request, KeysetPaginator('transaction_date'), transactions, TransactionSerializer, 'transactions',
+        FastTransactionSerializer.for_class(TransactionSerializer)
+    )
+
+
+@api_view(['GET'])
+def list_expenses(request):
+    """
+        Expenses of the user, latest first
+        query params: cursor (next_cursor of the previous page), page_size
+    """
+    expenses = Expense.objects.filter(user=request.user)
+    return keyset_page(
+        request, KeysetPaginator('date_occurred'), expenses, ExpenseSerializer, 'expenses',
+        FastSerializer.for_class(ExpenseSerializer)
+    )
+
+
+@async_api_view(['GET'])
+async def aaccount_transactions(request, account_id: int):
+    """
+        account_transactions, async
+    """
+    if not await Account.objects.filter(pk=account_id, user=request.user).aexists():
+        return JsonResponse({
+            'success': False,
+            'message': 'Account not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    transactions = Transaction.objects.filter(account_id=account_id)
+    return await akeyset_page(
+        request, KeysetPaginator('transaction_date'), transactions, 'transactions',
+        FastTransactionSerializer.for_class(TransactionSerializer)
+    )
+
+
+@async_api_view(['GET'])
+async def alist_expenses(request):
+    """
+        list_expenses, async
+    """
+    expenses = Expense.objects.filter(user=request.user)
+    return await akeyset_page(
+        request, KeysetPaginator('date_occurred'), expenses, 'expenses', FastSerializer.for_class(ExpenseSerializer)
+    )
+
+
+@async_api_view(['GET'])
+async def dashboard(request):
+    """
+        What the home screen shows, async: account balances, spending of the current month,
+        payments renewing in the next 7 days and the 5 latest transactions
+    """
+    today = timezone.localdate()
+    month = await MonthlySpend.objects.filter(
+        user=request.user, month=today.replace(day=1), tag__isnull=True
+    ).values('amount', 'expense_count').afirst() or {'amount': 0, 'expense_count': 0}
+
+    payments = RecurringPayment.objects.filter(
+        user=request.user,
+        next_renewal_on__lte=today + timedelta(days=7)
+    ).order_by('next_renewal_on', 'pk')
+    transactions = Transaction.objects.filter(account__user=request.user).order_by('-transaction_date', '-pk')
+
+    return JsonResponse({
+        'success': True,
+        'accounts': await account_balances(request.user),
+        'month': {
+            'month': f'{today:%Y-%m}',
+            'amount': month['amount'],
+            'count': month['expense_count']
+        },
+        'upcoming_payments': await FastSerializer.for_class(PaymentSerializer).aserialize(payments),
+        'transactions': await FastTransactionSerializer.for_class(TransactionSerializer).aserialize(transactions[:5])
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def export(request, kind: str):
+    """
+        Streams the user's transactions or expenses
+        query params:
+            output: csv (default) or ndjson
+            start, end: days as YYYY-MM-DD, both included
+    """
+    output = request.GET.get('output', 'csv')
+
+    try:
+        start, end = (
+            datetime.strptime(value, '%Y-%m-%d').date() if (value := request.GET.get(param)) else None
+            for param in ('start', 'end')
+        )
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Use the format YYYY-MM-DD for dates'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if output not in exports.OUTPUTS:
+        return JsonResponse({
+            'success': False,
+            'message': f'Output should be one of {", ".join(exports.OUTPUTS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = Transaction.objects.filter(account__user=request.user) if kind == 'transactions' else \
+        Expense.objects.filter(user=request.user)
+    # the rows are read once the view has returned, keep the database chosen for this request
+    queryset = queryset.using(queryset.db)
+
+    response = StreamingHttpResponse(
+        exports.export_lines(kind, output, exports.dated(kind, queryset, start, end)),
+        content_type=exports.OUTPUTS[output]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{output}"'
+    return response
+
+
+@api_view(['POST'])
+def change_tags(request, remove: bool):
+    """
+        Accepts POST request to tag (or untag) many of the user's expenses or payments at once
+            { 'items': 'expenses' | 'payments', 'ids': [int], 'tags': [tag codes] }
+        ids of other users' items are skipped
+    """
+    model = tagging.TAGGABLE.get(request.data.get('items'))
+    ids, codes = request.data.get('ids'), request.data.get('tags')
+
+    if model is None or not isinstance(ids, list) or not isinstance(codes, list) or not codes or \
+            not all(isinstance(pk, int) for pk in ids) or not all(isinstance(code, str) for code in codes):
+        return JsonResponse({
+            'success': False,
+            'message': f'items ({", ".join(tagging.TAGGABLE)}), a list of ids and a list of tag codes are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    tags, unknown = tagging.resolve_tags(codes)
+    if unknown:
+        return JsonResponse({
+            'success': False,
+            'message': f'No tags with the codes {", ".join(unknown)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    result = tagging.change_tags(model, request.user, ids, tags, remove)
+
+    return JsonResponse({
+        'success': True,
+        'items': result.items,
+        'removed' if remove else 'added': result.removed if remove else result.added
+    }, status=status.HTTP_200_OK)
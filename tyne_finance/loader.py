@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import MISSING, dataclass, fields
 
 from dotenv import load_dotenv
 
@@ -13,6 +13,9 @@ class EnvVariables:
     database_password: str
     database_host: str
     database_port: str
+    # optional, without a replica host every query goes to the database above
+    database_replica_host: str | None = None
+    database_replica_port: str | None = None
 
 
 def load_variables() -> EnvVariables:
@@ -29,10 +32,12 @@ def load_variables() -> EnvVariables:
         os.getenv('DATABASE_USER'),
         os.getenv('DATABASE_PASSWORD'),
         os.getenv('DATABASE_HOST'),
-        os.getenv('DATABASE_PORT')
+        os.getenv('DATABASE_PORT'),
+        os.getenv('DATABASE_REPLICA_HOST'),
+        os.getenv('DATABASE_REPLICA_PORT')
     )
 
-    if [val for val in vars(variables).values() if not val]:
+    if [field.name for field in fields(variables) if field.default is MISSING and not getattr(variables, field.name)]:
         raise EnvironmentError('Some variable are missing')
 
     return variables
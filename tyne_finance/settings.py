@@ -53,7 +53,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
@@ -70,6 +70,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.identity_map_middleware',
+    'core.middleware.read_only_middleware',
 ]
 
 ROOT_URLCONF = 'tyne_finance.urls'
@@ -107,6 +109,67 @@ DATABASES = {
     }
 }
 
+if env_variables.database_replica_host:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': env_variables.database_replica_host,
+        'PORT': env_variables.database_replica_port or env_variables.database_port,
+        # no test database of its own on the replica server, tests read from the primary
+        # (core/test_runner.py) and the routing is tested with tyne_finance/test_settings.py
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# reads of GET requests, exports and reports go to this alias, None reads everything from default
+READ_REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # tokens of authenticated requests, local memory is per process so a deleted token (logout,
+    # refresh) keeps working in the other workers until TIMEOUT: keep it as short as the version
+    # checks of the other in-memory data, or switch to a shared cache (redis, memcached) to raise it
+    'auth_tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth-tokens',
+        'TIMEOUT': 5,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # login attempt counters, per process like the workers they protect
+    'login_attempts': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'login-attempts',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+AUTH_TOKEN_CACHE = 'auth_tokens'
+
+# seconds a process keeps using the version stamp of in-memory data (reference data, exchange rates)
+# before reading it from the database again, changes made by other processes show up within it
+CACHE_VERSION_CHECK_INTERVAL = 5
+
+LOGIN_THROTTLE_CACHE = 'login_attempts'
+
+# (attempts, seconds): failed logins per username and logins per IP allowed in a window,
+# attempts over the limit are refused before the password is hashed
+LOGIN_THROTTLE_RATES = {
+    'username': (10, 900),
+    'ip': (100, 900),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -127,6 +190,14 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+AUTHENTICATION_BACKENDS = ['core.authentication.PooledHashingModelBackend']
+
+# passwords hashed at once per process and hashes allowed to wait for them,
+# requests needing a hash beyond that are turned away
+PASSWORD_HASHING_WORKERS = 2
+PASSWORD_HASHING_QUEUE = 32
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -0,0 +1,25 @@
+"""
+Settings to run the tests on two SQLite databases, a primary and a replica of its own
+
+    python manage.py test --settings=tyne_finance.test_settings
+
+The replica is an independent database: the routing tests (core/tests/test_routers.py) write
+different rows to each to see which one a query reads. Reads go to the primary unless a test
+turns the replica on with READ_REPLICA_DATABASE.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-replica.sqlite3',
+    },
+}
+
+READ_REPLICA_DATABASE = None
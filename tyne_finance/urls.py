@@ -21,4 +21,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 
     path('core/', include('core.urls')),
+    path('expenses/', include('expenses.urls')),
+    path('budgets/', include('budgets.urls')),
 ]